@@ -0,0 +1,247 @@
+#annealing.py
+
+import math
+import time
+from typing import Any, Callable, Optional, Set
+
+from constructive_init import DEFAULT_INIT_RANDOMNESS
+from random_stream import RandomStream, default_stream
+from timetable import Timetable
+
+SCHEDULES = ("annealing", "late_acceptance")
+
+# Progress callback shared by the solver engines: (iteration or generation, best timetable so far)
+ProgressCallback = Callable[[int, Timetable], None]
+
+REBALANCE_SHARE = 0.2  # Share of the moves that add or remove a session while some (course, group) lacks or exceeds its hours
+
+
+class AnnealingSolver:
+    """
+    Single-solution engine: simulated annealing or late-acceptance hill climbing.
+
+    The solver changes one timetable in place with neighbourhood moves (swap
+    the slots of two sessions, move a session to another slot, change its
+    classroom, give it to another qualified teacher). While the number of
+    sessions of some (course, group) differs from its weekly hours, a share
+    of the moves adds a session to a (course, group) that lacks hours or
+    removes one from a (course, group) that has too many. Every move is
+    scored by a delta update of the timetable's score counters and undone if
+    it is rejected, so no timetable is copied except when a new best is stored.
+
+    "annealing" accepts a worse move with probability exp(delta / T); the
+    starting temperature is calibrated so that an average worsening move is
+    accepted with probability initial_acceptance, and it cools geometrically
+    to final_temperature_ratio of that value over max_iterations.
+    "late_acceptance" accepts a move that is not worse than the current
+    fitness or the fitness from history_length iterations ago.
+    The search stops after max_iterations, after time_limit seconds or once
+    the fitness reaches 1.0. With stop_when_feasible it also stops as soon
+    as the best timetable is feasible (no conflicts and every weekly hour
+    scheduled), leaving the gaps, teacher constraints and balance of
+    objectives such as "gaps" or "combined" unoptimized, so it is off by default.
+    """
+
+    def __init__(self, data: Any, fitness_function: str = "conflicts",
+                 schedule: str = "annealing",
+                 max_iterations: int = 20000,
+                 time_limit: Optional[float] = None,
+                 initial_acceptance: float = 0.5,
+                 final_temperature_ratio: float = 1e-3,
+                 history_length: int = 50,
+                 init_randomness: float = DEFAULT_INIT_RANDOMNESS,
+                 progress_interval: int = 1000,
+                 progress_callback: Optional[ProgressCallback] = None,
+                 stop_when_feasible: bool = False,
+                 rng: Optional[RandomStream] = None):
+        if schedule not in SCHEDULES:
+            raise ValueError(f"Unknown schedule '{schedule}', expected one of {SCHEDULES}.")
+        if max_iterations <= 0 or history_length <= 0 or progress_interval <= 0:
+            raise ValueError("Iteration counts must be positive integers.")
+        self.data = data
+        self.fitness_function = fitness_function
+        self.schedule = schedule
+        self.max_iterations = max_iterations
+        self.time_limit = time_limit
+        self.initial_acceptance = initial_acceptance
+        self.final_temperature_ratio = final_temperature_ratio
+        self.history_length = history_length
+        self.init_randomness = init_randomness
+        self.progress_interval = progress_interval
+        self.progress_callback = progress_callback
+        self.stop_when_feasible = stop_when_feasible
+        self.rng = rng if rng is not None else default_stream()
+        self.iterations = 0
+        # (course, group) layout entries of the current timetable with fewer / more sessions than weekly hours
+        self._lacking: Set[int] = set()
+        self._exceeding: Set[int] = set()
+
+    @staticmethod
+    def is_feasible(timetable: Timetable) -> bool:
+        """True if the timetable has no conflicts and schedules exactly the weekly hours of every (course, group)."""
+        counters = timetable.score_counters
+        return counters.conflicts == 0 and counters.hours_penalty == 0
+
+    def run(self, timetable: Optional[Timetable] = None) -> Timetable:
+        """Improves the timetable (a newly constructed one when omitted) and returns the best one found."""
+        if timetable is None:
+            timetable = Timetable(data=self.data, fitness_function=self.fitness_function,
+                                  rng=self.rng).initialize(self.init_randomness)
+        current = timetable
+        current_fitness = current.fitness
+        best = current.clone()
+        best_feasible = self.is_feasible(current)
+        self._lacking, self._exceeding = set(), set()
+        for layout_idx in range(self.data.index.num_layouts):
+            self._update_balance(current, layout_idx)
+        deadline = None if self.time_limit is None else time.perf_counter() + self.time_limit
+
+        temperature = cooling_rate = 0.0
+        if self.schedule == "annealing":
+            temperature = self._initial_temperature(current)
+            cooling_rate = self.final_temperature_ratio ** (1.0 / self.max_iterations)
+        history = [current_fitness] * self.history_length
+
+        self.iterations = 0
+        while self.iterations < self.max_iterations and best.fitness < 1.0:
+            if self.stop_when_feasible and best_feasible:
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            self.iterations += 1
+
+            undo = self._apply_random_move(current)
+            if undo is not None:
+                new_fitness = current.fitness
+                delta = new_fitness - current_fitness
+
+                if self.schedule == "annealing":
+                    accepted = delta >= 0 or (temperature > 0
+                                              and self.rng.random() < math.exp(delta / temperature))
+                else:
+                    accepted = delta >= 0 or new_fitness >= history[self.iterations % self.history_length]
+
+                if accepted:
+                    current_fitness = new_fitness
+                    if new_fitness > best.fitness:
+                        best = current.clone()
+                        best_feasible = self.is_feasible(current)
+                else:
+                    undo()
+
+            temperature *= cooling_rate
+            history[self.iterations % self.history_length] = current_fitness
+
+            if self.progress_callback is not None and self.iterations % self.progress_interval == 0:
+                self.progress_callback(self.iterations, best)
+
+        if self.progress_callback is not None and self.iterations % self.progress_interval != 0:
+            self.progress_callback(self.iterations, best)
+        return best
+
+    def _initial_temperature(self, timetable: Timetable, samples: int = 100) -> float:
+        # Average fitness loss of random worsening moves (undone right away)
+        fitness = timetable.fitness
+        losses = []
+        for _ in range(samples):
+            undo = self._apply_random_move(timetable)
+            if undo is None:
+                continue
+            delta = timetable.fitness - fitness
+            undo()
+            if delta < 0:
+                losses.append(-delta)
+        if not losses:
+            return 0.0
+        return (sum(losses) / len(losses)) / -math.log(self.initial_acceptance)
+
+    def _update_balance(self, timetable: Timetable, layout_idx: int) -> None:
+        count = timetable.score_counters.layout_counts[layout_idx]
+        required = self.data.index.required_hours[layout_idx]
+        (self._lacking.add if count < required else self._lacking.discard)(layout_idx)
+        (self._exceeding.add if count > required else self._exceeding.discard)(layout_idx)
+
+    def _add_session(self, timetable: Timetable) -> Callable[[], None]:
+        # A session for a (course, group) that lacks hours: qualified teacher, fitting classroom,
+        # a slot in which the group is free where there is one
+        index = self.data.index
+        lacking = sorted(self._lacking)
+        layout_idx = self.rng.choice(lacking)
+        group_idx = index.layout_groups[layout_idx]
+        teachers = index.qualified_teachers[index.layout_courses[layout_idx]] or range(index.num_teachers)
+        classrooms = index.fitting_classrooms[group_idx] or range(index.num_classrooms)
+        group_slots = timetable.score_counters.group_slots
+        offset = group_idx * index.num_time_slots
+        free_slots = [slot_idx for slot_idx in range(index.num_time_slots) if not group_slots[offset + slot_idx]]
+        slots = free_slots or range(index.num_time_slots)
+        timetable.add_session(layout_idx, self.rng.choice(teachers),
+                              self.rng.choice(classrooms), self.rng.choice(slots))
+        self._update_balance(timetable, layout_idx)
+
+        def undo() -> None:
+            timetable.remove_session(len(timetable) - 1)
+            self._update_balance(timetable, layout_idx)
+        return undo
+
+    def _remove_session(self, timetable: Timetable) -> Callable[[], None]:
+        # One session of a (course, group) that has more sessions than weekly hours
+        exceeding = sorted(self._exceeding)
+        layout_idx = self.rng.choice(exceeding)
+        positions = [idx for idx, layout in enumerate(timetable.layout_genes) if layout == layout_idx]
+        idx = self.rng.choice(positions)
+        genes = timetable.get_session_genes(idx)
+        timetable.remove_session(idx)
+        self._update_balance(timetable, layout_idx)
+
+        def undo() -> None:
+            timetable.add_session(*genes)
+            self._update_balance(timetable, layout_idx)
+        return undo
+
+    def _apply_random_move(self, timetable: Timetable) -> Optional[Callable[[], None]]:
+        """Applies one random neighbourhood move and returns the function that undoes it."""
+        if (self._lacking or self._exceeding) and self.rng.random() < REBALANCE_SHARE:
+            if self._lacking and (not self._exceeding or self.rng.random() < 0.5):
+                return self._add_session(timetable)
+            return self._remove_session(timetable)
+
+        num_sessions = len(timetable)
+        if num_sessions == 0:
+            return None
+        index = self.data.index
+        idx = self.rng.index(num_sessions)
+        layout_idx, teacher_idx, classroom_idx, time_slot_idx = timetable.get_session_genes(idx)
+        move = self.rng.random()
+
+        if move < 0.3:
+            # Swap the slots of two sessions
+            other = self.rng.index(num_sessions)
+            if timetable.time_slot_genes[other] == time_slot_idx:
+                return None
+            timetable.swap_time_slots(idx, other)
+            return lambda: timetable.swap_time_slots(idx, other)
+
+        if move < 0.6:
+            # Move the session to another slot
+            new_time_slot = self.rng.index(index.num_time_slots)
+            if new_time_slot == time_slot_idx:
+                return None
+            timetable.set_slot(idx, new_time_slot)
+            return lambda: timetable.set_slot(idx, time_slot_idx)
+
+        if move < 0.8:
+            # Change the classroom to one that fits the group
+            classrooms = index.fitting_classrooms[index.layout_groups[layout_idx]] or range(index.num_classrooms)
+            new_classroom = self.rng.choice(classrooms)
+            if new_classroom == classroom_idx:
+                return None
+            timetable.set_room(idx, new_classroom)
+            return lambda: timetable.set_room(idx, classroom_idx)
+
+        # Give the session to another qualified teacher
+        teachers = index.qualified_teachers[index.layout_courses[layout_idx]] or range(index.num_teachers)
+        new_teacher = self.rng.choice(teachers)
+        if new_teacher == teacher_idx:
+            return None
+        timetable.set_teacher(idx, new_teacher)
+        return lambda: timetable.set_teacher(idx, teacher_idx)
@@ -0,0 +1,190 @@
+#batch_fitness.py
+
+from typing import Any, List, Sequence
+from weakref import WeakKeyDictionary
+
+from data_index import BALANCE_DAYS, GAP_THRESHOLD_MINUTES
+from fitness_objectives import get_objective
+from instrumentation import evaluation_counters
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional: without it fitness is evaluated timetable by timetable
+    np = None
+
+class BatchFitnessEvaluator:
+    """
+    Evaluates the fitness of many timetables at once with NumPy.
+
+    All genomes are concatenated into flat integer vectors tagged with the index
+    of their timetable, so every penalty is computed with a handful of
+    bincount/unique/lexsort calls instead of one Python loop per timetable.
+    Only the components the selected objective depends on are computed. The
+    results are identical to Timetable.calculate_fitness.
+
+    The evaluator keeps only NumPy copies of the data index, not the Data
+    object, so caching it per index does not keep the index alive.
+    """
+
+    def __init__(self, index: Any):
+        self.num_groups = index.num_groups
+        self.num_teachers = index.num_teachers
+        self.num_classrooms = index.num_classrooms
+        self.num_time_slots = index.num_time_slots
+        self.num_layouts = index.num_layouts
+        self.num_days = index.num_days
+
+        # NumPy copies of the data index tables
+        self.layout_courses = np.array(index.layout_courses, dtype=np.int64)
+        self.layout_groups = np.array(index.layout_groups, dtype=np.int64)
+        self.slot_days = np.array(index.slot_days, dtype=np.int64)
+        self.slot_minutes = np.array(index.slot_minutes, dtype=np.int64)
+        self.slot_balance_days = np.array(index.slot_balance_days, dtype=np.int64)
+        self.over_capacity = np.array(index.over_capacity, dtype=bool).reshape(self.num_groups, self.num_classrooms)
+        self.required_hours = np.array(index.required_hours, dtype=np.int64)
+        self.required_weight = np.array(index.required_weight, dtype=np.int64)
+        self.restricted = np.array(index.restricted, dtype=bool)
+        self.max_hours = np.array(index.max_hours, dtype=np.int64)
+        self.allowed = np.array(
+            [[index.is_allowed(teacher_idx, course_idx) for course_idx in range(index.num_courses)]
+             for teacher_idx in range(self.num_teachers)],
+            dtype=bool
+        ).reshape(self.num_teachers, index.num_courses)
+        # Reference plan: sorted assignment keys and how often each occurs
+        self.reference_keys = np.array(sorted(index.reference_counts), dtype=np.int64)
+        self.reference_counts = np.array([index.reference_counts[key] for key in self.reference_keys.tolist()],
+                                         dtype=np.int64)
+        self.reference_total = index.reference_total
+
+    def evaluate(self, timetables: Sequence[Any], fitness_function: str) -> List[float]:
+        """Computes the fitness vector for the timetables and stores it in each of them."""
+        num_timetables = len(timetables)
+        if num_timetables == 0:
+            return []
+
+        lengths = np.array([len(timetable) for timetable in timetables], dtype=np.int64)
+        owners = np.repeat(np.arange(num_timetables, dtype=np.int64), lengths)
+        layouts = self._concatenate(timetables, "layout_genes")
+        teachers = self._concatenate(timetables, "teacher_genes")
+        classrooms = self._concatenate(timetables, "classroom_genes")
+        time_slots = self._concatenate(timetables, "time_slot_genes")
+        groups = self.layout_groups[layouts]
+        courses = self.layout_courses[layouts]
+
+        objective = get_objective(fitness_function)
+        values = {}
+        for component in objective.components:
+            if component == "conflicts":
+                values[component] = (
+                    self._count_clashes(owners, groups, time_slots, self.num_groups, lengths)
+                    + self._count_clashes(owners, teachers, time_slots, self.num_teachers, lengths)
+                    + self._count_clashes(owners, classrooms, time_slots, self.num_classrooms, lengths)
+                    + np.bincount(owners, weights=self.over_capacity[groups, classrooms], minlength=num_timetables)
+                ).astype(np.int64)
+            elif component == "gaps":
+                values[component] = (self._count_gaps(owners, teachers, time_slots, self.num_teachers, num_timetables)
+                                     + self._count_gaps(owners, groups, time_slots, self.num_groups, num_timetables))
+            elif component == "hours":
+                values[component] = self._hours_penalty(owners, layouts, num_timetables)
+            elif component == "teacher_constraints":
+                values[component] = self._teacher_constraints_penalty(owners, teachers, courses, num_timetables)
+            elif component == "deviation":
+                values[component] = self._deviation_penalty(owners, layouts, teachers, classrooms, time_slots,
+                                                            num_timetables)
+            else:
+                values[component] = self._balance_penalty(owners, time_slots, num_timetables)
+
+        fitness, conflicts_counts = objective.score(values)
+        fitness = np.broadcast_to(fitness, (num_timetables,))
+
+        fitness_values = fitness.tolist()
+        evaluation_counters.batch += num_timetables
+        for idx, timetable in enumerate(timetables):
+            timetable.set_fitness(
+                fitness_values[idx],
+                None if conflicts_counts is None else int(conflicts_counts[idx])
+            )
+        return fitness_values
+
+    @staticmethod
+    def _concatenate(timetables: Sequence[Any], genes_name: str) -> Any:
+        return np.concatenate(
+            [np.frombuffer(getattr(timetable, genes_name), dtype=np.uint16) for timetable in timetables]
+        ).astype(np.int64)
+
+    def _count_clashes(self, owners, resources, time_slots, num_resources: int, lengths) -> Any:
+        # Every (timetable, resource, slot) key beyond its first occurrence is one conflict
+        keys = (owners * num_resources + resources) * self.num_time_slots + time_slots
+        unique_keys = np.unique(keys)
+        unique_owners = unique_keys // (num_resources * self.num_time_slots)
+        return lengths - np.bincount(unique_owners, minlength=len(lengths))
+
+    def _count_gaps(self, owners, resources, time_slots, num_resources: int, num_timetables: int) -> Any:
+        # Sort each (timetable, resource, day) bucket by start time and count long breaks
+        buckets = (owners * num_resources + resources) * self.num_days + self.slot_days[time_slots]
+        minutes = self.slot_minutes[time_slots]
+        order = np.lexsort((minutes, buckets))
+        buckets = buckets[order]
+        minutes = minutes[order]
+        is_gap = (buckets[1:] == buckets[:-1]) & (minutes[1:] - minutes[:-1] > GAP_THRESHOLD_MINUTES)
+        return np.bincount(owners[order][1:][is_gap], minlength=num_timetables)
+
+    def _hours_penalty(self, owners, layouts, num_timetables: int) -> Any:
+        counts = np.bincount(owners * self.num_layouts + layouts,
+                             minlength=num_timetables * self.num_layouts).reshape(num_timetables, self.num_layouts)
+        return (np.abs(counts - self.required_hours) * self.required_weight).sum(axis=1)
+
+    def _teacher_constraints_penalty(self, owners, teachers, courses, num_timetables: int) -> Any:
+        not_allowed = self.restricted[teachers] & ~self.allowed[teachers, courses]
+        penalty = np.bincount(owners, weights=not_allowed, minlength=num_timetables).astype(np.int64)
+        loads = np.bincount(owners * self.num_teachers + teachers,
+                            minlength=num_timetables * self.num_teachers).reshape(num_timetables, self.num_teachers)
+        overload = np.maximum(loads - self.max_hours, 0) * self.restricted
+        return penalty + overload.sum(axis=1)
+
+    def _deviation_penalty(self, owners, layouts, teachers, classrooms, time_slots, num_timetables: int) -> Any:
+        num_references = len(self.reference_keys)
+        if num_references == 0:
+            return np.zeros(num_timetables, dtype=np.int64)
+        keys = ((layouts * self.num_teachers + teachers) * self.num_classrooms + classrooms) * self.num_time_slots \
+            + time_slots
+        positions = np.minimum(np.searchsorted(self.reference_keys, keys), num_references - 1)
+        in_reference = self.reference_keys[positions] == keys
+        counts = np.bincount(owners[in_reference] * num_references + positions[in_reference],
+                             minlength=num_timetables * num_references).reshape(num_timetables, num_references)
+        return self.reference_total - np.minimum(counts, self.reference_counts).sum(axis=1)
+
+    def _balance_penalty(self, owners, time_slots, num_timetables: int) -> Any:
+        days = self.slot_balance_days[time_slots]
+        known = days >= 0
+        counts = np.bincount(owners[known] * len(BALANCE_DAYS) + days[known],
+                             minlength=num_timetables * len(BALANCE_DAYS)).reshape(num_timetables, len(BALANCE_DAYS))
+        max_counts = counts.max(axis=1)
+        min_counts = counts.min(axis=1)
+        return np.where(max_counts == 0, 0.0, (max_counts - min_counts) / np.maximum(max_counts, 1))
+
+
+# Evaluators are cached per data index, so rebuilding the index also rebuilds the evaluator
+_evaluators: "WeakKeyDictionary[Any, BatchFitnessEvaluator]" = WeakKeyDictionary()
+
+
+def evaluate_population_fitness(timetables: Sequence[Any]) -> List[float]:
+    """
+    Returns the fitness vector of the timetables.
+
+    Only timetables whose stale fitness cannot be read from their score
+    counters are recomputed; with NumPy available they are evaluated together
+    in one batch per Data object.
+    """
+    stale = [timetable for timetable in timetables if timetable.needs_full_evaluation]
+    if stale and np is not None:
+        by_data = {}
+        for timetable in stale:
+            by_data.setdefault(id(timetable.data), []).append(timetable)
+        for batch in by_data.values():
+            data = batch[0].data
+            evaluator = _evaluators.get(data.index)
+            if evaluator is None:
+                evaluator = _evaluators[data.index] = BatchFitnessEvaluator(data.index)
+            evaluator.evaluate(batch, data.fitness_function)
+    return [timetable.fitness for timetable in timetables]
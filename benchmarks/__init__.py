@@ -0,0 +1,3 @@
+from .instances import SIZES, generate_instance, named_instance
+from .micro import run_micro_benchmarks
+from .macro import run_macro_benchmarks
@@ -0,0 +1,61 @@
+#compare.py
+
+import argparse
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+# Metrics compared between two reports; True when a larger value is better
+MICRO_METRICS = {"per_call_us": False}
+MACRO_METRICS = {"generations_per_s": True, "iterations_per_s": True, "zero_conflicts_s": False,
+                 "best_fitness": True}
+
+
+def _key(result: Dict[str, Any]) -> Tuple:
+    return (result.get("instance"), result.get("fitness_function"), result.get("name"),
+            result.get("engine"), result.get("seed"))
+
+
+def compare_reports(baseline: Dict[str, Any], candidate: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Pairs the results of two benchmark reports and returns candidate/baseline ratios per metric."""
+    rows = []
+    for suite, metrics in (("micro", MICRO_METRICS), ("macro", MACRO_METRICS)):
+        baseline_results = {_key(result): result for result in baseline.get(suite, [])}
+        for result in candidate.get(suite, []):
+            reference = baseline_results.get(_key(result))
+            if reference is None:
+                continue
+            for metric, higher_is_better in metrics.items():
+                old, new = reference.get(metric), result.get(metric)
+                if not old or new is None:
+                    continue
+                ratio = new / old
+                rows.append({
+                    "suite": suite,
+                    "benchmark": " ".join(str(part) for part in _key(result) if part is not None),
+                    "metric": metric,
+                    "baseline": old,
+                    "candidate": new,
+                    "ratio": ratio,
+                    "improved": ratio > 1 if higher_is_better else ratio < 1,
+                })
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Compare two benchmark JSON reports")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    options = parser.parse_args(argv)
+    with open(options.baseline, encoding="utf-8") as file:
+        baseline = json.load(file)
+    with open(options.candidate, encoding="utf-8") as file:
+        candidate = json.load(file)
+
+    for row in compare_reports(baseline, candidate):
+        marker = "+" if row["improved"] else "-"
+        print(f"{marker} {row['suite']:5} {row['benchmark']:45} {row['metric']:18} "
+              f"{row['baseline']:.6g} -> {row['candidate']:.6g} (x{row['ratio']:.2f})")
+
+
+if __name__ == "__main__":
+    main()
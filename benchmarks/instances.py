@@ -0,0 +1,89 @@
+#instances.py
+
+from typing import Dict, Tuple
+
+from data import Data
+from models import Classroom, Course, StudentGroup, Teacher, TimeSlot
+from random_stream import RandomStream
+
+DAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday")
+FIRST_SESSION_START = 8 * 60 + 40  # 08:40
+SESSION_MINUTES = 95
+BREAK_MINUTES = 20
+
+# Named instance sizes: (groups, teachers, classrooms, time slots)
+SIZES: Dict[str, Tuple[int, int, int, int]] = {
+    "small": (8, 12, 8, 20),
+    "medium": (30, 40, 25, 30),
+    "large": (100, 120, 70, 40),
+}
+
+
+def _format_time(start: int) -> str:
+    end = start + SESSION_MINUTES
+    return f"{start // 60:02d}:{start % 60:02d} - {end // 60:02d}:{end % 60:02d}"
+
+
+def generate_instance(num_groups: int, num_teachers: int, num_classrooms: int, num_time_slots: int,
+                      courses_per_group: int = 6, seed: int = 0, fitness_function: str = "conflicts") -> Data:
+    """
+    Builds a random but reproducible problem instance of the given size.
+
+    Time slots are spread over the five working days; every course is taught
+    by at least one teacher (teachers get one to three extra courses at
+    random) and every group fits into at least one classroom. Teachers'
+    courses and weekly limits also become their restrictions, as with the
+    bundled teachers.csv.
+    """
+    if min(num_groups, num_teachers, num_classrooms, num_time_slots, courses_per_group) <= 0:
+        raise ValueError("Instance sizes must be positive integers.")
+    rng = RandomStream(seed)
+
+    slots_per_day = -(-num_time_slots // len(DAYS))
+    time_slots = []
+    for slot_idx in range(num_time_slots):
+        day_idx, order = divmod(slot_idx, slots_per_day)
+        start = FIRST_SESSION_START + order * (SESSION_MINUTES + BREAK_MINUTES)
+        time_slots.append(TimeSlot(id=f"S{slot_idx + 1}", time=_format_time(start), day=DAYS[day_idx]))
+
+    num_courses = max(courses_per_group * 2, num_teachers // 2, 1)
+    courses = [
+        Course(number=number, name=f"Course{number}", max_number_of_students=120,
+               course_type="lecture" if number % 2 else "lab", hours_per_week=1 + rng.index(2))
+        for number in range(1, num_courses + 1)
+    ]
+
+    classrooms = [
+        Classroom(number=str(100 + idx), seating_capacity=20 + 10 * rng.index(11))
+        for idx in range(num_classrooms)
+    ]
+    largest_room = max(classroom.seating_capacity for classroom in classrooms)
+
+    teacher_courses = [[] for _ in range(num_teachers)]
+    for course in courses:
+        teacher_courses[(course.number - 1) % num_teachers].append(course.number)
+    for qualified in teacher_courses:
+        for _ in range(1 + rng.index(3)):
+            course_number = 1 + rng.index(num_courses)
+            if course_number not in qualified:
+                qualified.append(course_number)
+    teachers = [
+        Teacher(id=idx + 1, name=f"Teacher{idx + 1}", courses=qualified, max_hours_per_week=12 + 4 * rng.index(5))
+        for idx, qualified in enumerate(teacher_courses)
+    ]
+
+    groups = []
+    for idx in range(num_groups):
+        group_courses = list(courses)
+        rng.shuffle(group_courses)
+        groups.append(StudentGroup(id=idx + 1, name=f"G-{idx + 1}",
+                                   num_students=10 + rng.index(max(largest_room - 9, 1)),
+                                   courses=sorted(group_courses[:courses_per_group], key=lambda c: c.number)))
+
+    return Data.from_objects(classrooms, teachers, courses, groups, time_slots, fitness_function=fitness_function)
+
+
+def named_instance(name: str, seed: int = 0, fitness_function: str = "conflicts") -> Data:
+    if name not in SIZES:
+        raise ValueError(f"Unknown instance size '{name}', expected one of {tuple(SIZES)}.")
+    return generate_instance(*SIZES[name], seed=seed, fitness_function=fitness_function)
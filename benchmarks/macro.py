@@ -0,0 +1,99 @@
+#macro.py
+
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from annealing import AnnealingSolver
+from genetic_algorithm import GenAlg
+from population import Population
+from random_stream import RandomStream
+
+ENGINES = ("ga", "annealing", "late_acceptance")
+
+
+def run_ga(data: Any, seed: int, population_size: int = 50, max_generations: int = 200) -> Dict[str, Any]:
+    """Runs the GA with the main.py parameters and records throughput and time to zero conflicts."""
+    rng = RandomStream(seed)
+    genetic_algorithm = GenAlg(data=data, num_elite_timetables=2, crossover_rate=0.7, mutation_rate=0.15,
+                               tournament_size=5, fitness_function=data.fitness_function, rng=rng)
+    start = time.perf_counter()
+    population = Population(size=population_size, data=data, rng=rng).sort_by_fitness()
+    setup_s = time.perf_counter() - start
+
+    generations = 0
+    zero_conflicts_generation: Optional[int] = None
+    zero_conflicts_s: Optional[float] = None
+
+    def track(generation_number: int, best_timetable: Any) -> None:
+        nonlocal generations, zero_conflicts_generation, zero_conflicts_s
+        generations = generation_number
+        if zero_conflicts_generation is None and best_timetable.conflicts_count == 0:
+            zero_conflicts_generation = generation_number
+            zero_conflicts_s = time.perf_counter() - start
+
+    if population.timetables[0].conflicts_count == 0:
+        track(0, population.timetables[0])
+    loop_start = time.perf_counter()
+    population = genetic_algorithm.run(population, max_generations, progress_callback=track)
+    elapsed = time.perf_counter() - loop_start
+
+    best_timetable = population.timetables[0]
+    return {
+        "engine": "ga",
+        "seed": seed,
+        "population_size": population_size,
+        "setup_s": setup_s,
+        "elapsed_s": elapsed,
+        "generations": generations,
+        "generations_per_s": generations / elapsed if elapsed > 0 else None,
+        "zero_conflicts_generation": zero_conflicts_generation,
+        "zero_conflicts_s": zero_conflicts_s,
+        "best_fitness": best_timetable.fitness,
+        "best_conflicts": best_timetable.conflicts_count,
+    }
+
+
+def run_single_solution(data: Any, seed: int, schedule: str, max_iterations: int = 20000) -> Dict[str, Any]:
+    """Runs an AnnealingSolver schedule and records throughput and time to zero conflicts."""
+    zero_conflicts_iteration: Optional[int] = None
+    zero_conflicts_s: Optional[float] = None
+    start = time.perf_counter()
+
+    def track(iteration: int, best_timetable: Any) -> None:
+        nonlocal zero_conflicts_iteration, zero_conflicts_s
+        if zero_conflicts_iteration is None and best_timetable.conflicts_count == 0:
+            zero_conflicts_iteration = iteration
+            zero_conflicts_s = time.perf_counter() - start
+
+    solver = AnnealingSolver(data=data, fitness_function=data.fitness_function, schedule=schedule,
+                             max_iterations=max_iterations, progress_interval=100, progress_callback=track,
+                             rng=RandomStream(seed))
+    best_timetable = solver.run()
+    elapsed = time.perf_counter() - start
+    return {
+        "engine": schedule,
+        "seed": seed,
+        "elapsed_s": elapsed,
+        "iterations": solver.iterations,
+        "iterations_per_s": solver.iterations / elapsed if elapsed > 0 else None,
+        "zero_conflicts_iteration": zero_conflicts_iteration,
+        "zero_conflicts_s": zero_conflicts_s,
+        "best_fitness": best_timetable.fitness,
+        "best_conflicts": best_timetable.conflicts_count,
+    }
+
+
+def run_macro_benchmarks(data: Any, seeds: Sequence[int] = (0, 1, 2), engines: Sequence[str] = ENGINES,
+                         population_size: int = 50, max_generations: int = 200,
+                         max_iterations: int = 20000) -> List[Dict[str, Any]]:
+    """Runs every engine once per seed on the instance."""
+    results = []
+    for engine in engines:
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine '{engine}', expected one of {ENGINES}.")
+        for seed in seeds:
+            if engine == "ga":
+                results.append(run_ga(data, seed, population_size, max_generations))
+            else:
+                results.append(run_single_solution(data, seed, engine, max_iterations))
+    return results
@@ -0,0 +1,77 @@
+#micro.py
+
+import time
+from typing import Any, Callable, Dict, List
+
+from genetic_algorithm import GenAlg
+from population import Population
+from random_stream import RandomStream
+from timetable import Timetable
+
+MUTATION_OPERATORS = ("swap_mutation", "inversion_mutation", "scramble_mutation",
+                      "remove_session_mutation", "add_session_mutation", "aggressive_mutate_timetable")
+
+
+def measure(name: str, function: Callable[[], Any], number: int, repeat: int = 5) -> Dict[str, Any]:
+    """Runs function number times per round for repeat rounds and returns the timings in seconds."""
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        rounds.append(time.perf_counter() - start)
+    best = min(rounds)
+    return {
+        "name": name,
+        "number": number,
+        "repeat": repeat,
+        "best_s": best,
+        "mean_s": sum(rounds) / len(rounds),
+        "per_call_us": best / number * 1e6,
+    }
+
+
+def run_micro_benchmarks(data: Any, population_size: int = 50, number: int = 200, repeat: int = 5,
+                         seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Times the hot operations of the GA on one instance.
+
+    Mutation operators change their timetable in place, so every call works
+    on a fresh clone; the cost of clone() itself is reported separately.
+    """
+    rng = RandomStream(seed)
+    fitness_function = data.fitness_function
+    genetic_algorithm = GenAlg(data=data, num_elite_timetables=2, crossover_rate=0.7, mutation_rate=0.15,
+                               tournament_size=5, fitness_function=fitness_function, rng=rng)
+    timetable = Timetable(data=data, fitness_function=fitness_function, rng=rng).initialize()
+    other = Timetable(data=data, fitness_function=fitness_function, rng=rng).initialize()
+    population = Population(size=population_size, data=data, rng=rng)
+
+    def stale_population() -> Population:
+        return Population.from_timetables(
+            Timetable.from_genome(data, member.to_genome(), fitness_function) for member in population.timetables
+        )
+
+    results = [
+        measure("calculate_fitness", timetable.calculate_fitness, number, repeat),
+        measure("clone", timetable.clone, number, repeat),
+        measure("crossover_timetable", lambda: genetic_algorithm.crossover_timetable(timetable, other),
+                number, repeat),
+    ]
+    for operator_name in MUTATION_OPERATORS:
+        operator = getattr(genetic_algorithm, operator_name)
+        results.append(measure(operator_name, lambda: operator(timetable.clone()), number, repeat))
+
+    population_number = max(number // population_size, 1)
+    results.append(measure("population_construction",
+                           lambda: Population(size=population_size, data=data, rng=rng),
+                           population_number, repeat))
+    results.append(measure("population_construction_random",
+                           lambda: Population(size=population_size, data=data, rng=rng, init_randomness=1.0),
+                           population_number, repeat))
+    results.append(measure("stale_population_copy", stale_population, population_number, repeat))
+    results.append(measure("sort_by_fitness", lambda: stale_population().sort_by_fitness(),
+                           population_number, repeat))
+    for result in results:
+        result["population_size"] = population_size
+    return results
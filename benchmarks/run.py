@@ -0,0 +1,99 @@
+#run.py
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmarks.instances import SIZES, named_instance
+from benchmarks.macro import ENGINES, run_macro_benchmarks
+from benchmarks.micro import run_micro_benchmarks
+
+try:
+    import numpy as np
+except ImportError:  # Only recorded in the metadata
+    np = None
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def collect_metadata() -> Dict[str, Any]:
+    return {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "numpy": None if np is None else np.__version__,
+    }
+
+
+def run_benchmarks(sizes: List[str], suites: List[str], seeds: List[int], engines: List[str],
+                   fitness_function: str = "conflicts", population_size: int = 50,
+                   max_generations: int = 200, max_iterations: int = 20000, number: int = 200) -> Dict[str, Any]:
+    """Runs the selected suites on the named instance sizes and returns a JSON-serialisable report."""
+    report: Dict[str, Any] = {"metadata": collect_metadata(), "micro": [], "macro": []}
+    for size in sizes:
+        data = named_instance(size, fitness_function=fitness_function)
+        instance = {"instance": size, "fitness_function": fitness_function, "sessions": len(data.initial_layout)}
+        if "micro" in suites:
+            for result in run_micro_benchmarks(data, population_size=population_size, number=number):
+                report["micro"].append({**instance, **result})
+        if "macro" in suites:
+            for result in run_macro_benchmarks(data, seeds=seeds, engines=engines, population_size=population_size,
+                                               max_generations=max_generations, max_iterations=max_iterations):
+                report["macro"].append({**instance, **result})
+    return report
+
+
+def parse_arguments(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Timetable GA benchmarks")
+    parser.add_argument("--size", dest="sizes", action="append", choices=tuple(SIZES),
+                        help="instance size (repeatable, default: small)")
+    parser.add_argument("--suite", dest="suites", action="append", choices=("micro", "macro"),
+                        help="benchmark suite (repeatable, default: both)")
+    parser.add_argument("--engine", dest="engines", action="append", choices=ENGINES,
+                        help="engine for the macro benchmarks (repeatable, default: all)")
+    parser.add_argument("--seed", dest="seeds", action="append", type=int,
+                        help="seed for the macro benchmarks (repeatable, default: 0 1 2)")
+    parser.add_argument("--fitness-function", default="conflicts")
+    parser.add_argument("--population-size", type=int, default=50)
+    parser.add_argument("--max-generations", type=int, default=200)
+    parser.add_argument("--max-iterations", type=int, default=20000)
+    parser.add_argument("--number", type=int, default=200, help="calls per timing round in the micro benchmarks")
+    parser.add_argument("--output", default="-", help="JSON file for the results ('-' prints them)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    options = parse_arguments(argv)
+    report = run_benchmarks(
+        sizes=options.sizes or ["small"],
+        suites=options.suites or ["micro", "macro"],
+        seeds=options.seeds or [0, 1, 2],
+        engines=options.engines or list(ENGINES),
+        fitness_function=options.fitness_function,
+        population_size=options.population_size,
+        max_generations=options.max_generations,
+        max_iterations=options.max_iterations,
+        number=options.number,
+    )
+    text = json.dumps(report, indent=2)
+    if options.output == "-":
+        print(text)
+    else:
+        with open(options.output, "w", encoding="utf-8") as file:
+            file.write(text + "\n")
+        print(f"Benchmark results written to {options.output}")
+
+
+if __name__ == "__main__":
+    main()
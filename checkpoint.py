@@ -0,0 +1,197 @@
+#checkpoint.py
+
+import hashlib
+import json
+import os
+import struct
+import sys
+import tempfile
+import zlib
+from array import array
+from typing import Any, Dict, List, Optional
+
+from population import Population
+from random_stream import RandomStream
+from timetable import Timetable
+
+MAGIC = b"TTCK"
+FORMAT_VERSION = 1
+# magic, format version, length of the JSON header, length of the compressed genome block
+_PREAMBLE = struct.Struct("<4sHII")
+_CRC = struct.Struct("<I")
+_LENGTH = struct.Struct("<I")
+
+# GenAlg attributes stored with every checkpoint and restored on resume
+GENALG_PARAMETERS = ("num_elite_timetables", "crossover_rate", "mutation_rate", "tournament_size",
+                     "fitness_function", "predation_rate", "init_randomness")
+
+
+class CheckpointError(ValueError):
+    """The checkpoint file is damaged or does not belong to the loaded data."""
+
+
+def data_fingerprint(data: Any) -> str:
+    """
+    Hash of everything a genome refers to: the order of courses, groups,
+    teachers, classrooms and time slots and the session layout.
+
+    Genes are indices into these lists, so a genome is only meaningful for
+    data with the same fingerprint.
+    """
+    digest = hashlib.sha256()
+    for items, key in ((data.courses, "number"), (data.groups, "id"), (data.teachers, "id"),
+                       (data.classrooms, "number"), (data.time_slots, "id")):
+        digest.update(json.dumps([str(getattr(item, key)) for item in items]).encode("utf-8"))
+    digest.update(json.dumps(data.session_layout).encode("utf-8"))
+    digest.update(data.initial_layout.tobytes())
+    return digest.hexdigest()
+
+
+def data_keys(data: Any) -> Dict[str, list]:
+    """
+    Stable keys of everything a gene index refers to, so a saved genome can
+    be read back (e.g. by warm_start) after the data has changed.
+    """
+    return {
+        "courses": [course.number for course in data.courses],
+        "groups": [group.name for group in data.groups],
+        "teachers": [teacher.id for teacher in data.teachers],
+        "classrooms": [str(classroom.number) for classroom in data.classrooms],
+        "time_slots": [[time_slot.day, time_slot.time] for time_slot in data.time_slots],
+        "session_layout": [list(entry) for entry in data.session_layout],
+    }
+
+
+def _encode_rng_state(state: dict) -> dict:
+    version, internal_state, gauss_next = state["random"]
+    return {**state, "random": [version, list(internal_state), gauss_next]}
+
+
+def _decode_rng_state(state: dict) -> dict:
+    version, internal_state, gauss_next = state["random"]
+    return {**state, "random": (version, tuple(internal_state), gauss_next)}
+
+
+class Checkpoint:
+    """A population saved as compact genomes together with the state needed to continue the run."""
+
+    def __init__(self, genomes: List[bytes], generation_number: int, rng_state: dict,
+                 parameters: Dict[str, Any], fingerprint: str, extra: Optional[Dict[str, Any]] = None,
+                 keys: Optional[Dict[str, list]] = None):
+        self.genomes = genomes
+        self.generation_number = generation_number
+        self.rng_state = rng_state
+        self.parameters = parameters
+        self.fingerprint = fingerprint
+        self.extra = extra or {}
+        self.keys = keys
+
+    def population(self, data: Any, rng: Optional[RandomStream] = None) -> Population:
+        """Rebuilds the population; raises CheckpointError when data is not the data of the run."""
+        if data_fingerprint(data) != self.fingerprint:
+            raise CheckpointError("The checkpoint was written for different input data.")
+        fitness_function = self.parameters.get("fitness_function", data.fitness_function)
+        return Population.from_timetables(
+            Timetable.from_genome(data, genome, fitness_function, rng=rng) for genome in self.genomes
+        )
+
+    def restore_rng(self, rng: RandomStream) -> RandomStream:
+        rng.setstate(self.rng_state)
+        return rng
+
+    def restore_genetic_algorithm(self, genetic_algorithm: Any) -> Any:
+        """Copies the saved GenAlg parameters and improvement tracking onto genetic_algorithm."""
+        for name in GENALG_PARAMETERS:
+            if name in self.parameters:
+                setattr(genetic_algorithm, name, self.parameters[name])
+        genetic_algorithm._best_fitness_seen = self.extra.get("best_fitness_seen")
+        genetic_algorithm._last_improvement = self.extra.get("last_improvement", 0)
+        return genetic_algorithm
+
+
+def save_checkpoint(path: str, population: Population, generation_number: int, rng: RandomStream,
+                    genetic_algorithm: Any, data: Any) -> int:
+    """
+    Writes the checkpoint atomically and returns its size in bytes.
+
+    The file is written to a temporary file in the same directory, flushed
+    to disk and renamed over path, so a crash leaves either the previous or
+    the new checkpoint, never a partial one.
+    """
+    header = {
+        "generation_number": generation_number,
+        "byteorder": sys.byteorder,
+        "fingerprint": data_fingerprint(data),
+        "rng_state": _encode_rng_state(rng.getstate()),
+        "parameters": {name: getattr(genetic_algorithm, name) for name in GENALG_PARAMETERS},
+        "extra": {
+            "best_fitness_seen": genetic_algorithm._best_fitness_seen,
+            "last_improvement": genetic_algorithm._last_improvement,
+        },
+        "count": len(population.timetables),
+        "keys": data_keys(data),
+    }
+    header_bytes = json.dumps(header).encode("utf-8")
+    genome_block = zlib.compress(b"".join(
+        _LENGTH.pack(len(genome)) + genome for genome in (timetable.to_genome() for timetable in population.timetables)
+    ))
+    payload = _PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_bytes), len(genome_block)) + header_bytes + genome_block
+    payload += _CRC.pack(zlib.crc32(payload))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    descriptor, temporary_path = tempfile.mkstemp(prefix=".checkpoint-", dir=directory)
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(payload)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, path)
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+    return len(payload)
+
+
+def load_checkpoint(path: str) -> Checkpoint:
+    with open(path, "rb") as file:
+        payload = file.read()
+    if len(payload) < _PREAMBLE.size + _CRC.size:
+        raise CheckpointError(f"Checkpoint {path} is truncated.")
+    body, (crc,) = payload[:-_CRC.size], _CRC.unpack(payload[-_CRC.size:])
+    if zlib.crc32(body) != crc:
+        raise CheckpointError(f"Checkpoint {path} is damaged (checksum mismatch).")
+    magic, version, header_length, block_length = _PREAMBLE.unpack_from(body)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise CheckpointError(f"{path} is not a version {FORMAT_VERSION} timetable checkpoint.")
+
+    offset = _PREAMBLE.size
+    header = json.loads(body[offset:offset + header_length].decode("utf-8"))
+    offset += header_length
+    block = zlib.decompress(body[offset:offset + block_length])
+
+    genomes = []
+    position = 0
+    while position < len(block):
+        (length,) = _LENGTH.unpack_from(block, position)
+        position += _LENGTH.size
+        genome = block[position:position + length]
+        position += length
+        if header["byteorder"] != sys.byteorder:
+            genes = array('H', genome)
+            genes.byteswap()
+            genome = genes.tobytes()
+        genomes.append(genome)
+    if len(genomes) != header["count"]:
+        raise CheckpointError(f"Checkpoint {path} holds {len(genomes)} genomes, expected {header['count']}.")
+
+    return Checkpoint(
+        genomes=genomes,
+        generation_number=header["generation_number"],
+        rng_state=_decode_rng_state(header["rng_state"]),
+        parameters=header["parameters"],
+        fingerprint=header["fingerprint"],
+        extra=header["extra"],
+        keys=header.get("keys"),
+    )
@@ -0,0 +1,97 @@
+#constructive_init.py
+
+from typing import Any, List, Sequence, Tuple
+
+DEFAULT_INIT_RANDOMNESS = 0.2  # Share of sessions placed uniformly at random by the constructive heuristic
+
+
+def set_bits(mask: int, num_bits: int) -> List[int]:
+    """Returns the positions of the set bits of a time slot bitset, e.g. the free slots."""
+    return [bit for bit in range(num_bits) if mask >> bit & 1]
+
+
+def construct_timetable(timetable: Any, randomness: float = DEFAULT_INIT_RANDOMNESS) -> Any:
+    """
+    Fills an empty timetable with one session per entry of data.initial_layout.
+
+    Every session gets, with probability 1 - randomness, a qualified teacher
+    that is under its weekly limit, a classroom that fits the group and a
+    time slot in which the group, the teacher and the classroom are all free.
+    Occupancy is tracked with one integer bitset of time slots per group,
+    teacher and classroom. Ties are broken with the timetable's random stream;
+    when no conflict-free placement exists the session still avoids clashes
+    for its group (and its teacher, where possible). The remaining sessions
+    (probability randomness) are placed uniformly at random like
+    Timetable.initialize does, which keeps the population diverse;
+    randomness=1 reproduces the purely random initialization.
+    """
+    data = timetable.data
+    index = data.index
+    rng = timetable.rng
+    num_slots = index.num_time_slots
+    all_slots = (1 << num_slots) - 1
+
+    group_busy = [0] * index.num_groups
+    teacher_busy = [0] * index.num_teachers
+    classroom_busy = [0] * index.num_classrooms
+    teacher_loads = [0] * index.num_teachers
+
+    for layout_idx in data.initial_layout:
+        course_idx = index.layout_courses[layout_idx]
+        group_idx = index.layout_groups[layout_idx]
+
+        if rng.random() < randomness:
+            time_slot_idx = rng.index(num_slots)
+            teacher_idx = rng.index(index.num_teachers)
+            classroom_idx = rng.index(index.num_classrooms)
+        else:
+            # Qualified teachers below their weekly limit, falling back to any qualified (or any) teacher
+            teachers = index.qualified_teachers[course_idx] or tuple(range(index.num_teachers))
+            available_teachers = [
+                teacher_idx for teacher_idx in teachers
+                if not index.restricted[teacher_idx] or teacher_loads[teacher_idx] < index.max_hours[teacher_idx]
+            ] or list(teachers)
+            classrooms = index.fitting_classrooms[group_idx] or tuple(range(index.num_classrooms))
+
+            group_free = all_slots & ~group_busy[group_idx]
+            teacher_idx, classroom_idx, free_slots = pick_placement(
+                rng, available_teachers, classrooms, group_free, teacher_busy, classroom_busy
+            )
+            if not free_slots:
+                free_slots = group_free & ~teacher_busy[teacher_idx] or group_free or all_slots
+            slots = set_bits(free_slots, num_slots)
+            time_slot_idx = rng.choice(slots)
+
+        slot_bit = 1 << time_slot_idx
+        group_busy[group_idx] |= slot_bit
+        teacher_busy[teacher_idx] |= slot_bit
+        classroom_busy[classroom_idx] |= slot_bit
+        teacher_loads[teacher_idx] += 1
+        timetable.add_session(layout_idx, teacher_idx, classroom_idx, time_slot_idx)
+
+    return timetable
+
+
+def pick_placement(rng: Any, teachers: List[int], classrooms: Sequence[int], group_free: int,
+                   teacher_busy: List[int], classroom_busy: List[int]) -> Tuple[int, int, int]:
+    """
+    Returns (teacher, classroom, slots free for the group, teacher and classroom), or 0 slots if none exist.
+
+    Teachers and classrooms are tried in order from random offsets drawn from rng.
+    Occupancy is given as one integer bitset of time slots per teacher and classroom.
+    """
+    teacher_offset = rng.index(len(teachers))
+    classroom_offset = rng.index(len(classrooms))
+    fallback_teacher = teachers[teacher_offset]
+    for teacher_step in range(len(teachers)):
+        teacher_idx = teachers[(teacher_offset + teacher_step) % len(teachers)]
+        teacher_free = group_free & ~teacher_busy[teacher_idx]
+        if not teacher_free:
+            continue
+        for classroom_step in range(len(classrooms)):
+            classroom_idx = classrooms[(classroom_offset + classroom_step) % len(classrooms)]
+            free_slots = teacher_free & ~classroom_busy[classroom_idx]
+            if free_slots:
+                return teacher_idx, classroom_idx, free_slots
+        fallback_teacher = teacher_idx
+    return fallback_teacher, classrooms[classroom_offset], 0
@@ -1,10 +1,24 @@
 #data.py
 
-from typing import List
+import os
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from models import StudySession, Course, Teacher, TimeSlot, Classroom, StudentGroup
-from user_data.extract_data import load_classrooms_from_csv,load_groups_from_csv,load_courses_from_csv,load_teachers_from_csv,load_time_slots_from_csv,load_teacher_constraints_from_csv
+from data_index import DataIndex
+from user_data.extract_data import load_classrooms_from_csv,load_groups_from_csv,load_courses_from_csv,load_teachers_from_csv,load_time_slots_from_csv
+
+# Файли каталогу з даними, які читає Data.from_csv (у порядку завантаження)
+CSV_FILES = {
+    "classrooms": "classrooms.csv",
+    "teachers": "teachers.csv",
+    "courses": "courses_copy.csv",
+    "groups": "groups.csv",
+    "time_slots": "time_slots.csv",
+}
 
 class Data:
+    # Data() створює порожній об'єкт без жодного завантаження; заповнені дані
+    # будуються фабричними методами from_csv, from_sqlite та from_objects.
     def __init__(self, fitness_function: str = "conflicts"):
         self.fitness_function = fitness_function
         self.classrooms: List[Classroom] = []
@@ -14,19 +28,106 @@ class Data:
         self.time_slots: List[TimeSlot] = []
         self.number_of_classes: int = 0
         self.teachers_restrictions = {}
-
-
-        self.initialize()
-
-    def initialize(self):
-        self.classrooms = load_classrooms_from_csv('user_data/classrooms.csv')
-        self.teachers = load_teachers_from_csv('user_data/teachers.csv')
-        self.courses = load_courses_from_csv('user_data/courses_copy.csv')
-        self.groups = load_groups_from_csv('user_data/groups.csv', self.courses)
-        self.time_slots = load_time_slots_from_csv('user_data/time_slots.csv')
+        # Фіксована розкладка занять: пари (індекс курсу, індекс групи) та
+        # початковий порядок занять, з якого будуються компактні геноми розкладів.
+        self.session_layout: List[Tuple[int, int]] = []
+        self.initial_layout = array('H')
+        # Незмінний шар індексів (слоти, дозволені курси, потрібні години, місткість),
+        # який будується один раз після завантаження даних.
+        self.index: Optional[DataIndex] = None
+        # Попередній план (геноми занять) для штрафу за відхилення під час повторного планування;
+        # встановлюється через set_reference_plan().
+        self.reference_plan: Optional[List[Tuple[int, int, int, int]]] = None
+
+    @classmethod
+    def from_objects(cls, classrooms: Iterable[Classroom], teachers: Iterable[Teacher], courses: Iterable[Course],
+                     groups: Iterable[StudentGroup], time_slots: Iterable[TimeSlot],
+                     teachers_restrictions: Optional[Dict[int, Dict[str, Any]]] = None,
+                     fitness_function: str = "conflicts") -> 'Data':
+        # Дані з готових об'єктів; обмеження викладачів, якщо їх не передано,
+        # беруться з самих викладачів (дозволені курси та максимум годин на тиждень).
+        data = cls(fitness_function=fitness_function)
+        data._set_entities(classrooms, teachers, courses, groups, time_slots, teachers_restrictions)
+        data.build_indexes()
+        return data
+
+    @classmethod
+    def from_csv(cls, directory: str = "user_data", fitness_function: str = "conflicts",
+                 cache_dir: Optional[str] = None) -> 'Data':
+        # Кожен CSV-файл каталогу читається рівно один раз. З cache_dir дані беруться
+        # зі знімка (data_snapshot), доки вміст CSV-файлів не змінився.
+        if cache_dir is not None:
+            from data_snapshot import load_csv_cached
+            return load_csv_cached(directory, cache_dir, fitness_function=fitness_function)
+        courses = load_courses_from_csv(os.path.join(directory, CSV_FILES["courses"]))
+        return cls.from_objects(
+            classrooms=load_classrooms_from_csv(os.path.join(directory, CSV_FILES["classrooms"])),
+            teachers=load_teachers_from_csv(os.path.join(directory, CSV_FILES["teachers"])),
+            courses=courses,
+            groups=load_groups_from_csv(os.path.join(directory, CSV_FILES["groups"]), courses),
+            time_slots=load_time_slots_from_csv(os.path.join(directory, CSV_FILES["time_slots"])),
+            fitness_function=fitness_function,
+        )
+
+    @classmethod
+    def from_sqlite(cls, database_path: str, fitness_function: str = "conflicts") -> 'Data':
+        # Імпорт відкладено: database_utils сам імпортує Data.
+        from db_and_export.database_utils import import_data_from_db
+        return import_data_from_db(database_path, fitness_function=fitness_function)
+
+    def _set_entities(self, classrooms: Iterable[Classroom], teachers: Iterable[Teacher], courses: Iterable[Course],
+                      groups: Iterable[StudentGroup], time_slots: Iterable[TimeSlot],
+                      teachers_restrictions: Optional[Dict[int, Dict[str, Any]]] = None) -> None:
+        # Заповнює сутності без побудови індексів.
+        self.classrooms = list(classrooms)
+        self.teachers = list(teachers)
+        self.courses = list(courses)
+        self.groups = list(groups)
+        self.time_slots = list(time_slots)
         self.number_of_classes = sum(len(group.courses) for group in self.groups)
-        self.teachers_restrictions = load_teacher_constraints_from_csv(
-            'user_data/teachers.csv')  # Завантаження обмежень
+        if teachers_restrictions is None:
+            teachers_restrictions = {
+                teacher.id: {"allowed_courses": list(teacher.courses), "max_hours_per_week": teacher.max_hours_per_week}
+                for teacher in self.teachers
+            }
+        self.teachers_restrictions = teachers_restrictions
+
+    def get_required_sessions(self, course: Course) -> int:
+        if course.course_type == "lection":
+            return 2
+        elif course.course_type == "lab":
+            return 1
+        else:
+            return 1
+
+    def build_indexes(self) -> None:
+        # Будує розкладку занять і шар індексів; викликається після кожного (пере)завантаження даних.
+        self.build_session_layout()
+        self.index = DataIndex(self)
+
+    def set_reference_plan(self, sessions: Optional[List[Tuple[int, int, int, int]]]) -> None:
+        # sessions — заняття (розкладка, викладач, аудиторія, слот), відхилення від яких штрафує
+        # компонент фітнесу "deviation"; None вимикає штраф. Шар індексів перебудовується.
+        self.reference_plan = None if sessions is None else [tuple(session) for session in sessions]
+        self.build_indexes()
+
+    def build_session_layout(self) -> None:
+        # Будує один раз відображення "заняття -> (курс, група)".
+        # Геном розкладу зберігає лише індекс запису цієї розкладки,
+        # а також індекси викладача, аудиторії та часового слоту.
+        course_index = {course.number: idx for idx, course in enumerate(self.courses)}
+        layout_index = {}
+        self.session_layout = []
+        self.initial_layout = array('H')
+
+        for group_idx, group in enumerate(self.groups):
+            for course in group.courses:
+                key = (course_index[course.number], group_idx)
+                if key not in layout_index:
+                    layout_index[key] = len(self.session_layout)
+                    self.session_layout.append(key)
+                for _ in range(self.get_required_sessions(course)):
+                    self.initial_layout.append(layout_index[key])
 
     def create_classrooms(self) -> List[Classroom]:
         return [
@@ -0,0 +1,148 @@
+#data_index.py
+
+from typing import Any, Dict, Tuple
+
+BALANCE_DAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday")
+GAP_THRESHOLD_MINUTES = 95  # A break longer than this between two sessions of one day is a "gap"
+
+
+def time_to_minutes(time_str: str) -> int:
+    """Converts the start of a "HH:MM - HH:MM" time range to minutes since midnight."""
+    start_time = time_str.split(' - ')[0]
+    hours, minutes = map(int, start_time.split(':'))
+    return hours * 60 + minutes
+
+
+class DataIndex:
+    """
+    Immutable, integer-indexed view of the static facts in Data.
+
+    Built once after the data is loaded so that fitness and mutation code
+    never parses time strings, scans teacher course lists or filters sessions
+    by group on the hot path. All indices refer to positions in data.groups,
+    data.teachers, data.classrooms, data.time_slots, data.courses and
+    data.session_layout.
+    """
+
+    def __init__(self, data: Any):
+        # Path of the data snapshot the index is mapped from (see from_fields), None when built here
+        self.snapshot_path = None
+        self.num_groups = len(data.groups)
+        self.num_teachers = len(data.teachers)
+        self.num_classrooms = len(data.classrooms)
+        self.num_time_slots = len(data.time_slots)
+        self.num_courses = len(data.courses)
+        self.num_layouts = len(data.session_layout)
+
+        # Session layout: layout entry -> course / group index
+        self.layout_courses: Tuple[int, ...] = tuple(course_idx for course_idx, _ in data.session_layout)
+        self.layout_groups: Tuple[int, ...] = tuple(group_idx for _, group_idx in data.session_layout)
+
+        # Time slots: slot -> (day index, start minute, order within the day)
+        days = []
+        for time_slot in data.time_slots:
+            if time_slot.day not in days:
+                days.append(time_slot.day)
+        self.days: Tuple[str, ...] = tuple(days)
+        self.num_days = len(days)
+        self.slot_days: Tuple[int, ...] = tuple(days.index(time_slot.day) for time_slot in data.time_slots)
+        self.slot_minutes: Tuple[int, ...] = tuple(time_to_minutes(time_slot.time) for time_slot in data.time_slots)
+        self.day_slots: Tuple[Tuple[int, ...], ...] = tuple(
+            tuple(sorted((slot_idx for slot_idx, day in enumerate(self.slot_days) if day == day_idx),
+                         key=self.slot_minutes.__getitem__))
+            for day_idx in range(self.num_days)
+        )
+        slot_orders = [0] * self.num_time_slots
+        for slots in self.day_slots:
+            for order, slot_idx in enumerate(slots):
+                slot_orders[slot_idx] = order
+        self.slot_orders: Tuple[int, ...] = tuple(slot_orders)
+        self.slot_balance_days: Tuple[int, ...] = tuple(
+            BALANCE_DAYS.index(time_slot.day) if time_slot.day in BALANCE_DAYS else -1
+            for time_slot in data.time_slots
+        )
+
+        # Room capacity vs group size: over_capacity[group][classroom] and the rooms that fit each group
+        self.over_capacity: Tuple[Tuple[bool, ...], ...] = tuple(
+            tuple(group.num_students > classroom.seating_capacity for classroom in data.classrooms)
+            for group in data.groups
+        )
+        self.fitting_classrooms: Tuple[Tuple[int, ...], ...] = tuple(
+            tuple(classroom_idx for classroom_idx, over in enumerate(row) if not over)
+            for row in self.over_capacity
+        )
+
+        # Required sessions per (course, group) layout entry; a course listed twice for a group counts twice
+        course_index = {course.number: idx for idx, course in enumerate(data.courses)}
+        layout_index = {key: idx for idx, key in enumerate(data.session_layout)}
+        required_hours = [0] * self.num_layouts
+        required_weight = [0] * self.num_layouts
+        for group_idx, group in enumerate(data.groups):
+            for course in group.courses:
+                layout_idx = layout_index[(course_index[course.number], group_idx)]
+                required_hours[layout_idx] = course.hours_per_week
+                required_weight[layout_idx] += 1
+        self.required_hours: Tuple[int, ...] = tuple(required_hours)
+        self.required_weight: Tuple[int, ...] = tuple(required_weight)
+
+        # Teacher restrictions: teacher x course allowed bitmap and weekly load limit
+        restricted = [False] * self.num_teachers
+        max_hours = [0] * self.num_teachers
+        allowed_courses = [0] * self.num_teachers
+        for teacher_idx, teacher in enumerate(data.teachers):
+            restrictions = data.teachers_restrictions.get(teacher.id)
+            if restrictions is None:
+                continue
+            restricted[teacher_idx] = True
+            max_hours[teacher_idx] = restrictions["max_hours_per_week"]
+            for course_number in restrictions["allowed_courses"]:
+                if course_number in course_index:
+                    allowed_courses[teacher_idx] |= 1 << course_index[course_number]
+        self.restricted: Tuple[bool, ...] = tuple(restricted)
+        self.max_hours: Tuple[int, ...] = tuple(max_hours)
+        self.allowed_courses: Tuple[int, ...] = tuple(allowed_courses)
+        self.qualified_teachers: Tuple[Tuple[int, ...], ...] = tuple(
+            tuple(teacher_idx for teacher_idx in range(self.num_teachers) if self.is_allowed(teacher_idx, course_idx))
+            for course_idx in range(self.num_courses)
+        )
+
+        # Reference plan of a re-planning run: how often every exact assignment occurs in it
+        reference_counts = {}
+        for session in data.reference_plan or ():
+            key = self.assignment_key(*session)
+            reference_counts[key] = reference_counts.get(key, 0) + 1
+        self.reference_counts: Dict[int, int] = reference_counts
+        self.reference_total = sum(reference_counts.values())
+
+    @classmethod
+    def from_fields(cls, fields: Dict[str, Any]) -> 'DataIndex':
+        """
+        Index from precompiled fields (see data_snapshot), without recomputing
+        anything. Indexes with a snapshot_path are pickled as that path and
+        mapped again by the receiving process instead of being copied.
+        """
+        index = cls.__new__(cls)
+        index.__dict__.update(fields)
+        return index
+
+    def __reduce_ex__(self, protocol: int):
+        if self.snapshot_path is None:
+            return super().__reduce_ex__(protocol)
+        return _map_snapshot_index, (self.snapshot_path,)
+
+    def assignment_key(self, layout_idx: int, teacher_idx: int, classroom_idx: int, time_slot_idx: int) -> int:
+        """One integer for an exact (layout entry, teacher, classroom, slot) assignment."""
+        return ((layout_idx * self.num_teachers + teacher_idx) * self.num_classrooms
+                + classroom_idx) * self.num_time_slots + time_slot_idx
+
+    def is_allowed(self, teacher_idx: int, course_idx: int) -> bool:
+        """True if the teacher may teach the course (teachers without restrictions may teach anything)."""
+        return not self.restricted[teacher_idx] or bool(self.allowed_courses[teacher_idx] >> course_idx & 1)
+
+    def is_over_capacity(self, group_idx: int, classroom_idx: int) -> bool:
+        return self.over_capacity[group_idx][classroom_idx]
+
+
+def _map_snapshot_index(path: str) -> DataIndex:
+    from data_snapshot import read_snapshot_index  # data_snapshot imports this module
+    return read_snapshot_index(path)
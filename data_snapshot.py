@@ -0,0 +1,313 @@
+#data_snapshot.py
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import zlib
+from array import array
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from data import CSV_FILES, Data
+from data_index import DataIndex
+from models import Classroom, Course, StudentGroup, Teacher, TimeSlot
+
+MAGIC = b"TTDS"
+FORMAT_VERSION = 1  # Bump whenever Data.build_indexes or DataIndex compile the data differently
+SNAPSHOT_SUFFIX = ".ttdata"
+# magic, format version, length of the JSON header; the array sections follow, aligned to _ALIGNMENT
+_PREAMBLE = struct.Struct("<4sHI")
+_ALIGNMENT = 8
+
+
+class SnapshotError(ValueError):
+    """The snapshot file is damaged, stale or was written on a machine with another byte order."""
+
+
+def source_digest(directory: str) -> str:
+    """Hash of the contents of the CSV files Data.from_csv reads from directory (and of the snapshot format)."""
+    digest = hashlib.sha256(MAGIC + struct.pack("<H", FORMAT_VERSION))
+    for file_name in CSV_FILES.values():
+        with open(os.path.join(directory, file_name), "rb") as file:
+            content = file.read()
+        digest.update(f"{file_name}:{len(content)}:".encode("utf-8"))
+        digest.update(content)
+    return digest.hexdigest()
+
+
+def load_csv_cached(directory: str, cache_dir: str, fitness_function: str = "conflicts") -> Data:
+    """
+    Data.from_csv(directory) through a snapshot in cache_dir.
+
+    The snapshot is named after source_digest(directory), so it is reused
+    exactly as long as the CSV files are unchanged. A missing or unreadable
+    snapshot is written from the parsed files; failing to write it only
+    costs the next run the parsing again.
+    """
+    digest = source_digest(directory)
+    path = os.path.join(cache_dir, digest + SNAPSHOT_SUFFIX)
+    if os.path.exists(path):
+        try:
+            return read_snapshot(path, fitness_function=fitness_function, digest=digest)
+        except SnapshotError:
+            pass  # Written again below
+    data = Data.from_csv(directory, fitness_function=fitness_function)
+    try:
+        write_snapshot(path, data, digest)
+    except OSError:
+        pass
+    return data
+
+
+def _csr(rows: Iterable[Iterable[int]]) -> Tuple[array, array]:
+    """Rows of integers as (offsets, values): row i is values[offsets[i]:offsets[i + 1]]."""
+    offsets = array('I', [0])
+    values = array('i')
+    for row in rows:
+        values.extend(row)
+        offsets.append(len(values))
+    return offsets, values
+
+
+def _csr_rows(offsets: Sequence[int], values: Sequence[int]) -> List[Sequence[int]]:
+    return [values[offsets[row]:offsets[row + 1]] for row in range(len(offsets) - 1)]
+
+
+def _bit_indices(bits: int) -> List[int]:
+    return [position for position, bit in enumerate(reversed(bin(bits)[2:])) if bit == "1"]
+
+
+def write_snapshot(path: str, data: Data, digest: str) -> int:
+    """
+    Writes the compiled problem in data atomically and returns the size of the file in bytes.
+
+    The file holds the entities as integer columns with their names interned
+    into one string table, the session layout and every field of the data
+    index as flat native-endian arrays. data must not carry a reference plan.
+    """
+    if data.reference_plan is not None:
+        raise ValueError("Snapshots hold the problem data only, not a reference plan.")
+    index = data.index
+    course_index = {course.number: idx for idx, course in enumerate(data.courses)}
+    strings: Dict[str, int] = {}
+
+    def intern(text: str) -> int:
+        return strings.setdefault(text, len(strings))
+
+    sections: Dict[str, array] = {
+        "classroom_numbers": array('i', (intern(classroom.number) for classroom in data.classrooms)),
+        "classroom_capacities": array('i', (classroom.seating_capacity for classroom in data.classrooms)),
+        "teacher_ids": array('i', (teacher.id for teacher in data.teachers)),
+        "teacher_names": array('i', (intern(teacher.name) for teacher in data.teachers)),
+        "teacher_max_hours": array('i', (teacher.max_hours_per_week for teacher in data.teachers)),
+        "course_numbers": array('i', (course.number for course in data.courses)),
+        "course_names": array('i', (intern(course.name) for course in data.courses)),
+        "course_max_students": array('i', (course.max_number_of_students for course in data.courses)),
+        "course_types": array('i', (intern(course.course_type) for course in data.courses)),
+        "course_hours": array('i', (course.hours_per_week for course in data.courses)),
+        "group_ids": array('i', (group.id for group in data.groups)),
+        "group_names": array('i', (intern(group.name) for group in data.groups)),
+        "group_sizes": array('i', (group.num_students for group in data.groups)),
+        "time_slot_ids": array('i', (intern(time_slot.id) for time_slot in data.time_slots)),
+        "time_slot_times": array('i', (intern(time_slot.time) for time_slot in data.time_slots)),
+        "time_slot_days": array('i', (intern(time_slot.day) for time_slot in data.time_slots)),
+        "initial_layout": data.initial_layout,
+        "layout_courses": array('i', index.layout_courses),
+        "layout_groups": array('i', index.layout_groups),
+        "days": array('i', (intern(day) for day in index.days)),
+        "slot_days": array('i', index.slot_days),
+        "slot_minutes": array('i', index.slot_minutes),
+        "slot_orders": array('i', index.slot_orders),
+        "slot_balance_days": array('i', index.slot_balance_days),
+        "over_capacity": array('B', (over for row in index.over_capacity for over in row)),
+        "required_hours": array('i', index.required_hours),
+        "required_weight": array('i', index.required_weight),
+        "restricted": array('B', index.restricted),
+        "max_hours": array('i', index.max_hours),
+    }
+    for name, rows in (
+            ("teacher_courses", (teacher.courses for teacher in data.teachers)),
+            ("group_courses", ((course_index[course.number] for course in group.courses) for group in data.groups)),
+            ("day_slots", index.day_slots),
+            ("fitting_classrooms", index.fitting_classrooms),
+            ("allowed_courses", (_bit_indices(bits) for bits in index.allowed_courses)),
+            ("qualified_teachers", index.qualified_teachers)):
+        sections[name + "_offsets"], sections[name] = _csr(rows)
+    sections["strings"] = array('B', "\0".join(strings).encode("utf-8"))
+
+    body = bytearray()
+    layout = {}
+    for name, values in sections.items():
+        body.extend(bytes(-len(body) % _ALIGNMENT))
+        layout[name] = [values.typecode, len(body), len(values)]
+        body.extend(values.tobytes())
+    header = {
+        "digest": digest,
+        "byteorder": sys.byteorder,
+        "counts": {"groups": index.num_groups, "teachers": index.num_teachers, "classrooms": index.num_classrooms,
+                   "time_slots": index.num_time_slots, "courses": index.num_courses, "layouts": index.num_layouts},
+        "sections": layout,
+        "crc": zlib.crc32(body),
+    }
+    header_bytes = json.dumps(header).encode("utf-8")
+    preamble = _PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_bytes)) + header_bytes
+    payload = preamble + bytes(-len(preamble) % _ALIGNMENT) + body
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    descriptor, temporary_path = tempfile.mkstemp(prefix=".snapshot-", dir=directory)
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(payload)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, path)
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+    return len(payload)
+
+
+def _map_sections(path: str, digest: Optional[str] = None) -> Tuple[Dict[str, Any], Callable[[str], memoryview]]:
+    """Maps the snapshot read-only and returns its header and a function giving the array of a section."""
+    try:
+        with open(path, "rb") as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:  # An empty file cannot be mapped
+        raise SnapshotError(f"Snapshot {path} is empty.") from None
+    view = memoryview(buffer)
+    if len(view) < _PREAMBLE.size:
+        raise SnapshotError(f"Snapshot {path} is truncated.")
+    magic, version, header_length = _PREAMBLE.unpack_from(view)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise SnapshotError(f"{path} is not a version {FORMAT_VERSION} data snapshot.")
+    try:
+        header = json.loads(bytes(view[_PREAMBLE.size:_PREAMBLE.size + header_length]).decode("utf-8"))
+    except ValueError:
+        raise SnapshotError(f"Snapshot {path} has a damaged header.") from None
+    if digest is not None and header["digest"] != digest:
+        raise SnapshotError(f"Snapshot {path} was written for other source files.")
+    if header["byteorder"] != sys.byteorder:
+        raise SnapshotError(f"Snapshot {path} was written on a {header['byteorder']}-endian machine.")
+    start = _PREAMBLE.size + header_length
+    start += -start % _ALIGNMENT
+    body = view[start:]
+    if zlib.crc32(body) != header["crc"]:
+        raise SnapshotError(f"Snapshot {path} is damaged (checksum mismatch).")
+
+    def section(name: str) -> memoryview:
+        typecode, offset, count = header["sections"][name]
+        return body[offset:offset + count * array(typecode).itemsize].cast(typecode)
+
+    return header, section
+
+
+def _index_fields(path: str, header: Dict[str, Any], section: Callable[[str], memoryview],
+                  strings: List[str]) -> Dict[str, Any]:
+    """
+    Fields of DataIndex from the mapped sections. Small per-entity columns
+    become tuples; the group x classroom tables (over_capacity and
+    fitting_classrooms) stay views into the mapping, one per group.
+    """
+    counts = header["counts"]
+    num_classrooms = counts["classrooms"]
+    over_capacity = section("over_capacity").cast('?')
+    allowed_courses = []
+    for courses in _csr_rows(section("allowed_courses_offsets"), section("allowed_courses")):
+        bits = 0
+        for course_idx in courses:
+            bits |= 1 << course_idx
+        allowed_courses.append(bits)
+    return {
+        "snapshot_path": path,
+        "num_groups": counts["groups"],
+        "num_teachers": counts["teachers"],
+        "num_classrooms": num_classrooms,
+        "num_time_slots": counts["time_slots"],
+        "num_courses": counts["courses"],
+        "num_layouts": counts["layouts"],
+        "layout_courses": tuple(section("layout_courses")),
+        "layout_groups": tuple(section("layout_groups")),
+        "days": tuple(strings[day] for day in section("days")),
+        "num_days": len(section("days")),
+        "slot_days": tuple(section("slot_days")),
+        "slot_minutes": tuple(section("slot_minutes")),
+        "day_slots": tuple(tuple(row) for row in _csr_rows(section("day_slots_offsets"), section("day_slots"))),
+        "slot_orders": tuple(section("slot_orders")),
+        "slot_balance_days": tuple(section("slot_balance_days")),
+        "over_capacity": tuple(over_capacity[group_idx * num_classrooms:(group_idx + 1) * num_classrooms]
+                               for group_idx in range(counts["groups"])),
+        "fitting_classrooms": tuple(_csr_rows(section("fitting_classrooms_offsets"), section("fitting_classrooms"))),
+        "required_hours": tuple(section("required_hours")),
+        "required_weight": tuple(section("required_weight")),
+        "restricted": tuple(bool(restricted) for restricted in section("restricted")),
+        "max_hours": tuple(section("max_hours")),
+        "allowed_courses": tuple(allowed_courses),
+        "qualified_teachers": tuple(tuple(row) for row in _csr_rows(section("qualified_teachers_offsets"),
+                                                                    section("qualified_teachers"))),
+        "reference_counts": {},
+        "reference_total": 0,
+    }
+
+
+def _strings(section: Callable[[str], memoryview]) -> List[str]:
+    return [sys.intern(text) for text in section("strings").tobytes().decode("utf-8").split("\0")]
+
+
+def read_snapshot_index(path: str) -> DataIndex:
+    """Maps only the data index of the snapshot (used when a mapped index is unpickled in another process)."""
+    header, section = _map_sections(path)
+    return DataIndex.from_fields(_index_fields(path, header, section, _strings(section)))
+
+
+def read_snapshot(path: str, fitness_function: str = "conflicts", digest: Optional[str] = None) -> Data:
+    """
+    Data from a snapshot, without parsing or recompiling anything.
+
+    The entities are rebuilt from their columns (names come from the shared
+    string table, so equal names are one object) and the data index is
+    mapped. Raises SnapshotError when the file is damaged or, with digest,
+    when it was written for other source files.
+    """
+    header, section = _map_sections(path, digest)
+    strings = _strings(section)
+
+    courses = [
+        Course(number=number, name=strings[name], max_number_of_students=max_students,
+               course_type=strings[course_type], hours_per_week=hours)
+        for number, name, max_students, course_type, hours in zip(
+            section("course_numbers"), section("course_names"), section("course_max_students"),
+            section("course_types"), section("course_hours"))
+    ]
+    teachers = [
+        Teacher(id=teacher_id, name=strings[name], courses=courses_taught.tolist(), max_hours_per_week=max_hours)
+        for teacher_id, name, max_hours, courses_taught in zip(
+            section("teacher_ids"), section("teacher_names"), section("teacher_max_hours"),
+            _csr_rows(section("teacher_courses_offsets"), section("teacher_courses")))
+    ]
+    groups = [
+        StudentGroup(id=group_id, name=strings[name], num_students=size,
+                     courses=[courses[course_idx] for course_idx in group_courses])
+        for group_id, name, size, group_courses in zip(
+            section("group_ids"), section("group_names"), section("group_sizes"),
+            _csr_rows(section("group_courses_offsets"), section("group_courses")))
+    ]
+    classrooms = [
+        Classroom(number=strings[number], seating_capacity=capacity)
+        for number, capacity in zip(section("classroom_numbers"), section("classroom_capacities"))
+    ]
+    time_slots = [
+        TimeSlot(id=strings[slot_id], time=strings[time], day=strings[day])
+        for slot_id, time, day in zip(section("time_slot_ids"), section("time_slot_times"), section("time_slot_days"))
+    ]
+
+    data = Data(fitness_function=fitness_function)
+    data._set_entities(classrooms, teachers, courses, groups, time_slots)
+    data.index = DataIndex.from_fields(_index_fields(path, header, section, strings))
+    data.session_layout = list(zip(data.index.layout_courses, data.index.layout_groups))
+    data.initial_layout = array('H', section("initial_layout").tobytes())
+    return data
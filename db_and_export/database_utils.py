@@ -1,121 +1,204 @@
+import json
+import os
 import sqlite3
+import time
+from typing import Any, Dict, Iterator, List, Optional
 from models import Classroom, Teacher, Course, StudentGroup, TimeSlot
 from timetable import Timetable
 from data import Data
 
+# Pragmas applied to every connection: write-ahead logging, fewer fsyncs, in-memory temporary tables
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -65536",  # 64 MiB
+    "PRAGMA mmap_size = 268435456",  # 256 MiB
+)
+FETCH_SIZE = 1000  # Rows fetched at a time when streaming a table
 
-def import_data_from_db(database_path: str) -> Data:
+_connections: Dict[str, sqlite3.Connection] = {}
+
+
+def get_connection(database_path: str) -> sqlite3.Connection:
+    """
+    Returns the shared connection to the database, opening and configuring it on first use.
+
+    :param database_path: Path to the SQLite db_and_export.
+    :return: Connection reused by every function of this module.
+    """
+    key = os.path.abspath(database_path)
+    connection = _connections.get(key)
+    if connection is None:
+        connection = sqlite3.connect(database_path)
+        for pragma in CONNECTION_PRAGMAS:
+            connection.execute(pragma)
+        _connections[key] = connection
+    return connection
+
+
+def close_connection(database_path: Optional[str] = None) -> None:
+    """
+    Closes the shared connection to the database (all of them if no path is given).
+
+    :param database_path: Path to the SQLite db_and_export.
+    """
+    keys = list(_connections) if database_path is None else [os.path.abspath(database_path)]
+    for key in keys:
+        connection = _connections.pop(key, None)
+        if connection is not None:
+            connection.close()
+
+
+def stream_rows(connection: sqlite3.Connection, query: str, parameters: tuple = ()) -> Iterator[tuple]:
+    """
+    Yields the rows of a query FETCH_SIZE at a time instead of loading the whole result.
+
+    :param connection: Open connection.
+    :param query: SELECT statement.
+    :param parameters: Query parameters.
+    """
+    cursor = connection.execute(query, parameters)
+    cursor.arraysize = FETCH_SIZE
+    try:
+        while True:
+            rows = cursor.fetchmany()
+            if not rows:
+                break
+            yield from rows
+    finally:
+        cursor.close()
+
+
+def import_data_from_db(database_path: str, fitness_function: str = "conflicts") -> Data:
     """
     Imports data from an external db_and_export and creates a Data object.
 
+    Rows are read in insertion order, so the order of the entities (and with
+    it the gene indices of timetables) matches the exported Data. Teacher
+    restrictions are rebuilt from the teachers and their qualifications.
+
     :param database_path: Path to the SQLite db_and_export.
+    :param fitness_function: Fitness function of the Data object.
     :return: Data object with imported data.
     """
-    connection = sqlite3.connect(database_path)
-    cursor = connection.cursor()
+    connection = get_connection(database_path)
 
     # Import classrooms
     classrooms = [
         Classroom(number=row[0], seating_capacity=row[1])
-        for row in cursor.execute("SELECT number, seating_capacity FROM classrooms")
+        for row in stream_rows(connection, "SELECT number, seating_capacity FROM classrooms ORDER BY rowid")
     ]
 
-    # Import teachers with consideration of max_hours_per_week
-    teachers = [
-        Teacher(
-            id=row[0],
-            name=row[1],
-            courses=[int(course) for course in row[2].split(',')],
-            max_hours_per_week=row[3]
-        )
-        for row in cursor.execute("SELECT id, name, courses, max_hours_per_week FROM teachers")
-    ]
+    # Import teachers with their qualifications (teacher_courses)
+    teachers = _load_teachers(connection)
 
     # Import courses
     courses = [
         Course(number=row[0], name=row[1], max_number_of_students=row[2], course_type=row[3], hours_per_week = row[4])
-        for row in cursor.execute("SELECT number, name, max_students, course_type, hours_per_week FROM courses")
+        for row in stream_rows(connection, """
+            SELECT number, name, max_students, course_type, hours_per_week FROM courses ORDER BY rowid""")
     ]
 
-    # Import student groups
-    groups = [
-        StudentGroup(id=row[0], name=row[1], num_students=row[2],
-                     courses=[courses[int(course_num) - 1] for course_num in row[3].split(',')])
-        for row in cursor.execute("SELECT id, name, num_students, courses FROM student_groups")
-    ]
+    # Import student groups with their courses (group_courses), resolved by course number
+    course_by_number = {course.number: course for course in courses}
+    groups = []
+    for group_id, name, num_students, course_number in stream_rows(connection, """
+            SELECT g.id, g.name, g.num_students, gc.course_number
+            FROM student_groups g LEFT JOIN group_courses gc ON gc.group_id = g.id
+            ORDER BY g.rowid, gc.position"""):
+        if not groups or groups[-1].id != group_id:
+            groups.append(StudentGroup(id=group_id, name=name, num_students=num_students, courses=[]))
+        if course_number is not None:
+            groups[-1].courses.append(course_by_number[course_number])
 
     # Import available time slots
     time_slots = [
         TimeSlot(id=row[0], time=row[1], day=row[2])
-        for row in cursor.execute("SELECT id, time, day FROM time_slots")
+        for row in stream_rows(connection, "SELECT id, time, day FROM time_slots ORDER BY rowid")
     ]
 
-    connection.close()
-
     # Create a Data object with imported data
-    data = Data()
-    data.classrooms = classrooms
-    data.teachers = teachers
-    data.courses = courses
-    data.groups = groups
-    data.time_slots = time_slots
-    data.number_of_classes = sum(len(group.courses) for group in data.groups)
+    return Data.from_objects(classrooms, teachers, courses, groups, time_slots, fitness_function=fitness_function)
 
-    return data
+
+def _load_teachers(connection: sqlite3.Connection, where: str = "", parameters: tuple = ()) -> List[Teacher]:
+    """
+    Reads teachers joined with their qualifications, one row per (teacher, course).
+
+    :param connection: Open connection.
+    :param where: Optional WHERE clause on the teachers table (alias t).
+    :param parameters: Parameters of the WHERE clause.
+    """
+    teachers = []
+    for teacher_id, name, max_hours_per_week, course_number in stream_rows(connection, f"""
+            SELECT t.id, t.name, t.max_hours_per_week, tc.course_number
+            FROM teachers t LEFT JOIN teacher_courses tc ON tc.teacher_id = t.id
+            {where}
+            ORDER BY t.rowid, tc.rowid""", parameters):
+        if not teachers or teachers[-1].id != teacher_id:
+            teachers.append(Teacher(id=teacher_id, name=name, courses=[], max_hours_per_week=max_hours_per_week))
+        if course_number is not None:
+            teachers[-1].courses.append(course_number)
+    return teachers
 
 
 def export_data_to_db(data: Data, database_path: str) -> None:
-    connection = sqlite3.connect(database_path)
-    cursor = connection.cursor()
+    """
+    Replaces the contents of the data tables with data in one transaction.
 
-    # Clear tables before populating
-    cursor.execute("DELETE FROM classrooms")
-    cursor.execute("DELETE FROM teachers")
-    cursor.execute("DELETE FROM courses")
-    cursor.execute("DELETE FROM student_groups")
-    cursor.execute("DELETE FROM time_slots")
+    :param data: Data object to export.
+    :param database_path: Path to the SQLite db_and_export.
+    """
+    connection = get_connection(database_path)
+
+    with connection:
+        # Clear tables before populating
+        for table in ("teacher_courses", "group_courses", "classrooms", "teachers", "courses", "student_groups",
+                      "time_slots"):
+            connection.execute(f"DELETE FROM {table}")
 
-    # Export classrooms
-    for classroom in data.classrooms:
-        cursor.execute(
+        # Export classrooms
+        connection.executemany(
             "INSERT INTO classrooms (number, seating_capacity) VALUES (?, ?)",
-            (classroom.number, classroom.seating_capacity)
+            ((classroom.number, classroom.seating_capacity) for classroom in data.classrooms)
         )
 
-    # Export teachers with consideration of max_hours_per_week
-    for teacher in data.teachers:
-        courses_str = ",".join(str(course) for course in teacher.courses)
-        cursor.execute(
-            "INSERT INTO teachers (id, name, courses, max_hours_per_week) VALUES (?, ?, ?, ?)",
-            (teacher.id, teacher.name, courses_str, teacher.max_hours_per_week)
+        # Export teachers with consideration of max_hours_per_week
+        connection.executemany(
+            "INSERT INTO teachers (id, name, max_hours_per_week) VALUES (?, ?, ?)",
+            ((teacher.id, teacher.name, teacher.max_hours_per_week) for teacher in data.teachers)
+        )
+        connection.executemany(
+            "INSERT OR IGNORE INTO teacher_courses (teacher_id, course_number) VALUES (?, ?)",
+            ((teacher.id, course) for teacher in data.teachers for course in teacher.courses)
         )
 
-    # Export courses with hours_per_week
-    for course in data.courses:
-        cursor.execute(
+        # Export courses with hours_per_week
+        connection.executemany(
             "INSERT INTO courses (number, name, max_students, course_type, hours_per_week) VALUES (?, ?, ?, ?, ?)",
-            (course.number, course.name, course.max_number_of_students, course.course_type, course.hours_per_week)
+            ((course.number, course.name, course.max_number_of_students, course.course_type, course.hours_per_week)
+             for course in data.courses)
         )
 
-    # Export student groups
-    for group in data.groups:
-        courses_str = ",".join(str(course.number) for course in group.courses)
-        cursor.execute(
-            "INSERT INTO student_groups (id, name, num_students, courses) VALUES (?, ?, ?, ?)",
-            (group.id, group.name, group.num_students, courses_str)
+        # Export student groups
+        connection.executemany(
+            "INSERT INTO student_groups (id, name, num_students) VALUES (?, ?, ?)",
+            ((group.id, group.name, group.num_students) for group in data.groups)
+        )
+        connection.executemany(
+            "INSERT INTO group_courses (group_id, position, course_number) VALUES (?, ?, ?)",
+            ((group.id, position, course.number)
+             for group in data.groups for position, course in enumerate(group.courses))
         )
 
-    # Export available time slots
-    for time_slot in data.time_slots:
-        cursor.execute(
+        # Export available time slots
+        connection.executemany(
             "INSERT INTO time_slots (id, time, day) VALUES (?, ?, ?)",
-            (time_slot.id, time_slot.time, time_slot.day)
+            ((time_slot.id, time_slot.time, time_slot.day) for time_slot in data.time_slots)
         )
 
-    connection.commit()
-    connection.close()
-    print(f"Data exported to {database_path}")
-
 
 def export_timetable_to_txt(timetable: Timetable, file_path: str) -> None:
     """
@@ -174,11 +257,9 @@ def export_timetable_to_txt(timetable: Timetable, file_path: str) -> None:
         file.write(f"Fitness: {timetable.fitness}\n")
         file.write(f"Number of conflicts: {timetable.conflicts_count}\n")
 
-    print(f"Schedule exported to {file_path}")
-
 
 def create_database_schema(database_path: str) -> None:
-    connection = sqlite3.connect(database_path)
+    connection = get_connection(database_path)
     cursor = connection.cursor()
 
     # Create tables
@@ -192,7 +273,6 @@ def create_database_schema(database_path: str) -> None:
     CREATE TABLE IF NOT EXISTS teachers (
         id INTEGER PRIMARY KEY,
         name TEXT,
-        courses TEXT, -- List of course numbers that can be taught, separated by commas
         max_hours_per_week INTEGER -- Maximum number of teaching hours per week
     )
     ''')
@@ -209,8 +289,7 @@ def create_database_schema(database_path: str) -> None:
     CREATE TABLE IF NOT EXISTS student_groups (
         id INTEGER PRIMARY KEY,
         name TEXT,
-        num_students INTEGER,
-        courses TEXT -- List of course numbers for the group, separated by commas
+        num_students INTEGER
     )
     ''')
     cursor.execute('''
@@ -221,7 +300,267 @@ def create_database_schema(database_path: str) -> None:
     )
     ''')
 
+    # Qualifications of the teachers; a teacher may list courses that are not in the courses table
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS teacher_courses (
+        teacher_id INTEGER NOT NULL REFERENCES teachers (id) ON DELETE CASCADE,
+        course_number INTEGER NOT NULL,
+        PRIMARY KEY (teacher_id, course_number)
+    )
+    ''')
+    # Courses of the groups in their listed order; a course listed twice is stored twice
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS group_courses (
+        group_id INTEGER NOT NULL REFERENCES student_groups (id) ON DELETE CASCADE,
+        position INTEGER NOT NULL,
+        course_number INTEGER NOT NULL REFERENCES courses (number) ON DELETE CASCADE,
+        PRIMARY KEY (group_id, position)
+    )
+    ''')
+    _migrate_course_lists(connection)
+
+    # Run history: one row per solver run, its per-generation metrics and the sessions of its best timetable.
+    # Assignments keep stable keys (no foreign keys to the data tables, which are rewritten every run).
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS runs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        started_at TEXT, -- ISO 8601 timestamps
+        finished_at TEXT,
+        engine TEXT, -- ga, annealing, late_acceptance or islands
+        fitness_function TEXT,
+        seed TEXT, -- Decimal seed of the random stream (64-bit unsigned, too large for INTEGER)
+        parameters TEXT, -- JSON object with the solver parameters
+        generations INTEGER, -- Generations (or iterations) performed
+        best_fitness REAL,
+        best_conflicts INTEGER,
+        status TEXT -- running or finished
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS run_generations (
+        run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+        generation INTEGER NOT NULL,
+        best_fitness REAL,
+        mean_fitness REAL,
+        best_conflicts INTEGER,
+        wall_time_s REAL,
+        metrics TEXT, -- JSON object with all metrics of the generation
+        PRIMARY KEY (run_id, generation)
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS run_assignments (
+        run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+        session INTEGER NOT NULL, -- Position of the session in the timetable
+        group_name TEXT,
+        course_number INTEGER,
+        teacher_id INTEGER,
+        classroom_number TEXT,
+        time_slot_id TEXT,
+        day TEXT,
+        time TEXT,
+        PRIMARY KEY (run_id, session)
+    )
+    ''')
+
+    # Indexes for lookups by course, by name and by (day, time)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_teacher_courses_course ON teacher_courses (course_number)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_group_courses_course ON group_courses (course_number)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_student_groups_name ON student_groups (name)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_time_slots_day_time ON time_slots (day, time)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_runs_finished_at ON runs (finished_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_run_assignments_teacher ON run_assignments (teacher_id, run_id)")
+
     connection.commit()
-    connection.close()
-    print(f"Database schema created at {database_path}")
 
+
+
+
+def _migrate_course_lists(connection: sqlite3.Connection) -> None:
+    """
+    Moves the comma-separated courses columns of databases created before the
+    junction tables into teacher_courses and group_courses and drops them.
+
+    :param connection: Open connection.
+    """
+    def course_numbers(courses_str: Optional[str]) -> List[int]:
+        return [int(number) for number in (courses_str or "").split(",") if number.strip()]
+
+    if "courses" in _column_names(connection, "teachers"):
+        with connection:
+            connection.executemany(
+                "INSERT OR IGNORE INTO teacher_courses (teacher_id, course_number) VALUES (?, ?)",
+                ((teacher_id, number)
+                 for teacher_id, courses_str in list(stream_rows(connection, "SELECT id, courses FROM teachers"))
+                 for number in course_numbers(courses_str))
+            )
+            connection.execute("ALTER TABLE teachers DROP COLUMN courses")
+    if "courses" in _column_names(connection, "student_groups"):
+        with connection:
+            connection.executemany(
+                "INSERT OR IGNORE INTO group_courses (group_id, position, course_number) VALUES (?, ?, ?)",
+                ((group_id, position, number)
+                 for group_id, courses_str in list(stream_rows(connection, "SELECT id, courses FROM student_groups"))
+                 for position, number in enumerate(course_numbers(courses_str)))
+            )
+            connection.execute("ALTER TABLE student_groups DROP COLUMN courses")
+
+
+def _column_names(connection: sqlite3.Connection, table: str) -> List[str]:
+    return [row[1] for row in connection.execute(f"PRAGMA table_info({table})")]
+
+
+def teachers_for_course(database_path: str, course_number: int) -> List[Teacher]:
+    """
+    Returns the teachers qualified for a course, looked up through the teacher_courses index.
+
+    :param database_path: Path to the SQLite db_and_export.
+    :param course_number: Number of the course.
+    :return: Teachers with their full course lists.
+    """
+    return _load_teachers(
+        get_connection(database_path),
+        "WHERE t.id IN (SELECT teacher_id FROM teacher_courses WHERE course_number = ?)",
+        (course_number,)
+    )
+
+
+def _timestamp() -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%S%z")
+
+
+class RunRecorder:
+    """
+    Records one solver run in the runs, run_generations and run_assignments tables.
+
+    Works as a GenAlg observer: the metrics of every generation are buffered
+    and written with executemany at the end of the run (finish), or every
+    flush_every generations when streaming is enabled, so a crashed run still
+    leaves its history behind.
+    """
+
+    def __init__(self, database_path: str, engine: str, fitness_function: str, seed: Optional[int] = None,
+                 parameters: Optional[Dict[str, Any]] = None, stream: bool = False, flush_every: int = 10):
+        self.database_path = database_path
+        self.stream = stream
+        self.flush_every = max(flush_every, 1)
+        self._pending: List[tuple] = []
+        connection = get_connection(database_path)
+        with connection:
+            self.run_id = connection.execute(
+                "INSERT INTO runs (started_at, engine, fitness_function, seed, parameters, status) "
+                "VALUES (?, ?, ?, ?, ?, 'running')",
+                (_timestamp(), engine, fitness_function, None if seed is None else str(seed),
+                 json.dumps(parameters or {}))
+            ).lastrowid
+
+    def on_generation(self, metrics: Dict[str, Any]) -> None:
+        fitness = metrics.get("fitness", {})
+        self._pending.append((
+            self.run_id, metrics["generation"], fitness.get("best"), fitness.get("mean"),
+            metrics.get("best_conflicts"), metrics.get("wall_time_s"), json.dumps(metrics)
+        ))
+        if self.stream and len(self._pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes the buffered generation metrics in one transaction."""
+        if not self._pending:
+            return
+        connection = get_connection(self.database_path)
+        with connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO run_generations "
+                "(run_id, generation, best_fitness, mean_fitness, best_conflicts, wall_time_s, metrics) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                self._pending
+            )
+        self._pending = []
+
+    def finish(self, timetable: Timetable, generations: int) -> int:
+        """Writes the remaining metrics and the sessions of the best timetable and closes the run; returns its id."""
+        self.flush()
+        connection = get_connection(self.database_path)
+        with connection:
+            connection.executemany(
+                "INSERT INTO run_assignments (run_id, session, group_name, course_number, teacher_id, "
+                "classroom_number, time_slot_id, day, time) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                ((self.run_id, number, session.student_group.name, session.course.number, session.teacher.id,
+                  str(session.classroom.number), session.time_slot.id, session.time_slot.day, session.time_slot.time)
+                 for number, session in enumerate(timetable.study_sessions))
+            )
+            connection.execute(
+                "UPDATE runs SET finished_at = ?, generations = ?, best_fitness = ?, best_conflicts = ?, "
+                "status = 'finished' WHERE id = ?",
+                (_timestamp(), generations, timetable.fitness, timetable.conflicts_count, self.run_id)
+            )
+        return self.run_id
+
+
+def latest_run_id(database_path: str) -> Optional[int]:
+    """
+    Returns the id of the most recent finished run, or None if there is none.
+
+    :param database_path: Path to the SQLite db_and_export.
+    """
+    row = get_connection(database_path).execute(
+        "SELECT id FROM runs WHERE status = 'finished' ORDER BY id DESC LIMIT 1"
+    ).fetchone()
+    return None if row is None else row[0]
+
+
+def load_run_assignments(database_path: str, run_id: Optional[int] = None) -> List[tuple]:
+    """
+    Returns the sessions of a stored run (the latest finished one by default) in timetable order.
+
+    :param database_path: Path to the SQLite db_and_export.
+    :param run_id: Id of the run.
+    :return: Rows (group name, course number, classroom number, teacher id, day, time).
+    """
+    if run_id is None:
+        run_id = latest_run_id(database_path)
+        if run_id is None:
+            raise ValueError(f"No finished runs are stored in {database_path}.")
+    rows = list(stream_rows(
+        get_connection(database_path),
+        "SELECT group_name, course_number, classroom_number, teacher_id, day, time "
+        "FROM run_assignments WHERE run_id = ? ORDER BY session",
+        (run_id,)
+    ))
+    if not rows:
+        raise ValueError(f"Run {run_id} has no stored timetable in {database_path}.")
+    return rows
+
+
+def load_run_timetable(database_path: str, data: Data, run_id: Optional[int] = None,
+                       fitness_function: Optional[str] = None) -> Timetable:
+    """
+    Rebuilds the timetable of a stored run (the latest finished one by default) on data.
+
+    Every session must still exist in data; to re-plan after the data has
+    changed, map the run with warm_start.map_plan instead.
+
+    :param database_path: Path to the SQLite db_and_export.
+    :param data: Data the timetable refers to.
+    :param run_id: Id of the run.
+    :param fitness_function: Fitness function of the timetable (data.fitness_function by default).
+    :return: Timetable with the stored sessions.
+    """
+    course_index = {course.number: idx for idx, course in enumerate(data.courses)}
+    group_index = {group.name: idx for idx, group in enumerate(data.groups)}
+    layout_index = {key: idx for idx, key in enumerate(data.session_layout)}
+    teacher_index = {teacher.id: idx for idx, teacher in enumerate(data.teachers)}
+    classroom_index = {str(classroom.number): idx for idx, classroom in enumerate(data.classrooms)}
+    slot_index = {(time_slot.day, time_slot.time): idx for idx, time_slot in enumerate(data.time_slots)}
+
+    timetable = Timetable(data=data, fitness_function=fitness_function or data.fitness_function)
+    for group_name, course_number, classroom_number, teacher_id, day, time_range in load_run_assignments(
+            database_path, run_id):
+        try:
+            timetable.add_session(layout_index[(course_index[course_number], group_index[group_name])],
+                                  teacher_index[teacher_id], classroom_index[classroom_number],
+                                  slot_index[(day, time_range)])
+        except KeyError as error:
+            raise ValueError(f"The stored session of {group_name}, course {course_number} refers to {error}, "
+                             f"which is not in the data; use warm_start.map_plan to re-plan.") from None
+    return timetable
@@ -32,7 +32,7 @@ def check_database_contents(database_path: str) -> None:
 
     :param database_path: Path to the SQLite db_and_export.
     """
-    tables = ['classrooms', 'teachers', 'courses', 'student_groups', 'time_slots']
+    tables = ['classrooms', 'teachers', 'teacher_courses', 'courses', 'student_groups', 'group_courses', 'time_slots']
     for table in tables:
         print_table_data(database_path, table)
 
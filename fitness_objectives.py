@@ -0,0 +1,108 @@
+#fitness_objectives.py
+
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+
+# Penalty components every evaluator (Timetable, ScoreCounters, BatchFitnessEvaluator) knows how to compute
+# deviation counts the sessions of data.reference_plan that the timetable no longer contains unchanged
+COMPONENTS = ("conflicts", "gaps", "hours", "teacher_constraints", "balance", "deviation")
+
+
+class FitnessObjective:
+    """
+    A fitness function built from weighted penalty components.
+
+    fitness = 1 / (1 + sum(weights[c] * c)) - sum(penalties[c] * c)
+
+    The objective declares which components it depends on, so evaluators only
+    run the kernels it needs. The sum of the conflict_components is reported
+    as the timetable's conflicts count; objectives without conflict
+    components leave that count untouched. score() works element-wise, so the
+    component values may be plain numbers or NumPy arrays.
+    """
+
+    def __init__(self, name: str, weights: Mapping[str, float],
+                 penalties: Optional[Mapping[str, float]] = None,
+                 conflict_components: Iterable[str] = ()):
+        self.name = name
+        self.weights: Dict[str, float] = dict(weights)
+        self.penalties: Dict[str, float] = dict(penalties or {})
+        self.conflict_components: Tuple[str, ...] = tuple(conflict_components)
+        unknown = [component for component in (*self.weights, *self.penalties, *self.conflict_components)
+                   if component not in COMPONENTS]
+        if unknown:
+            raise ValueError(f"Unknown fitness components {unknown}, expected some of {COMPONENTS}.")
+        used = set(self.weights) | set(self.penalties) | set(self.conflict_components)
+        self.components: Tuple[str, ...] = tuple(component for component in COMPONENTS if component in used)
+
+    @property
+    def tracks_conflicts(self) -> bool:
+        return bool(self.conflict_components)
+
+    def score(self, values: Mapping[str, Any]) -> Tuple[Any, Optional[Any]]:
+        """Returns (fitness, conflicts count or None) for the component values."""
+        conflicts_count = None
+        if self.conflict_components:
+            conflicts_count = sum(values[component] for component in self.conflict_components)
+
+        total = 1
+        for component, weight in self.weights.items():
+            total = total + weight * values[component]
+        fitness = 1 / (1.0 * total)
+        for component, weight in self.penalties.items():
+            fitness = fitness - values[component] * weight
+        return fitness, conflicts_count
+
+    def __repr__(self) -> str:
+        return f"FitnessObjective({self.name!r}, weights={self.weights}, penalties={self.penalties})"
+
+
+_objectives: Dict[str, FitnessObjective] = {}
+
+
+def register_objective(objective: FitnessObjective) -> FitnessObjective:
+    """Makes the objective selectable by name (Data.fitness_function); replaces one with the same name."""
+    _objectives[objective.name] = objective
+    return objective
+
+
+def get_objective(name: str) -> FitnessObjective:
+    objective = _objectives.get(name)
+    if objective is None:
+        raise ValueError(f"Unknown fitness function '{name}', expected one of {available_objectives()}.")
+    return objective
+
+
+def available_objectives() -> Tuple[str, ...]:
+    return tuple(_objectives)
+
+
+register_objective(FitnessObjective(
+    "conflicts",
+    weights={"conflicts": 1, "hours": 1},
+    conflict_components=("conflicts",)
+))
+register_objective(FitnessObjective(
+    "gaps",
+    weights={"gaps": 1, "hours": 1}
+))
+register_objective(FitnessObjective(
+    "combined",
+    weights={"conflicts": 1, "gaps": 1, "hours": 1, "teacher_constraints": 1},
+    penalties={"gaps": 0.01, "balance": 0.1},
+    conflict_components=("conflicts", "gaps")
+))
+
+
+def deviation_objective(base_name: str, weight: float) -> FitnessObjective:
+    """
+    Registers and returns "<base_name>+deviation": the base objective with
+    every changed session of the reference plan weighted like `weight`
+    conflicts. Used when a timetable is re-planned after small data changes.
+    """
+    base = get_objective(base_name)
+    return register_objective(FitnessObjective(
+        f"{base.name}+deviation",
+        weights={**base.weights, "deviation": weight},
+        penalties=base.penalties,
+        conflict_components=base.conflict_components
+    ))
@@ -1,13 +1,14 @@
 #genetic_algorithm.py
-from copy import deepcopy
-from random import shuffle
-from typing import Any
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
 
-from output_utils import get_random_number
 from population import Population
+from random_stream import RandomStream, default_stream
+from constructive_init import DEFAULT_INIT_RANDOMNESS
+from instrumentation import (PhaseProfiler, PhaseTimer, evaluation_counters, fitness_statistics,
+                             population_diversity)
 from timetable import Timetable
 from models.time_slot import TimeSlot
-from models.study_session import StudySession
 
 
 class GenAlg:
@@ -17,8 +18,15 @@ class GenAlg:
                  mutation_rate: float,
                  tournament_size: int,
                  fitness_function: str = "conflicts",
-                 predation_rate: float = 0.2):  # Частка популяції, яку видаляють під час "хижого" відбору
+                 predation_rate: float = 0.2,  # Частка популяції, яку видаляють під час "хижого" відбору
+                 evaluator: Any = None,  # Необов'язковий оцінювач фітнесу (напр. ParallelFitnessEvaluator)
+                 rng: Optional[RandomStream] = None,  # Власний потік випадкових чисел (для відтворюваних запусків)
+                 init_randomness: float = DEFAULT_INIT_RANDOMNESS,  # Частка випадкових занять у нових розкладах
+                 local_search: Any = None,  # Необов'язковий локальний пошук (LocalSearch) для найкращих розкладів
+                 observers: Sequence[Any] = (),  # Спостерігачі з методом on_generation(metrics) (напр. JsonlMetricsSink)
+                 profiler: Optional[PhaseProfiler] = None):  # Необов'язкове профілювання фаз (cProfile/tracemalloc)
         self.data = data
+        self.rng = rng if rng is not None else default_stream()
         self.num_elite_timetables = num_elite_timetables
         self.crossover_rate = crossover_rate
         self.mutation_rate = mutation_rate
@@ -27,88 +35,159 @@ class GenAlg:
 
         # Параметр для "хижого" підходу
         self.predation_rate = predation_rate
+        self.evaluator = evaluator
+        self.init_randomness = init_randomness
+        self.local_search = local_search
+
+        # Інструментування: метрики кожного покоління передаються спостерігачам
+        self.observers = list(observers)
+        self.profiler = profiler
+        self._best_fitness_seen: Optional[float] = None
+        self._last_improvement = 0
+
+    def add_observer(self, observer: Any) -> None:
+        self.observers.append(observer)
 
     def evolve(self, population: Population, generation_number: int) -> Population:
-        """Виконує одну ітерацію еволюції популяції."""
+        """Виконує одну ітерацію еволюції популяції (повертає популяцію, відсортовану за фітнесом)."""
+        start = time.perf_counter()
+        evaluations = evaluation_counters.snapshot()
+        timer = PhaseTimer(self.profiler)
+
         # Створюємо нову популяцію шляхом мутації та кросовера
-        new_population = self.mutate_population(self.crossover_population(population))
+        with timer.phase("crossover"):
+            crossed_population = self.crossover_population(population)
+        with timer.phase("mutation"):
+            new_population = self.mutate_population(crossed_population)
+
+        # Оцінюємо всю нову популяцію одним пакетом перед відбором
+        with timer.phase("evaluation"):
+            new_population.fitness_vector(self.evaluator)
 
         # Застосовуємо "хижий" підхід до нової популяції
-        self.apply_predation(new_population)
+        with timer.phase("predation"):
+            self.apply_predation(new_population)
 
         #Додаємо "дощ" кожні 7 поколінь для підвищення різноманітності популяції
         if generation_number % 7 == 0:
-            self.apply_rain(new_population, rain_rate=0.1)  # Використовуємо коефіцієнт "дощу" у 10%
+            with timer.phase("rain"):
+                self.apply_rain(new_population, rain_rate=0.1)  # Використовуємо коефіцієнт "дощу" у 10%
 
         # Гарантуємо стабільний розмір популяції
-        self._ensure_population_stability(new_population, len(population.timetables))
+        with timer.phase("stability"):
+            self._ensure_population_stability(new_population, len(population.timetables))
+
+        # Меметичний етап: локальний пошук усуває залишкові конфлікти найкращих розкладів
+        if self.local_search is not None:
+            with timer.phase("local_search"):
+                self.local_search.improve_population(new_population, self.evaluator)
+
+        with timer.phase("sort"):
+            new_population.sort_by_fitness(self.evaluator)
+
+        if self.observers:
+            metrics = self.collect_metrics(new_population, generation_number, timer.durations,
+                                           evaluation_counters.since(evaluations), time.perf_counter() - start)
+            for observer in self.observers:
+                observer.on_generation(metrics)
         return new_population
 
+    def collect_metrics(self, population: Population, generation_number: int, phase_durations: Dict[str, float],
+                        evaluations: Dict[str, int], wall_time: float) -> Dict[str, Any]:
+        """Збирає метрики покоління: час фаз, оцінювання фітнесу, статистику фітнесу, конфлікти та різноманітність."""
+        fitness_values = population.fitness_vector(self.evaluator)
+        statistics = fitness_statistics(fitness_values)
+        if self._best_fitness_seen is None or statistics["best"] > self._best_fitness_seen:
+            self._best_fitness_seen = statistics["best"]
+            self._last_improvement = generation_number
+
+        best_timetable = population.timetables[0]
+        metrics = {
+            "generation": generation_number,
+            "wall_time_s": wall_time,
+            "phases_s": dict(phase_durations),
+            "evaluations": evaluations,
+            "fitness": statistics,
+            "best_conflicts": best_timetable.conflicts_count,
+            "conflict_breakdown": best_timetable.conflict_breakdown(),
+            "diversity": population_diversity(population.timetables),
+            "generations_since_improvement": generation_number - self._last_improvement,
+            "population_size": len(population.timetables),
+        }
+        if self.profiler is not None and self.profiler.trace_memory:
+            metrics["memory_peaks_bytes"] = dict(self.profiler.memory_peaks)
+        return metrics
+
+    def run(self, population: Population, max_generations: int,
+            progress_callback: Optional[Callable[[int, Timetable], None]] = None) -> Population:
+        """
+        Еволюціонує популяцію, доки найкращий розклад не досягне фітнесу 1.0 або не вичерпаються покоління.
+        progress_callback(номер покоління, найкращий розклад) викликається після кожного покоління
+        (той самий формат, що й у AnnealingSolver).
+        """
+        population.sort_by_fitness(self.evaluator)
+        generation_number = 0
+        while population.timetables[0].fitness != 1.0 and generation_number < max_generations:
+            generation_number += 1
+            population = self.evolve(population=population,
+                                     generation_number=generation_number).sort_by_fitness(self.evaluator)
+            if progress_callback is not None:
+                progress_callback(generation_number, population.timetables[0])
+        return population
+
     def crossover_population(self, population: Population) -> Population:
         """Виконує кросовер для створення нової популяції."""
-        new_population = Population(size=len(population.timetables), data=self.data)
+        new_population = Population.preallocated(len(population.timetables))
 
         # Зберігаємо елітні розклади (найкращі) без змін
         for idx in range(self.num_elite_timetables):
-            new_population.timetables[idx] = deepcopy(population.timetables[idx])
+            new_population.timetables[idx] = population.timetables[idx].clone()
 
         # Виконуємо кросовер для решти розкладів
         for idx in range(self.num_elite_timetables, len(population.timetables)):
-            if self.crossover_rate > get_random_number():
+            if self.crossover_rate > self.rng.random():
                 # Вибираємо двох батьків за допомогою турнірного відбору
-                parent1 = self.select_tournament_population(population).sort_by_fitness().timetables[0]
-                parent2 = self.select_tournament_population(population).sort_by_fitness().timetables[1]
+                parent1 = self.select_tournament_winner(population, rank=0)
+                parent2 = self.select_tournament_winner(population, rank=1)
                 # Створюємо новий розклад на основі батьківських розкладів
                 new_population.timetables[idx] = self.crossover_timetable(parent1, parent2)
             else:
-                new_population.timetables[idx] = deepcopy(population.timetables[idx])
+                new_population.timetables[idx] = population.timetables[idx].clone()
 
         return new_population
 
     def crossover_timetable(self, timetable1: Timetable, timetable2: Timetable) -> Timetable:
         """Створює новий розклад шляхом кросовера двох батьківських розкладів."""
-        min_study_session_count = min(len(timetable1.study_sessions), len(timetable2.study_sessions))
-        new_timetable = Timetable(data=self.data, fitness_function=self.fitness_function)
+        min_study_session_count = min(len(timetable1), len(timetable2))
+        new_timetable = Timetable(data=self.data, fitness_function=self.fitness_function, rng=self.rng)
 
-        # Випадково вибираємо заняття від кожного з батьків
+        # Випадково вибираємо гени занять від кожного з батьків (випадкові числа беремо одним пакетом)
+        parent_draws = self.rng.bulk(min_study_session_count)
         for idx in range(min_study_session_count):
-            new_study_session = (
-                deepcopy(timetable1.study_sessions[idx])
-                if get_random_number() > 0.5
-                else deepcopy(timetable2.study_sessions[idx])
-            )
-            new_timetable.study_sessions.append(new_study_session)
+            parent = timetable1 if parent_draws[idx] > 0.5 else timetable2
+            new_timetable.add_session(*parent.get_session_genes(idx))
 
-        # Додаємо решту занять з обох батьківських розкладів
-        for idx in range(min_study_session_count, len(timetable1.study_sessions)):
-            new_timetable.study_sessions.append(deepcopy(timetable1.study_sessions[idx]))
-
-        for idx in range(min_study_session_count, len(timetable2.study_sessions)):
-            new_timetable.study_sessions.append(deepcopy(timetable2.study_sessions[idx]))
+        # Додаємо решту занять з обох батьківських розкладів (непорожнім буде лише хвіст довшого з них)
+        new_timetable.extend_sessions(timetable1, min_study_session_count)
+        new_timetable.extend_sessions(timetable2, min_study_session_count)
 
         return new_timetable
 
     def mutate_population(self, population: Population) -> Population:
         """Виконує мутацію для популяції."""
-        new_population = Population(size=len(population.timetables), data=self.data)
-
-        # Зберігаємо елітні розклади без змін
-        for idx in range(self.num_elite_timetables):
-            new_population.timetables[idx] = deepcopy(population.timetables[idx])
-
-        # Мутуємо решту розкладів
-        for idx in range(self.num_elite_timetables, len(population.timetables)):
-            new_population.timetables[idx] = self.mutate_timetable(population.timetables[idx])
-
-        return new_population
+        # Зберігаємо елітні розклади без змін, мутуємо решту розкладів
+        return Population.from_timetables(
+            timetable.clone() if idx < self.num_elite_timetables else self.mutate_timetable(timetable)
+            for idx, timetable in enumerate(population.timetables)
+        )
 
     def mutate_timetable(self, timetable: Timetable) -> Timetable:
         """Виконує мутацію для одного розкладу, включаючи нові типи мутацій."""
-        mutated_timetable = deepcopy(timetable)
+        mutated_timetable = timetable.clone()
 
-        if self.mutation_rate > get_random_number():
+        if self.mutation_rate > self.rng.random():
             # Випадково обираємо тип мутації
-            mutation_type = get_random_number()
+            mutation_type = self.rng.random()
             if mutation_type < 0.2:
                 mutated_timetable = self.swap_mutation(mutated_timetable)
             elif mutation_type < 0.4:
@@ -124,92 +203,72 @@ class GenAlg:
 
     def remove_session_mutation(self, timetable: Timetable) -> Timetable:
         """Видаляє випадкове заняття з розкладу."""
-        if timetable.study_sessions:
-            idx_to_remove = int(get_random_number() * len(timetable.study_sessions))
-            del timetable.study_sessions[idx_to_remove]
+        if len(timetable):
+            idx_to_remove = int(self.rng.random() * len(timetable))
+            timetable.remove_session(idx_to_remove)
         return timetable
 
     def add_session_mutation(self, timetable: Timetable) -> Timetable:
         """Додає випадкове нове заняття в розклад."""
-        # Вибираємо випадковий курс, групу, викладача і часовий слот
-        new_course = self._get_random_item(self.data.courses)
-        new_group = self._get_random_item(self.data.groups)
-        new_teacher = self._get_random_item(self.data.teachers)
-        new_room = self._get_random_item(self.data.classrooms)
-        new_time_slot = self._get_random_item(self.data.time_slots)
-
-        # Створюємо нове заняття і призначаємо атрибути
-        new_study_session = StudySession(id=len(timetable.study_sessions) + 1,
-                                         course=new_course,
-                                         student_group=new_group)
-        new_study_session.teacher = new_teacher
-        new_study_session.classroom = new_room
-        new_study_session.time_slot = new_time_slot
+        # Вибираємо випадкову пару (курс, група) з розкладки, викладача, аудиторію і часовий слот
+        new_layout = self._get_random_index(self.data.index.num_layouts)
+        new_teacher = self._get_random_index(self.data.index.num_teachers)
+        new_room = self._get_random_index(self.data.index.num_classrooms)
+        new_time_slot = self._get_random_index(self.data.index.num_time_slots)
 
         # Додаємо нове заняття в розклад
-        timetable.study_sessions.append(new_study_session)
+        timetable.add_session(new_layout, new_teacher, new_room, new_time_slot)
 
         return timetable
 
     def swap_mutation(self, timetable: Timetable) -> Timetable:
         """Обмін часових слотів двох випадкових занять."""
-        idx1 = int(get_random_number() * len(timetable.study_sessions))
-        idx2 = int(get_random_number() * len(timetable.study_sessions))
-
-        study_session1 = timetable.study_sessions[idx1]
-        study_session2 = timetable.study_sessions[idx2]
+        idx1 = int(self.rng.random() * len(timetable))
+        idx2 = int(self.rng.random() * len(timetable))
 
-        # Обмінюємо time_slot між двома заняттями
-        study_session1.time_slot, study_session2.time_slot = study_session2.time_slot, study_session1.time_slot
-
-        # Оновлюємо розклад
-        timetable.study_sessions[idx1] = study_session1
-        timetable.study_sessions[idx2] = study_session2
+        # Обмінюємо time_slot між двома заняттями (з дельта-оновленням фітнесу)
+        timetable.swap_time_slots(idx1, idx2)
 
         return timetable
 
     def inversion_mutation(self, timetable: Timetable) -> Timetable:
         """Інвертує порядок проведення серії занять для випадкової групи студентів."""
         # Вибираємо випадкову групу студентів із доступних
-        group = self._get_random_item(self.data.groups)
+        group_idx = self._get_random_index(self.data.index.num_groups)
 
-        # Знаходимо всі заняття цієї групи у поточному розкладі
-        group_study_sessions = [cls for cls in timetable.study_sessions if cls.student_group.id == group.id]
+        # Знаходимо індекси всіх занять цієї групи у поточному розкладі
+        layout_groups = self.data.index.layout_groups
+        group_study_sessions = [idx for idx, layout_idx in enumerate(timetable.layout_genes)
+                                if layout_groups[layout_idx] == group_idx]
 
         # Перевіряємо, чи кількість занять групи більша за 2, інакше інверсія недоцільна
         if len(group_study_sessions) > 2:
             # Вибираємо випадковий індекс для початку та кінця інверсії
-            idx_start = int(get_random_number() * (len(group_study_sessions) - 1))
-            idx_end = int(get_random_number() * (len(group_study_sessions) - idx_start)) + idx_start
+            idx_start = int(self.rng.random() * (len(group_study_sessions) - 1))
+            idx_end = int(self.rng.random() * (len(group_study_sessions) - idx_start)) + idx_start
 
             # Створюємо список індексів занять, що підлягають інверсії
-            timetable_indices = [timetable.study_sessions.index(group_study_sessions[i]) for i in range(idx_start, idx_end + 1)]
-
-            # Створюємо інвертований список занять
-            inverted_study_sessions = list(reversed([timetable.study_sessions[i] for i in timetable_indices]))
+            timetable_indices = group_study_sessions[idx_start:idx_end + 1]
 
-            # Оновлюємо розклад, замінюючи заняття на інвертовані
-            for i, idx in enumerate(timetable_indices):
-                timetable.study_sessions[idx] = inverted_study_sessions[i]
+            # Інвертуємо заняття на цих позиціях (перестановка не змінює фітнес)
+            timetable.reverse_sessions(timetable_indices)
 
         return timetable
 
     def scramble_mutation(self, timetable: Timetable) -> Timetable:
         """Перемішує часові слоти кількох випадкових занять у розкладі."""
         # Вибираємо випадкову кількість занять для перемішування (до половини від усіх занять)
-        num_study_sessions_to_scramble = int(get_random_number() * len(timetable.study_sessions) / 2) + 1
-        indices = [int(get_random_number() * len(timetable.study_sessions)) for _ in range(num_study_sessions_to_scramble)]
-
-        # Вибираємо випадкові заняття для перемішування
-        study_sessions_to_scramble = [timetable.study_sessions[i] for i in indices]
+        num_study_sessions_to_scramble = int(self.rng.random() * len(timetable) / 2) + 1
+        indices = [int(self.rng.random() * len(timetable)) for _ in range(num_study_sessions_to_scramble)]
 
         # Збираємо time_slot для цих занять та перемішуємо
-        time_slots = [cls.time_slot for cls in study_sessions_to_scramble]
-        shuffle(time_slots)  # Перемішуємо часи проведення занять
+        time_slot_genes = timetable.time_slot_genes
+        time_slots = [time_slot_genes[i] for i in indices]
+        self.rng.shuffle(time_slots)  # Перемішуємо часи проведення занять
 
         # Присвоюємо перемішані часові слоти назад обраним заняттям
         for i, idx in enumerate(indices):
-            timetable.study_sessions[idx].time_slot = time_slots[i]
+            timetable.set_slot(idx, time_slots[i])
 
         return timetable
 
@@ -217,11 +276,14 @@ class GenAlg:
         """Застосовує метод "дощу" для підвищення різноманітності популяції."""
         num_to_replace = int(len(population.timetables) * rain_rate)
 
-        for _ in range(num_to_replace):
-            # Заміна найслабших особин на нові випадкові розклади
-            new_timetable = Timetable(data=self.data, fitness_function=self.fitness_function).initialize()
-            population.timetables[-1] = new_timetable
-            population.sort_by_fitness()  # Пересортування для збереження кращих особин на початку
+        if num_to_replace == 0:
+            return
+
+        # Заміна найслабших особин на нові розклади, побудовані конструктивною евристикою
+        population.timetables[-num_to_replace:] = [
+            self._new_timetable() for _ in range(num_to_replace)
+        ]
+        population.sort_by_fitness(self.evaluator)  # Пересортування (одне пакетне оцінювання) для збереження кращих особин на початку
 
     def apply_predation(self, population: Population) -> None:
         """Застосовує 'хижий' відбір, видаляючи слабких та розмножуючи сильних особин."""
@@ -229,7 +291,7 @@ class GenAlg:
         num_to_remove = int(num_timetables * self.predation_rate)
 
         # Сортуємо популяцію за рівнем пристосованості
-        population.sort_by_fitness()
+        population.sort_by_fitness(self.evaluator)
 
         # Видаляємо слабких особин
         weakest_indices = list(range(num_timetables - num_to_remove, num_timetables))
@@ -242,7 +304,7 @@ class GenAlg:
 
         for timetable in best_timetables:
             # Клонуємо та мутуємо розклад
-            cloned_timetable = deepcopy(timetable)
+            cloned_timetable = timetable.clone()
             mutated_timetable = self.aggressive_mutate_timetable(cloned_timetable)
             new_timetables.append(mutated_timetable)
 
@@ -250,54 +312,68 @@ class GenAlg:
         population.timetables.extend(new_timetables)
 
     def aggressive_mutate_timetable(self, timetable: Timetable) -> Timetable:
-        """Виконує більш агресивну мутацію для даного розкладу."""
-        mutated_timetable = deepcopy(timetable)
+        """Виконує більш агресивну мутацію для даного розкладу (на місці — копію робить викликач)."""
+        mutated_timetable = timetable
+        mutation_draws = self.rng.bulk(len(mutated_timetable))
 
-        for idx in range(len(mutated_timetable.study_sessions)):
+        for idx in range(len(mutated_timetable)):
             # Збільшуємо ймовірність мутації
-            if (self.mutation_rate * 2) > get_random_number():
-                study_session_to_mutate = mutated_timetable.study_sessions[idx]
+            if (self.mutation_rate * 2) > mutation_draws[idx]:
+                new_teacher = new_room = new_time_slot = None
 
                 # З більшою ймовірністю змінюємо викладача або аудиторію
-                mutation_choice = get_random_number()
+                mutation_choice = self.rng.random()
                 if mutation_choice < 0.5:
                     # Міняємо викладача на випадкового
-                    study_session_to_mutate.teacher = self._get_random_item(self.data.teachers)
+                    new_teacher = self._get_random_index(self.data.index.num_teachers)
                 else:
                     # Міняємо аудиторію на випадкову
-                    study_session_to_mutate.classroom = self._get_random_item(self.data.classrooms)
+                    new_room = self._get_random_index(self.data.index.num_classrooms)
 
                 # З ймовірністю 30% змінюємо час заняття
-                if get_random_number() < 0.3:
-                    study_session_to_mutate.time_slot = self._get_random_item(self.data.time_slots)
+                if self.rng.random() < 0.3:
+                    new_time_slot = self._get_random_index(self.data.index.num_time_slots)
 
-                # Оновлюємо розклад
-                mutated_timetable.study_sessions[idx] = study_session_to_mutate
+                # Оновлюємо розклад (дельта-оновлення фітнесу лише для цього заняття)
+                mutated_timetable.reassign_session(idx, teacher_idx=new_teacher, classroom_idx=new_room,
+                                                   time_slot_idx=new_time_slot)
 
         return mutated_timetable
 
     def _get_valid_time_slot(self, timetable: Timetable) -> TimeSlot:
         """Повертає випадковий час, перевіряючи його доступність."""
-        available_times = deepcopy(self.data.time_slots)
-        shuffle(available_times)
+        available_times = list(range(self.data.index.num_time_slots))
+        self.rng.shuffle(available_times)
 
         # Пошук вільного часу, який не зайнятий в поточному розкладі
-        for time in available_times:
-            if not any(cls.time_slot.id == time.id for cls in timetable.study_sessions):
-                return time
+        occupied_times = set(timetable.time_slot_genes)
+        for time_idx in available_times:
+            if time_idx not in occupied_times:
+                return self.data.time_slots[time_idx]
         return self._get_random_item(self.data.time_slots)
 
+    def _new_timetable(self) -> Timetable:
+        """Створює новий розклад з урахуванням обмежень (частка init_randomness занять — випадкові)."""
+        return Timetable(data=self.data, fitness_function=self.fitness_function,
+                         rng=self.rng).initialize(self.init_randomness)
+
     def _get_random_item(self, items: list) -> Any:
         """Вибирає випадковий елемент зі списку."""
-        return items[int(get_random_number() * len(items))]
+        return self.rng.choice(items)
+
+    def _get_random_index(self, size: int) -> int:
+        """Вибирає випадковий індекс у діапазоні [0, size)."""
+        return self.rng.index(size)
+
+    def select_tournament_indices(self, population: Population) -> List[int]:
+        """Вибирає індекси учасників турніру (без створення нової популяції)."""
+        return [int(self.rng.random() * len(population.timetables)) for _ in range(self.tournament_size)]
 
-    def select_tournament_population(self, population: Population) -> Population:
-        """Вибирає популяцію для турніру."""
-        tournament_population = Population(size=self.tournament_size, data=self.data)
-        for idx in range(self.tournament_size):
-            random_index = int(get_random_number() * len(population.timetables))
-            tournament_population.timetables[idx] = population.timetables[random_index]
-        return tournament_population
+    def select_tournament_winner(self, population: Population, rank: int = 0) -> Timetable:
+        """Проводить турнір і повертає розклад, що посів місце rank (0 — найкращий)."""
+        indices = self.select_tournament_indices(population)
+        ranked = sorted(indices, key=lambda idx: population.timetables[idx].fitness, reverse=True)
+        return population.timetables[ranked[min(rank, len(ranked) - 1)]]
 
     def _ensure_population_stability(self, population: Population, expected_size: int) -> None:
         """Перевіряє та гарантує стабільність розміру популяції."""
@@ -310,5 +386,5 @@ class GenAlg:
             else:
                 # Додаємо нові випадкові розклади
                 for _ in range(expected_size - current_size):
-                    new_timetable = Timetable(data=self.data, fitness_function=self.fitness_function).initialize()
+                    new_timetable = self._new_timetable()
                     population.timetables.append(new_timetable)
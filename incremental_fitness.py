@@ -0,0 +1,191 @@
+#incremental_fitness.py
+
+from array import array
+from typing import Any, Iterable, Optional, Tuple
+
+from data_index import BALANCE_DAYS, GAP_THRESHOLD_MINUTES, DataIndex
+from fitness_objectives import COMPONENTS, FitnessObjective
+
+
+class ScoreCounters:
+    """
+    Occupancy counters of one timetable that allow O(1) fitness updates.
+
+    Counts are kept per (group, slot), (teacher, slot) and (classroom, slot),
+    per teacher and per session layout entry, together with the running totals
+    of every penalty. Adding or removing one session updates the totals by a
+    delta, so a mutation never needs a full pass over the timetable.
+    Only the given fitness components are tracked; the occupancy counters
+    are always kept because conflicts and gaps both read them.
+    """
+
+    def __init__(self, index: DataIndex, components: Iterable[str] = COMPONENTS):
+        self.index = index
+        self.components = frozenset(components)
+        self._track_gaps = "gaps" in self.components
+        self._track_teachers = "teacher_constraints" in self.components
+        self._track_balance = "balance" in self.components
+        # Without a reference plan the deviation stays 0 and is not tracked
+        self._track_deviation = "deviation" in self.components and index.reference_total > 0
+        num_slots = index.num_time_slots
+        self.group_slots = array('H', [0]) * (index.num_groups * num_slots)
+        self.teacher_slots = array('H', [0]) * (index.num_teachers * num_slots)
+        self.classroom_slots = array('H', [0]) * (index.num_classrooms * num_slots)
+        self.layout_counts = array('H', [0]) * index.num_layouts
+        self.teacher_loads = array('H', [0]) * index.num_teachers
+        self.day_counts = [0] * len(BALANCE_DAYS)
+        self.clashes = 0
+        self.capacity_violations = 0
+        self.gaps = 0
+        self.hours_penalty = sum(
+            weight * hours for weight, hours in zip(index.required_weight, index.required_hours)
+        )
+        self.not_allowed = 0
+        self.overload = 0
+        self.assignment_counts = {}
+        self.reference_matched = 0
+
+    @classmethod
+    def from_timetable(cls, timetable: Any, components: Iterable[str] = COMPONENTS) -> 'ScoreCounters':
+        counters = cls(timetable.data.index, components)
+        for genes in zip(timetable.layout_genes, timetable.teacher_genes,
+                         timetable.classroom_genes, timetable.time_slot_genes):
+            counters.add(*genes)
+        return counters
+
+    def copy(self) -> 'ScoreCounters':
+        counters = ScoreCounters.__new__(ScoreCounters)
+        counters.__dict__.update(self.__dict__)
+        for name in ("group_slots", "teacher_slots", "classroom_slots", "layout_counts", "teacher_loads"):
+            setattr(counters, name, array('H', getattr(self, name)))
+        counters.day_counts = list(self.day_counts)
+        counters.assignment_counts = dict(self.assignment_counts)
+        return counters
+
+    def __deepcopy__(self, memo: dict) -> 'ScoreCounters':
+        # The data index is immutable and stays shared between copies
+        return self.copy()
+
+    def add(self, layout_idx: int, teacher_idx: int, classroom_idx: int, time_slot_idx: int) -> None:
+        self._update(layout_idx, teacher_idx, classroom_idx, time_slot_idx, 1)
+
+    def remove(self, layout_idx: int, teacher_idx: int, classroom_idx: int, time_slot_idx: int) -> None:
+        self._update(layout_idx, teacher_idx, classroom_idx, time_slot_idx, -1)
+
+    def _update(self, layout_idx: int, teacher_idx: int, classroom_idx: int, time_slot_idx: int, sign: int) -> None:
+        index = self.index
+        num_slots = index.num_time_slots
+        group_idx = index.layout_groups[layout_idx]
+        course_idx = index.layout_courses[layout_idx]
+        day_idx = index.slot_days[time_slot_idx]
+
+        # Gaps only change inside the (teacher, day) and (group, day) buckets of this session
+        if self._track_gaps:
+            self.gaps -= (self._bucket_gaps(self.teacher_slots, teacher_idx, day_idx)
+                          + self._bucket_gaps(self.group_slots, group_idx, day_idx))
+
+        for counts, key in ((self.group_slots, group_idx * num_slots + time_slot_idx),
+                            (self.teacher_slots, teacher_idx * num_slots + time_slot_idx),
+                            (self.classroom_slots, classroom_idx * num_slots + time_slot_idx)):
+            if sign > 0:
+                if counts[key]:
+                    self.clashes += 1
+                counts[key] += 1
+            else:
+                counts[key] -= 1
+                if counts[key]:
+                    self.clashes -= 1
+
+        if self._track_gaps:
+            self.gaps += (self._bucket_gaps(self.teacher_slots, teacher_idx, day_idx)
+                          + self._bucket_gaps(self.group_slots, group_idx, day_idx))
+
+        if index.over_capacity[group_idx][classroom_idx]:
+            self.capacity_violations += sign
+
+        # Hours: |actual - required| for this (course, group) entry
+        required = index.required_hours[layout_idx]
+        old_count = self.layout_counts[layout_idx]
+        new_count = old_count + sign
+        self.layout_counts[layout_idx] = new_count
+        self.hours_penalty += index.required_weight[layout_idx] * (abs(new_count - required)
+                                                                     - abs(old_count - required))
+
+        # Teacher restrictions: allowed courses and maximum weekly load
+        if self._track_teachers:
+            old_load = self.teacher_loads[teacher_idx]
+            new_load = old_load + sign
+            self.teacher_loads[teacher_idx] = new_load
+            if index.restricted[teacher_idx]:
+                if not index.is_allowed(teacher_idx, course_idx):
+                    self.not_allowed += sign
+                max_hours = index.max_hours[teacher_idx]
+                self.overload += max(new_load - max_hours, 0) - max(old_load - max_hours, 0)
+
+        if self._track_balance:
+            balance_day = index.slot_balance_days[time_slot_idx]
+            if balance_day >= 0:
+                self.day_counts[balance_day] += sign
+
+        # Deviation: assignments of the reference plan matched by this timetable (as a multiset)
+        if self._track_deviation:
+            key = index.assignment_key(layout_idx, teacher_idx, classroom_idx, time_slot_idx)
+            reference_count = index.reference_counts.get(key, 0)
+            if reference_count:
+                old_count = self.assignment_counts.get(key, 0)
+                new_count = old_count + sign
+                self.assignment_counts[key] = new_count
+                self.reference_matched += min(new_count, reference_count) - min(old_count, reference_count)
+
+    def _bucket_gaps(self, counts: array, resource_idx: int, day_idx: int) -> int:
+        # Number of breaks longer than the threshold between consecutive occupied slots of one day
+        index = self.index
+        offset = resource_idx * index.num_time_slots
+        gaps = 0
+        previous_minute = None
+        for slot_idx in index.day_slots[day_idx]:
+            if counts[offset + slot_idx]:
+                minute = index.slot_minutes[slot_idx]
+                if previous_minute is not None and minute - previous_minute > GAP_THRESHOLD_MINUTES:
+                    gaps += 1
+                previous_minute = minute
+        return gaps
+
+    @property
+    def conflicts(self) -> int:
+        return self.clashes + self.capacity_violations
+
+    @property
+    def teacher_constraints_penalty(self) -> int:
+        return self.not_allowed + self.overload
+
+    @property
+    def balance_penalty(self) -> float:
+        max_count = max(self.day_counts)
+        if max_count == 0:
+            return 0.0
+        return (max_count - min(self.day_counts)) / max_count
+
+    @property
+    def deviation(self) -> int:
+        return self.index.reference_total - self.reference_matched
+
+    def covers(self, objective: FitnessObjective) -> bool:
+        return self.components.issuperset(objective.components)
+
+    def component_value(self, component: str) -> Any:
+        if component == "conflicts":
+            return self.conflicts
+        if component == "gaps":
+            return self.gaps
+        if component == "hours":
+            return self.hours_penalty
+        if component == "teacher_constraints":
+            return self.teacher_constraints_penalty
+        if component == "deviation":
+            return self.deviation
+        return self.balance_penalty
+
+    def score(self, objective: FitnessObjective) -> Tuple[float, Optional[int]]:
+        """Returns (fitness, conflicts count) exactly as Timetable.calculate_fitness would."""
+        return objective.score({component: self.component_value(component) for component in objective.components})
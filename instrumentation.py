@@ -0,0 +1,201 @@
+#instrumentation.py
+
+import cProfile
+import io
+import json
+import math
+import os
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+
+class EvaluationCounters:
+    """
+    Process-wide counters of fitness evaluations.
+
+    full — a Timetable computed its fitness with calculate_fitness;
+    delta — the fitness was read from the incremental score counters;
+    batch — the fitness was computed by a batch (NumPy or worker) evaluator;
+    cached — the cached fitness was still valid.
+    """
+
+    __slots__ = ("full", "delta", "batch", "cached")
+
+    def __init__(self):
+        self.full = 0
+        self.delta = 0
+        self.batch = 0
+        self.cached = 0
+
+    def snapshot(self) -> Dict[str, int]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def since(self, snapshot: Dict[str, int]) -> Dict[str, int]:
+        return {name: getattr(self, name) - snapshot[name] for name in self.__slots__}
+
+
+evaluation_counters = EvaluationCounters()
+
+
+class PhaseProfiler:
+    """
+    Optional per-phase cProfile and tracemalloc wrapper for GenAlg.
+
+    Each phase name gets its own cProfile.Profile that accumulates over all
+    generations; with trace_memory the peak traced memory of every phase is
+    recorded as well (tracemalloc slows the run down considerably).
+    """
+
+    def __init__(self, use_cprofile: bool = True, trace_memory: bool = False):
+        self.use_cprofile = use_cprofile
+        self.trace_memory = trace_memory
+        self.profiles: Dict[str, cProfile.Profile] = {}
+        self.memory_peaks: Dict[str, int] = {}
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        profile = None
+        if self.use_cprofile:
+            profile = self.profiles.setdefault(name, cProfile.Profile())
+            profile.enable()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+            if self.trace_memory:
+                _, peak = tracemalloc.get_traced_memory()
+                self.memory_peaks[name] = max(self.memory_peaks.get(name, 0), peak)
+
+    def report(self, sort_by: str = "cumulative", limit: int = 15) -> str:
+        """Returns the top functions of every phase as text."""
+        output = io.StringIO()
+        for name, profile in self.profiles.items():
+            output.write(f"=== {name} ===\n")
+            pstats.Stats(profile, stream=output).sort_stats(sort_by).print_stats(limit)
+        for name, peak in self.memory_peaks.items():
+            output.write(f"{name}: peak traced memory {peak / 1024:.1f} KiB\n")
+        return output.getvalue()
+
+    def dump(self, directory: str) -> List[str]:
+        """Writes one <phase>.prof file per phase (readable with pstats or snakeviz)."""
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for name, profile in self.profiles.items():
+            path = os.path.join(directory, f"{name}.prof")
+            profile.dump_stats(path)
+            paths.append(path)
+        return paths
+
+
+class PhaseTimer:
+    """Measures the wall time of the phases of one generation, profiling them when a profiler is given."""
+
+    def __init__(self, profiler: Optional[PhaseProfiler] = None):
+        self.profiler = profiler
+        self.durations: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            if self.profiler is None:
+                yield
+            else:
+                with self.profiler.phase(name):
+                    yield
+        finally:
+            self.durations[name] = self.durations.get(name, 0.0) + time.perf_counter() - start
+
+
+def fitness_statistics(fitness_values: Sequence[float]) -> Dict[str, float]:
+    count = len(fitness_values)
+    if count == 0:
+        return {"best": None, "mean": None, "std": None}
+    mean = sum(fitness_values) / count
+    variance = sum((value - mean) ** 2 for value in fitness_values) / count
+    return {"best": max(fitness_values), "mean": mean, "std": math.sqrt(variance)}
+
+
+def population_diversity(timetables: Sequence[Any]) -> Dict[str, float]:
+    """
+    Share of distinct genomes and the mean share of session genes that differ from the best timetable.
+
+    The timetables are expected to be sorted with the best first; sessions
+    are compared position by position up to the shorter of two genomes.
+    """
+    if not timetables:
+        return {"unique_share": 0.0, "distance_to_best": 0.0}
+    genomes = [timetable.to_genome() for timetable in timetables]
+    best = timetables[0]
+    best_genes = (best.layout_genes, best.teacher_genes, best.classroom_genes, best.time_slot_genes)
+    distances = []
+    for timetable in timetables[1:]:
+        length = min(len(timetable), len(best))
+        if length == 0:
+            continue
+        differing = 0
+        for genes, reference in zip((timetable.layout_genes, timetable.teacher_genes,
+                                     timetable.classroom_genes, timetable.time_slot_genes), best_genes):
+            differing += sum(1 for idx in range(length) if genes[idx] != reference[idx])
+        distances.append(differing / (4 * length))
+    return {
+        "unique_share": len(set(genomes)) / len(genomes),
+        "distance_to_best": sum(distances) / len(distances) if distances else 0.0,
+    }
+
+
+class CallbackObserver:
+    """Adapts a plain function to the observer interface of GenAlg."""
+
+    def __init__(self, callback: Callable[[Dict[str, Any]], None]):
+        self.callback = callback
+
+    def on_generation(self, metrics: Dict[str, Any]) -> None:
+        self.callback(metrics)
+
+
+class JsonlMetricsSink:
+    """
+    Observer that writes the metrics of every generation to a JSON Lines file.
+
+    The file is truncated when the sink is created, so it only ever holds
+    one run. When header is given it is written first as {"run": header}
+    (e.g. the seed and the start time), before the generation records.
+    """
+
+    def __init__(self, path: str, flush_every: int = 1, header: Optional[Dict[str, Any]] = None):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.flush_every = max(flush_every, 1)
+        self._file = open(path, "w", encoding="utf-8")
+        self._pending = 0
+        if header is not None:
+            self._file.write(json.dumps({"run": header}) + "\n")
+            self._file.flush()
+
+    def on_generation(self, metrics: Dict[str, Any]) -> None:
+        self._file.write(json.dumps(metrics) + "\n")
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self._file.flush()
+            self._pending = 0
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self) -> 'JsonlMetricsSink':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,223 @@
+#island_model.py
+
+import multiprocessing
+import queue
+import threading
+import traceback
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from genetic_algorithm import GenAlg
+from population import Population
+from random_stream import RandomStream, default_stream, spawn_streams
+from timetable import Timetable
+
+TOPOLOGIES = ("ring", "fully_connected")
+# Progress callback of run_islands: (island index, generation, best fitness of the island)
+IslandProgressCallback = Callable[[int, int, float], None]
+RESULT_POLL_INTERVAL = 1.0  # Seconds between checks of the island processes while waiting for their results
+
+
+class IslandConfig:
+    """Parameters of one island: its population size and its own GenAlg settings."""
+
+    def __init__(self, population_size: int = 50,
+                 num_elite_timetables: int = 2,
+                 crossover_rate: float = 0.7,
+                 mutation_rate: float = 0.15,
+                 tournament_size: int = 5,
+                 fitness_function: str = "conflicts",
+                 predation_rate: float = 0.2):
+        if not isinstance(population_size, int) or population_size <= 0:
+            raise ValueError("Population size must be a positive integer.")
+        self.population_size = population_size
+        self.num_elite_timetables = num_elite_timetables
+        self.crossover_rate = crossover_rate
+        self.mutation_rate = mutation_rate
+        self.tournament_size = tournament_size
+        self.fitness_function = fitness_function
+        self.predation_rate = predation_rate
+
+
+def build_topology(num_islands: int, topology: str = "ring") -> List[List[int]]:
+    """Returns, for every island, the list of islands it sends migrants to."""
+    if topology == "ring":
+        return [[(idx + 1) % num_islands] if num_islands > 1 else [] for idx in range(num_islands)]
+    if topology == "fully_connected":
+        return [[other for other in range(num_islands) if other != idx] for idx in range(num_islands)]
+    raise ValueError(f"Unknown topology '{topology}', expected one of {TOPOLOGIES}.")
+
+
+def _run_island(island_idx: int, data: Any, config: IslandConfig, max_generations: int,
+                migration_interval: int, migration_size: int, inbox: Any, outboxes: List[Any],
+                num_incoming: int, barrier: Any, solved: Any, results: Any, rng: RandomStream) -> None:
+    """
+    Evolves one island and puts ("result", island, genome, generations) on results,
+    preceded by ("progress", island, generation, best fitness) after every migration.
+
+    If the island fails, it breaks the barrier, so that the other islands
+    stop instead of waiting for it forever, and puts ("error", island,
+    traceback) instead.
+    """
+    try:
+        best_genome, generation_number = _evolve_island(
+            island_idx, data, config, max_generations, migration_interval, migration_size, inbox, outboxes,
+            num_incoming, barrier, solved, results, rng)
+    except threading.BrokenBarrierError:
+        results.put(("error", island_idx, "Stopped because another island failed."))
+    except Exception:
+        barrier.abort()
+        results.put(("error", island_idx, traceback.format_exc()))
+    else:
+        results.put(("result", island_idx, best_genome, generation_number))
+
+
+def _evolve_island(island_idx: int, data: Any, config: IslandConfig, max_generations: int,
+                   migration_interval: int, migration_size: int, inbox: Any, outboxes: List[Any],
+                   num_incoming: int, barrier: Any, solved: Any, results: Any, rng: RandomStream) -> tuple:
+    """Evolves one island and exchanges its best timetables with its neighbours."""
+    data.fitness_function = config.fitness_function
+    genetic_algorithm = GenAlg(
+        data=data,
+        num_elite_timetables=config.num_elite_timetables,
+        crossover_rate=config.crossover_rate,
+        mutation_rate=config.mutation_rate,
+        tournament_size=config.tournament_size,
+        fitness_function=config.fitness_function,
+        predation_rate=config.predation_rate,
+        rng=rng
+    )
+    population = Population(size=config.population_size, data=data, rng=rng).sort_by_fitness()
+
+    generation_number = 0
+    while generation_number < max_generations:
+        generation_number += 1
+        population = genetic_algorithm.evolve(population=population,
+                                              generation_number=generation_number).sort_by_fitness()
+        if population.timetables[0].fitness == 1.0:
+            solved.set()
+
+        migrate = generation_number % migration_interval == 0
+        if not migrate and generation_number != max_generations:
+            continue
+
+        # Synchronisation point shared by all islands: every island sends first, then all of them
+        # agree on whether to stop, and only then the migrants are received.
+        if migrate:
+            migrants = [timetable.to_genome() for timetable in population.timetables[:migration_size]]
+            for outbox in outboxes:
+                outbox.put((island_idx, migrants))
+        barrier.wait()
+        stop = solved.is_set() or generation_number == max_generations
+        barrier.wait()
+
+        if migrate:
+            # Batches arrive in whatever order the senders got there; take them by sender for reproducibility
+            batches = sorted((inbox.get() for _ in range(num_incoming)), key=lambda batch: batch[0])
+            incoming = [Timetable.from_genome(data, genome, config.fitness_function, rng=rng)
+                        for _, genomes in batches for genome in genomes]
+            num_replaced = min(len(incoming), len(population.timetables))
+            if num_replaced:
+                population.timetables[-num_replaced:] = incoming[:num_replaced]
+                population.sort_by_fitness()
+
+            # Reported by the parent process, which owns the console output
+            results.put(("progress", island_idx, generation_number, population.timetables[0].fitness))
+
+        if stop:
+            break
+
+    return population.timetables[0].to_genome(), generation_number
+
+
+def run_islands(data: Any, configs: Sequence[IslandConfig], max_generations: int,
+                migration_interval: int = 10, migration_size: int = 2,
+                topology: str = "ring", rng: Optional[RandomStream] = None,
+                progress_callback: Optional[IslandProgressCallback] = None) -> Timetable:
+    """
+    Runs one GA island per process and returns the best timetable found.
+
+    Every migration_interval generations each island sends copies of its
+    migration_size best timetables (as compact genomes) to its neighbours in
+    the topology, which replace their weakest timetables with them. All
+    islands stop together at the first migration point after any of them
+    reaches a fitness of 1.0. The best timetables of the islands are compared
+    with the fitness function of the given data. After every migration the
+    best fitness of each island is passed to progress_callback in the
+    calling process. If an island fails or its
+    process dies, the other islands are stopped and RuntimeError is raised
+    with the reason of every island.
+
+    Each island draws from its own stream spawned from rng (the default
+    stream when omitted) and receives migrants ordered by sender, so a
+    seeded run is reproducible as a whole.
+    """
+    if not configs:
+        raise ValueError("At least one island configuration is required.")
+    if migration_interval <= 0:
+        raise ValueError("Migration interval must be a positive integer.")
+
+    num_islands = len(configs)
+    if rng is None:
+        rng = default_stream()
+    island_streams = spawn_streams(rng, num_islands, prefix="island-")
+    neighbours = build_topology(num_islands, topology)
+    num_incoming = [sum(idx in targets for targets in neighbours) for idx in range(num_islands)]
+
+    inboxes = [multiprocessing.Queue() for _ in range(num_islands)]
+    results = multiprocessing.Queue()
+    barrier = multiprocessing.Barrier(num_islands)
+    solved = multiprocessing.Event()
+
+    processes = [
+        multiprocessing.Process(
+            target=_run_island,
+            args=(idx, data, config, max_generations, migration_interval, migration_size, inboxes[idx],
+                  [inboxes[target] for target in neighbours[idx]], num_incoming[idx], barrier, solved, results,
+                  island_streams[idx])
+        )
+        for idx, config in enumerate(configs)
+    ]
+    for process in processes:
+        process.start()
+
+    genomes: Dict[int, bytes] = {}
+    errors: Dict[int, str] = {}
+    try:
+        while len(genomes) + len(errors) < num_islands:
+            try:
+                message = results.get(timeout=RESULT_POLL_INTERVAL)
+            except queue.Empty:
+                # An island that died without reporting (killed, out of memory) would never send its result
+                for idx, process in enumerate(processes):
+                    if idx not in genomes and idx not in errors and process.exitcode not in (None, 0):
+                        errors[idx] = f"Island process exited with code {process.exitcode}."
+                        barrier.abort()
+                continue
+            if message[0] == "progress":
+                if progress_callback is not None:
+                    progress_callback(*message[1:])
+            elif message[0] == "result":
+                _, idx, genome, _ = message
+                genomes[idx] = genome
+            else:
+                _, idx, error = message
+                errors[idx] = error
+                barrier.abort()
+    finally:
+        for process in processes:
+            if errors:
+                process.join(timeout=RESULT_POLL_INTERVAL)
+                if process.is_alive():
+                    process.terminate()
+            process.join()
+
+    if errors:
+        failures = "\n".join(f"Island {idx}: {error}" for idx, error in sorted(errors.items()))
+        raise RuntimeError(f"The island model failed.\n{failures}")
+
+    best_timetable: Optional[Timetable] = None
+    for idx in range(num_islands):
+        timetable = Timetable.from_genome(data, genomes[idx])
+        if best_timetable is None or timetable.fitness > best_timetable.fitness:
+            best_timetable = timetable
+    return best_timetable
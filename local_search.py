@@ -0,0 +1,198 @@
+#local_search.py
+
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from random_stream import RandomStream, default_stream
+
+
+class LocalSearch:
+    """
+    Memetic improvement step: tabu hill climbing on the best timetables of a generation.
+
+    Every move targets a session in conflict (a group, teacher or classroom
+    clash, an overfull room or a teacher not allowed to teach the course)
+    and either moves it to a (slot, classroom) where its group, teacher and a
+    fitting classroom are all free, or hands it to another qualified teacher
+    who is free in its slot. Moves go through Timetable.reassign_session, so
+    each one is scored by a delta update of the timetable's score counters.
+    A move is kept when the fitness does not get worse and undone otherwise;
+    recently left placements are tabu unless returning to them would give a
+    new best fitness. The moves of one generation are bounded by max_moves;
+    time_budget (seconds) optionally bounds its wall time as well, at the
+    price of results that depend on the speed of the machine.
+
+    The conflicting sessions are found once per timetable and then kept up
+    to date after every accepted move, looking only at the sessions that
+    share the old or the new slot of the moved session's group, teacher or
+    classroom, so a move costs the same however large the timetable is.
+    """
+
+    def __init__(self, data: Any, top_k: int = 2, max_moves: int = 200, time_budget: Optional[float] = None,
+                 tabu_tenure: int = 10, rng: Optional[RandomStream] = None):
+        if top_k < 0 or max_moves < 0 or tabu_tenure < 0:
+            raise ValueError("Local search budgets must not be negative.")
+        self.data = data
+        self.top_k = top_k
+        self.max_moves = max_moves
+        self.time_budget = time_budget
+        self.tabu_tenure = tabu_tenure
+        self.rng = rng if rng is not None else default_stream()
+
+    def improve_population(self, population: Any, evaluator: Any = None) -> int:
+        """Improves the top_k timetables of the population in place and returns the number of moves tried."""
+        if self.top_k == 0 or self.max_moves == 0:
+            return 0
+        population.sort_by_fitness(evaluator)
+        deadline = None if self.time_budget is None else time.perf_counter() + self.time_budget
+        moves_left = self.max_moves
+        for timetable in population.timetables[:self.top_k]:
+            if moves_left <= 0 or (deadline is not None and time.perf_counter() >= deadline):
+                break
+            moves_left -= self.improve(timetable, moves_left, deadline)
+        return self.max_moves - moves_left
+
+    def improve(self, timetable: Any, max_moves: Optional[int] = None, deadline: Optional[float] = None) -> int:
+        """Runs tabu hill climbing on one timetable in place and returns the number of moves tried."""
+        if max_moves is None:
+            max_moves = self.max_moves
+        if deadline is None and self.time_budget is not None:
+            deadline = time.perf_counter() + self.time_budget
+
+        current_fitness = best_fitness = timetable.fitness
+        tabu: deque = deque(maxlen=self.tabu_tenure)
+        tracker = _ConflictTracker(self, timetable)
+        moves = 0
+        while moves < max_moves and (deadline is None or time.perf_counter() < deadline):
+            if not tracker.conflicting:
+                break
+            moves += 1
+            idx = self.rng.choice(tracker.conflicting)
+            move = self._propose_move(timetable, idx)
+            if move is None:
+                continue
+
+            old_genes = timetable.get_session_genes(idx)
+            _, teacher_idx, classroom_idx, time_slot_idx = old_genes
+            timetable.reassign_session(idx, **move)
+            new_fitness = timetable.fitness
+            is_tabu = (idx, *timetable.get_session_genes(idx)[1:]) in tabu
+
+            if new_fitness >= current_fitness and (not is_tabu or new_fitness > best_fitness):
+                tabu.append((idx, teacher_idx, classroom_idx, time_slot_idx))
+                current_fitness = new_fitness
+                best_fitness = max(best_fitness, new_fitness)
+                tracker.moved(idx, old_genes)
+            else:
+                timetable.reassign_session(idx, teacher_idx=teacher_idx, classroom_idx=classroom_idx,
+                                           time_slot_idx=time_slot_idx)
+        return moves
+
+    def conflicting_sessions(self, timetable: Any) -> List[int]:
+        """Indices of the sessions that take part in a clash or violate a room or teacher constraint."""
+        return [idx for idx in range(len(timetable)) if self.is_conflicting(timetable, idx)]
+
+    def is_conflicting(self, timetable: Any, idx: int) -> bool:
+        index = self.data.index
+        num_slots = index.num_time_slots
+        counters = timetable.score_counters
+        layout_idx, teacher_idx, classroom_idx, time_slot_idx = timetable.get_session_genes(idx)
+        group_idx = index.layout_groups[layout_idx]
+        return bool(counters.group_slots[group_idx * num_slots + time_slot_idx] > 1
+                    or counters.teacher_slots[teacher_idx * num_slots + time_slot_idx] > 1
+                    or counters.classroom_slots[classroom_idx * num_slots + time_slot_idx] > 1
+                    or index.over_capacity[group_idx][classroom_idx]
+                    or not index.is_allowed(teacher_idx, index.layout_courses[layout_idx]))
+
+    def _propose_move(self, timetable: Any, idx: int) -> Optional[Dict[str, int]]:
+        index = self.data.index
+        num_slots = index.num_time_slots
+        counters = timetable.score_counters
+        layout_idx, teacher_idx, classroom_idx, time_slot_idx = timetable.get_session_genes(idx)
+        group_idx = index.layout_groups[layout_idx]
+        course_idx = index.layout_courses[layout_idx]
+
+        # Another qualified teacher who is free in this slot
+        teacher_problem = (not index.is_allowed(teacher_idx, course_idx)
+                           or counters.teacher_slots[teacher_idx * num_slots + time_slot_idx] > 1)
+        if teacher_problem or self.rng.random() < 0.5:
+            teachers = [other for other in index.qualified_teachers[course_idx]
+                        if other != teacher_idx and not counters.teacher_slots[other * num_slots + time_slot_idx]]
+            if teachers:
+                return {"teacher_idx": self.rng.choice(teachers)}
+
+        # A (slot, classroom) in which the group, the teacher and a fitting classroom are all free:
+        # the slots and the classrooms are scanned from random starting points
+        slots = [
+            slot_idx for slot_idx in range(num_slots)
+            if slot_idx != time_slot_idx
+            and not counters.group_slots[group_idx * num_slots + slot_idx]
+            and not counters.teacher_slots[teacher_idx * num_slots + slot_idx]
+        ]
+        if not slots:
+            return None
+        classrooms = index.fitting_classrooms[group_idx] or tuple(range(index.num_classrooms))
+        slot_start = self.rng.index(len(slots))
+        classroom_start = self.rng.index(len(classrooms))
+        for slot_offset in range(len(slots)):
+            slot_idx = slots[(slot_start + slot_offset) % len(slots)]
+            for classroom_offset in range(len(classrooms)):
+                other_classroom = classrooms[(classroom_start + classroom_offset) % len(classrooms)]
+                if not counters.classroom_slots[other_classroom * num_slots + slot_idx]:
+                    return {"time_slot_idx": slot_idx, "classroom_idx": other_classroom}
+        return None
+
+
+class _ConflictTracker:
+    """
+    The conflicting sessions of one timetable, kept up to date move by move.
+
+    Sessions are bucketed by (group, slot), (teacher, slot) and
+    (classroom, slot); after a move only the sessions in the buckets the
+    moved session left and entered can change their status.
+    """
+
+    def __init__(self, local_search: LocalSearch, timetable: Any):
+        self.local_search = local_search
+        self.timetable = timetable
+        self.layout_groups = local_search.data.index.layout_groups
+        self.buckets: Dict[Tuple[int, int, int], Set[int]] = {}
+        self.conflicting: List[int] = []
+        self.positions: Dict[int, int] = {}
+        for idx in range(len(timetable)):
+            for key in self._keys(timetable.get_session_genes(idx)):
+                self.buckets.setdefault(key, set()).add(idx)
+            self._refresh(idx)
+
+    def _keys(self, genes: Tuple[int, int, int, int]) -> Tuple[Tuple[int, int, int], ...]:
+        layout_idx, teacher_idx, classroom_idx, time_slot_idx = genes
+        return ((0, self.layout_groups[layout_idx], time_slot_idx), (1, teacher_idx, time_slot_idx),
+                (2, classroom_idx, time_slot_idx))
+
+    def _refresh(self, idx: int) -> None:
+        is_conflicting = self.local_search.is_conflicting(self.timetable, idx)
+        if is_conflicting and idx not in self.positions:
+            self.positions[idx] = len(self.conflicting)
+            self.conflicting.append(idx)
+        elif not is_conflicting and idx in self.positions:
+            # Swap with the last entry and pop, so removal is O(1)
+            position = self.positions.pop(idx)
+            last = self.conflicting.pop()
+            if last != idx:
+                self.conflicting[position] = last
+                self.positions[last] = position
+
+    def moved(self, idx: int, old_genes: Tuple[int, int, int, int]) -> None:
+        """Updates the buckets and the statuses after session idx was moved away from old_genes."""
+        affected = {idx}
+        for key in self._keys(old_genes):
+            bucket = self.buckets[key]
+            bucket.discard(idx)
+            affected |= bucket
+        for key in self._keys(self.timetable.get_session_genes(idx)):
+            bucket = self.buckets.setdefault(key, set())
+            affected |= bucket
+            bucket.add(idx)
+        for other in sorted(affected):
+            self._refresh(other)
@@ -1,15 +1,27 @@
+import argparse
 import sys
+import time
 from os import path
-from output_utils import print_data, print_population_timetables, print_timetable_as_table
+from typing import List, Optional
+from output_utils import OUTPUT_MODES, ProgressReporter
 from db_and_export.database_utils import (
     export_data_to_db,
-    import_data_from_db,
     create_database_schema,
-    export_timetable_to_txt
+    export_timetable_to_txt,
+    close_connection,
+    RunRecorder
 )
 from data import Data
 from genetic_algorithm import GenAlg
 from population import Population
+from parallel_fitness import ParallelFitnessEvaluator
+from island_model import IslandConfig, run_islands
+from random_stream import seed_default_stream
+from local_search import LocalSearch
+from annealing import AnnealingSolver
+from instrumentation import JsonlMetricsSink, PhaseProfiler
+from checkpoint import load_checkpoint, save_checkpoint
+from warm_start import load_planned_sessions, map_plan, penalize_deviation, seed_population
 
 # Algorithm parameters
 POPULATION_SIZE = 50
@@ -18,74 +30,333 @@ CROSSOVER_RATE = 0.7
 TOURNAMENT_SELECTION_SIZE = 5
 NUMB_OF_ELITE_TIMETABLES = 2
 MAX_GENERATIONS = 200
+FITNESS_WORKERS = 1  # Number of fitness evaluation processes (1 = serial, None = one per CPU core)
+INIT_RANDOMNESS = 0.2  # Share of sessions placed at random in new timetables (1.0 = fully random)
+
+# Local search on the best timetables after every generation (LOCAL_SEARCH_TOP_K = 0 disables it)
+LOCAL_SEARCH_TOP_K = 2
+LOCAL_SEARCH_MAX_MOVES = 200  # Moves tried per generation
+LOCAL_SEARCH_TIME_BUDGET = None  # Optional seconds per generation (machine-dependent, so off for reproducible runs)
+LOCAL_SEARCH_TABU_TENURE = 10
+
+# Single-solution engines ("annealing", "late_acceptance") selected with --engine
+ENGINES = ("ga", "annealing", "late_acceptance")
+ANNEALING_MAX_ITERATIONS = 20000
+ANNEALING_TIME_LIMIT = None  # Optional seconds (--time-limit; machine-dependent, so off for reproducible runs)
+ANNEALING_PROGRESS_INTERVAL = 1000  # Iterations between progress reports
+
+# Island model parameters (NUMB_OF_ISLANDS > 1 evolves one population per process)
+NUMB_OF_ISLANDS = 1
+MIGRATION_INTERVAL = 10
+MIGRATION_SIZE = 2
+ISLAND_TOPOLOGY = "ring"  # can be "ring", "fully_connected"
+
+# Console output (--output): full, periodic, summary, final or silent
+OUTPUT_MODE = "summary"
+OUTPUT_INTERVAL = 10  # Generations between full dumps in the periodic mode
+
+# Checkpoints of the GA population (--checkpoint PATH enables them, --resume PATH continues a run)
+CHECKPOINT_INTERVAL = 10  # Generations between checkpoints
+
+# Re-planning from an earlier timetable (--warm-start PATH)
+WARM_START_KEEP_SHARE = 0.5  # Share of the population made of the old plan and its mutations
+DEVIATION_WEIGHT = 0.0  # Cost of every session moved away from the old plan (0 = no penalty)
+
+# Run history in the database (runs, run_generations and run_assignments tables)
+RECORD_RUNS = True
+RUN_METRICS_FLUSH_EVERY = 10  # Generations between writes when the metrics are streamed (--stream-run)
+
+# Problem data source (--data-source): the CSV files of DATA_DIRECTORY, mirrored into the database,
+# or the data tables of the database as they are
+DATA_SOURCES = ("csv", "sqlite")
+DATA_SOURCE = "csv"
+DATA_DIRECTORY = 'user_data'
+DATA_CACHE_DIR = 'user_data/.cache'  # Snapshots of the compiled CSV data, reused while the files are unchanged
 
 DATABASE_PATH = 'db_and_export/timetable_database.db'
 EXPORT_FILE_PATH = 'db_and_export/final_timetable.txt'
 
-def run() -> None:
+def parse_arguments(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parses the command line options of the scheduler."""
+    parser = argparse.ArgumentParser(description="Genetic algorithm timetable scheduler")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="seed of the random stream; runs with the same seed give the same timetable")
+    parser.add_argument("--data-source", choices=DATA_SOURCES, default=DATA_SOURCE,
+                        help="read the problem from the CSV files (and store it in the database) "
+                             "or from the data tables of the database")
+    parser.add_argument("--no-data-cache", dest="data_cache", action="store_false",
+                        help="always parse the CSV files instead of reusing a snapshot of them from "
+                             f"{DATA_CACHE_DIR}")
+    parser.add_argument("--engine", choices=ENGINES, default="ga",
+                        help="solver engine: the genetic algorithm or a single-solution local search")
+    parser.add_argument("--time-limit", type=float, default=ANNEALING_TIME_LIMIT,
+                        help="wall-clock limit in seconds for the annealing and late_acceptance engines "
+                             "(default: none, so runs with the same --seed give the same timetable)")
+    parser.add_argument("--metrics", default=None,
+                        help="JSON Lines file that receives the metrics of every GA generation (overwritten on "
+                             "every run; the first line records the seed and the start time)")
+    parser.add_argument("--profile", default=None,
+                        help="directory for per-phase cProfile dumps of the GA (a summary is printed at the end)")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="record the peak traced memory of every GA phase (slow)")
+    parser.add_argument("--output", choices=OUTPUT_MODES, default=OUTPUT_MODE,
+                        help="console output: the whole population every generation (full), a summary line per "
+                             "generation with a full dump every --output-interval generations (periodic), "
+                             "summary lines only (summary), the final timetable only (final) or nothing (silent)")
+    parser.add_argument("--output-interval", type=int, default=OUTPUT_INTERVAL,
+                        help="generations between full dumps in the periodic output mode")
+    parser.add_argument("--checkpoint", default=None,
+                        help="file that receives a checkpoint of the GA every --checkpoint-interval generations")
+    parser.add_argument("--checkpoint-interval", type=int, default=CHECKPOINT_INTERVAL,
+                        help="generations between checkpoints")
+    start = parser.add_mutually_exclusive_group()
+    start.add_argument("--resume", default=None,
+                       help="checkpoint to continue the GA from "
+                            "(also the checkpoint file unless --checkpoint is given)")
+    start.add_argument("--warm-start", default=None,
+                       help="earlier timetable to re-plan from after data changes: an exported .txt file, "
+                            "a checkpoint or a database with recorded runs")
+    parser.add_argument("--warm-start-run", type=int, default=None,
+                        help="with a database --warm-start, the id of the run to start from (default: the latest)")
+    parser.add_argument("--deviation-weight", type=float, default=DEVIATION_WEIGHT,
+                        help="with --warm-start, penalty for every session that differs from the earlier timetable")
+    parser.add_argument("--no-record-run", dest="record_run", action="store_false", default=RECORD_RUNS,
+                        help="do not store the run, its generation metrics and its timetable in the database")
+    parser.add_argument("--stream-run", action="store_true",
+                        help="write the generation metrics to the database during the run, not only at its end")
+    return parser.parse_args(argv)
+
+def run(options: Optional[argparse.Namespace] = None) -> None:
+    if options is None:
+        options = parse_arguments([])
+
+    # Every random decision of the run is drawn from this stream (or from streams derived from it)
+    rng = seed_default_stream(options.seed)
+    reporter = ProgressReporter(mode=options.output, interval=options.output_interval)
+    reporter.message(f"Random seed: {rng.seed}")
+
     # Step 1: Create db_and_export schema
     create_database_schema(DATABASE_PATH)
-    print(f"Database schema created at path {DATABASE_PATH}")
+    reporter.message(f"Database schema created at {DATABASE_PATH}")
 
-    # Step 2: Export data to the db_and_export
-    data = Data()
-    export_data_to_db(data, DATABASE_PATH)
-    print("Data exported to the db_and_export.")
-
-    # Step 3: Import data from the db_and_export
-    data = import_data_from_db(DATABASE_PATH)
-    print("Data imported from the db_and_export.")
+    # Step 2: Load the data once, either from the CSV files (mirrored into the db_and_export) or from the db_and_export
+    if options.data_source == "csv":
+        data = Data.from_csv(DATA_DIRECTORY, cache_dir=DATA_CACHE_DIR if options.data_cache else None)
+        export_data_to_db(data, DATABASE_PATH)
+        reporter.message("Data loaded from the CSV files and exported to the db_and_export.")
+    else:
+        data = Data.from_sqlite(DATABASE_PATH)
+        reporter.message("Data imported from the db_and_export.")
+    close_connection(DATABASE_PATH)
 
     generation_number = 0
-    FITNESS_FUNCTION = "conflicts" # can be "combined", "conflicts", "gaps"
+    FITNESS_FUNCTION = "conflicts" # can be "combined", "conflicts", "gaps" or any objective registered in fitness_objectives
+
+    warm_start_timetable = None
+    if options.warm_start:
+        # Map the earlier plan onto the current data; unchanged sessions are kept, the rest repaired
+        data.fitness_function = FITNESS_FUNCTION
+        sessions = load_planned_sessions(options.warm_start, options.warm_start_run)
+        warm_start_timetable, counts = map_plan(data, sessions, rng)
+        reporter.message(f"Warm start from {options.warm_start}: {counts['kept']} sessions kept, "
+                         f"{counts['repaired']} repaired, {counts['dropped']} dropped")
+        if options.deviation_weight > 0:
+            warm_start_timetable = penalize_deviation(data, warm_start_timetable, options.deviation_weight)
+            FITNESS_FUNCTION = data.fitness_function
+
+    engine = "islands" if options.engine == "ga" and NUMB_OF_ISLANDS > 1 else options.engine
+    recorder = None
+    if options.record_run:
+        recorder = RunRecorder(DATABASE_PATH, engine, FITNESS_FUNCTION, seed=rng.seed, parameters=run_parameters(),
+                               stream=options.stream_run, flush_every=RUN_METRICS_FLUSH_EVERY)
+
+    if options.engine != "ga":
+        run_single_solution_engine(data, FITNESS_FUNCTION, options.engine, rng, reporter, warm_start_timetable,
+                                   recorder, time_limit=options.time_limit)
+        return
+
+    if NUMB_OF_ISLANDS > 1:
+        if warm_start_timetable is not None:
+            reporter.message("The island model starts from new populations; --warm-start is ignored.")
+        run_island_model(data, FITNESS_FUNCTION, rng, reporter, recorder)
+        return
 
     # Step 4: Set up and run genetic algorithm
+    evaluator = ParallelFitnessEvaluator(data=data, workers=FITNESS_WORKERS)
+    local_search = LocalSearch(
+        data=data,
+        top_k=LOCAL_SEARCH_TOP_K,
+        max_moves=LOCAL_SEARCH_MAX_MOVES,
+        time_budget=LOCAL_SEARCH_TIME_BUDGET,
+        tabu_tenure=LOCAL_SEARCH_TABU_TENURE,
+        rng=rng
+    ) if LOCAL_SEARCH_TOP_K > 0 else None
+    metrics_sink = JsonlMetricsSink(options.metrics, header={
+        "seed": rng.seed,
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "engine": "ga",
+        "fitness_function": FITNESS_FUNCTION,
+        "resumed_from": options.resume,
+    }) if options.metrics else None
+    profiler = None
+    if options.profile or options.trace_memory:
+        profiler = PhaseProfiler(use_cprofile=bool(options.profile), trace_memory=options.trace_memory)
     genetic_algorithm = GenAlg(
         data=data,
         num_elite_timetables=NUMB_OF_ELITE_TIMETABLES,
         crossover_rate=CROSSOVER_RATE,
         mutation_rate=MUTATION_RATE,
         tournament_size=TOURNAMENT_SELECTION_SIZE,
-        fitness_function=FITNESS_FUNCTION
+        fitness_function=FITNESS_FUNCTION,
+        evaluator=evaluator,
+        rng=rng,
+        init_randomness=INIT_RANDOMNESS,
+        local_search=local_search,
+        observers=[observer for observer in (metrics_sink, recorder) if observer is not None],
+        profiler=profiler
     )
 
-    population = Population(size=POPULATION_SIZE, data=data).sort_by_fitness()
+    checkpoint_path = options.checkpoint or options.resume
+    if options.resume:
+        # Continue from the saved genomes with the saved random state and GenAlg parameters
+        checkpoint = load_checkpoint(options.resume)
+        checkpoint.restore_rng(rng)
+        checkpoint.restore_genetic_algorithm(genetic_algorithm)
+        population = checkpoint.population(data, rng=rng).sort_by_fitness(evaluator)
+        generation_number = checkpoint.generation_number
+        reporter.message(f"Resumed from {options.resume} at generation {generation_number} (seed {rng.seed})")
+    elif warm_start_timetable is not None:
+        population = seed_population(warm_start_timetable, POPULATION_SIZE, genetic_algorithm,
+                                     keep_share=WARM_START_KEEP_SHARE).sort_by_fitness(evaluator)
+    else:
+        population = Population(size=POPULATION_SIZE, data=data, rng=rng,
+                                init_randomness=INIT_RANDOMNESS).sort_by_fitness(evaluator)
 
     # Initial output
-    print_data(data=data)
-    print_population_and_best_timetable(population, data, generation_number)
-    print("START")
+    reporter.start(data, population, generation_number)
 
     # Main evolution loop
     while population.timetables[0].fitness != 1.0 and generation_number < MAX_GENERATIONS:
         generation_number += 1
-        population = genetic_algorithm.evolve(population=population, generation_number=generation_number).sort_by_fitness()
+        population = genetic_algorithm.evolve(population=population,
+                                              generation_number=generation_number).sort_by_fitness(evaluator)
 
         # Output current generation and best solution fitness
-        print(f"Generation {generation_number}: Best fitness = {population.timetables[0].fitness}")
+        reporter.generation(generation_number, population, data)
+
+        if checkpoint_path and generation_number % max(options.checkpoint_interval, 1) == 0:
+            save_checkpoint(checkpoint_path, population, generation_number, rng, genetic_algorithm, data)
+
+    if checkpoint_path:
+        size = save_checkpoint(checkpoint_path, population, generation_number, rng, genetic_algorithm, data)
+        reporter.message(f"Checkpoint of generation {generation_number} written to {checkpoint_path} ({size} bytes)")
 
-        print_population_and_best_timetable(population, data, generation_number)
+    evaluator.close()
+    if metrics_sink is not None:
+        metrics_sink.close()
+        reporter.message(f"Generation metrics written to {options.metrics}")
+    if profiler is not None:
+        reporter.message(profiler.report())
+        if options.profile:
+            profiler.dump(options.profile)
+            reporter.message(f"Phase profiles written to {options.profile}")
 
     # Determine the best timetable
     best_timetable = population.timetables[0]
 
     # Check for successful completion
     if best_timetable.fitness == 1.0:
-        print(f"Solution found in {generation_number + 1} generations.")
+        reporter.message(f"Solution found in {generation_number + 1} generations.")
     else:
-        print(f"Reached maximum generations ({MAX_GENERATIONS}) without an optimal solution.")
+        reporter.message(f"Reached maximum generations ({MAX_GENERATIONS}) without an optimal solution.")
 
-    print_population_and_best_timetable(population, data, generation_number)
+    reporter.final(data, best_timetable, generation_number, population)
 
-    # Step 5: Export the best timetable to a text file
+    # Step 5: Export the best timetable to a text file and the run history
+    save_result(best_timetable, generation_number, recorder, reporter)
+
+def run_parameters() -> dict:
+    """Solver parameters stored with every recorded run."""
+    return {
+        "population_size": POPULATION_SIZE,
+        "mutation_rate": MUTATION_RATE,
+        "crossover_rate": CROSSOVER_RATE,
+        "tournament_size": TOURNAMENT_SELECTION_SIZE,
+        "elite_timetables": NUMB_OF_ELITE_TIMETABLES,
+        "max_generations": MAX_GENERATIONS,
+        "init_randomness": INIT_RANDOMNESS,
+        "local_search_top_k": LOCAL_SEARCH_TOP_K,
+        "annealing_max_iterations": ANNEALING_MAX_ITERATIONS,
+        "islands": NUMB_OF_ISLANDS,
+    }
+
+def save_result(best_timetable, generations: int, recorder=None, reporter=None) -> None:
+    """Exports the best timetable to the text file and, when the run is recorded, to the database."""
+    reporter = reporter or ProgressReporter()
     export_timetable_to_txt(best_timetable, EXPORT_FILE_PATH)
-    print(f"Timetable exported to file {EXPORT_FILE_PATH}")
+    reporter.message(f"Timetable exported to file {EXPORT_FILE_PATH}")
+    if recorder is not None:
+        run_id = recorder.finish(best_timetable, generations)
+        close_connection(DATABASE_PATH)
+        reporter.message(f"Run {run_id} recorded in {DATABASE_PATH}")
+
+def run_single_solution_engine(data, fitness_function: str, schedule: str, rng=None, reporter=None,
+                               initial_timetable=None, recorder=None,
+                               time_limit: Optional[float] = ANNEALING_TIME_LIMIT) -> None:
+    """Improves one timetable with simulated annealing or late acceptance and exports it."""
+    reporter = reporter or ProgressReporter()
+    solver = AnnealingSolver(
+        data=data,
+        fitness_function=fitness_function,
+        schedule=schedule,
+        max_iterations=ANNEALING_MAX_ITERATIONS,
+        time_limit=time_limit,
+        init_randomness=INIT_RANDOMNESS,
+        progress_interval=ANNEALING_PROGRESS_INTERVAL,
+        progress_callback=reporter.iteration,
+        rng=rng
+    )
+    best_timetable = solver.run(initial_timetable)
+
+    if best_timetable.fitness == 1.0:
+        reporter.message(f"Solution found in {solver.iterations} iterations.")
+    elif solver.is_feasible(best_timetable):
+        reporter.message(f"Feasible solution found in {solver.iterations} iterations.")
+    else:
+        reporter.message(f"Stopped after {solver.iterations} iterations without an optimal solution.")
+    reporter.final(data, best_timetable, solver.iterations)
+
+    save_result(best_timetable, solver.iterations, recorder, reporter)
+
+def run_island_model(data, fitness_function: str, rng=None, reporter=None, recorder=None) -> None:
+    """Runs the GA as several islands in separate processes and exports the best timetable."""
+    reporter = reporter or ProgressReporter()
+    configs = [
+        IslandConfig(
+            population_size=POPULATION_SIZE,
+            num_elite_timetables=NUMB_OF_ELITE_TIMETABLES,
+            crossover_rate=CROSSOVER_RATE,
+            mutation_rate=MUTATION_RATE,
+            tournament_size=TOURNAMENT_SELECTION_SIZE,
+            fitness_function=fitness_function
+        )
+        for _ in range(NUMB_OF_ISLANDS)
+    ]
+    best_timetable = run_islands(
+        data=data,
+        configs=configs,
+        max_generations=MAX_GENERATIONS,
+        migration_interval=MIGRATION_INTERVAL,
+        migration_size=MIGRATION_SIZE,
+        topology=ISLAND_TOPOLOGY,
+        rng=rng,
+        progress_callback=reporter.island
+    )
+    reporter.message(f"Best fitness across {NUMB_OF_ISLANDS} islands = {best_timetable.fitness}")
+    reporter.final(data, best_timetable, MAX_GENERATIONS)
 
-def print_population_and_best_timetable(population, data, generation_number: int) -> None:
-    """Displays information about the current generation and the best timetable."""
-    print_population_timetables(population=population, generation_number=generation_number)
-    print_timetable_as_table(data=data, timetable=population.timetables[0], generation=generation_number)
+    save_result(best_timetable, MAX_GENERATIONS, recorder, reporter)
 
 if __name__ == '__main__' and __package__ is None:
     sys.path.insert(0, path.dirname(path.abspath(__file__)))
-    run()
+    run(parse_arguments())
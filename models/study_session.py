@@ -12,6 +12,14 @@ class StudySession:
         self.teacher = None
         self.time_slot = None
 
+    def clone(self) -> 'StudySession':
+        # Курс, група, аудиторія, викладач і слот — незмінні об'єкти предметної області, тому вони спільні.
+        study_session = StudySession(id=self.id, course=self.course, student_group=self.student_group)
+        study_session.classroom = self.classroom
+        study_session.teacher = self.teacher
+        study_session.time_slot = self.time_slot
+        return study_session
+
     def __str__(self) -> str:
         return (f"[{self.course.name}, Group: {self.student_group.name}, "
                 f"Classroom: {self.classroom}, Teacher: {self.teacher}, "
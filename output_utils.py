@@ -1,12 +1,14 @@
 import json
-from random import random
-from typing import Any
+import sys
+import time
+from typing import Any, Optional, TextIO
 from tabulate import tabulate
+from random_stream import default_stream
 
 
 def get_random_number() -> float:
-    """Returns a random number in the range [0, 1)."""
-    return random()
+    """Returns a random number in the range [0, 1) from the default random stream."""
+    return default_stream().random()
 
 
 def print_msg(msg: Any) -> None:
@@ -108,3 +110,111 @@ def print_timetable_as_table(data: Any, timetable: Any, generation: int) -> None
     # Message about finding an optimal solution
     if timetable.fitness == 1.0:
         print_msg(f"Solution found in generation {generation + 1}")
+
+
+def stream_population_timetables(population: Any, generation_number: int, stream: Optional[TextIO] = None) -> None:
+    """
+    Writes the timetables of the population one line at a time.
+
+    Unlike print_population_timetables no table of the whole population is
+    built first, so the memory used does not grow with the population.
+    """
+    stream = sys.stdout if stream is None else stream
+    stream.write(f"Generation Number: {generation_number}\n")
+    stream.write("Timetables Number\tFitness\tConflicts\tStudy Sessions [course, group, classroom, teacher, time slot]\n")
+    for idx, timetable in enumerate(population.timetables):
+        stream.write(f"{idx}\t{timetable.fitness}\t{timetable.conflicts_count}\t{timetable}\n")
+    stream.flush()
+
+
+OUTPUT_MODES = ("full", "periodic", "summary", "final", "silent")
+
+
+class ProgressReporter:
+    """
+    Reports the progress of a run in one of OUTPUT_MODES.
+
+    full — the input data, the whole population and the best timetable every
+    generation (the original output of main.py);
+    periodic — a summary line every generation and the population with the
+    best timetable every `interval` generations;
+    summary — one summary line per generation or progress report;
+    final — only the messages and the final best timetable;
+    silent — nothing at all.
+
+    Every line is written and flushed as soon as it is produced; the reporter
+    keeps only the start time and the best fitness seen so far.
+    """
+
+    def __init__(self, mode: str = "summary", interval: int = 10):
+        if mode not in OUTPUT_MODES:
+            raise ValueError(f"Unknown output mode '{mode}', expected one of {OUTPUT_MODES}.")
+        self.mode = mode
+        self.interval = max(interval, 1)
+        self.start_time = time.perf_counter()
+        self.best_fitness: Optional[float] = None
+
+    def _write(self, line: str) -> None:
+        sys.stdout.write(line + "\n")
+        sys.stdout.flush()
+
+    def _summary(self, label: str, step: int, best_timetable: Any, population: Any = None) -> None:
+        fitness = best_timetable.fitness
+        improved = self.best_fitness is None or fitness > self.best_fitness
+        if improved:
+            self.best_fitness = fitness
+        line = f"{label} {step}: best={fitness:.6f} conflicts={best_timetable.conflicts_count}"
+        if population is not None and population.timetables:
+            mean = sum(timetable.fitness for timetable in population.timetables) / len(population.timetables)
+            line += f" mean={mean:.6f}"
+        line += f" elapsed={time.perf_counter() - self.start_time:.2f}s"
+        self._write(line + (" *" if improved else ""))
+
+    def message(self, text: str) -> None:
+        """Status messages of the run; dropped only in silent mode."""
+        if self.mode != "silent":
+            self._write(text)
+
+    def start(self, data: Any, population: Any, generation_number: int = 0) -> None:
+        self.start_time = time.perf_counter()
+        if self.mode == "full":
+            print_data(data=data)
+            self._dump(population, data, generation_number)
+            print("START")
+        elif self.mode in ("periodic", "summary"):
+            self._summary("Generation", generation_number, population.timetables[0], population)
+
+    def generation(self, generation_number: int, population: Any, data: Any) -> None:
+        """Reports a generation; the population is expected to be sorted with the best first."""
+        if self.mode == "full":
+            print(f"Generation {generation_number}: Best fitness = {population.timetables[0].fitness}")
+            self._dump(population, data, generation_number)
+        elif self.mode in ("periodic", "summary"):
+            self._summary("Generation", generation_number, population.timetables[0], population)
+            if self.mode == "periodic" and generation_number % self.interval == 0:
+                stream_population_timetables(population, generation_number)
+                print_timetable_as_table(data=data, timetable=population.timetables[0], generation=generation_number)
+
+    def iteration(self, iteration: int, best_timetable: Any) -> None:
+        """Reports the progress of a single-solution engine."""
+        if self.mode == "full":
+            print(f"Iteration {iteration}: Best fitness = {best_timetable.fitness}")
+        elif self.mode in ("periodic", "summary"):
+            self._summary("Iteration", iteration, best_timetable)
+
+    def island(self, island_idx: int, generation_number: int, best_fitness: float) -> None:
+        """Reports the best fitness of one island of the island model after a migration."""
+        if self.mode in ("full", "periodic", "summary"):
+            self._write(f"Island {island_idx}, generation {generation_number}: Best fitness = {best_fitness}")
+
+    def final(self, data: Any, best_timetable: Any, step: int, population: Any = None) -> None:
+        if self.mode == "silent":
+            return
+        if self.mode == "full" and population is not None:
+            self._dump(population, data, step)
+        else:
+            print_timetable_as_table(data=data, timetable=best_timetable, generation=step)
+
+    def _dump(self, population: Any, data: Any, generation_number: int) -> None:
+        print_population_timetables(population=population, generation_number=generation_number)
+        print_timetable_as_table(data=data, timetable=population.timetables[0], generation=generation_number)
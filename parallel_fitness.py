@@ -0,0 +1,93 @@
+#parallel_fitness.py
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.context import BaseContext
+from typing import Any, List, Optional, Sequence, Tuple
+
+from batch_fitness import evaluate_population_fitness
+from fitness_objectives import FitnessObjective, get_objective, register_objective
+from instrumentation import evaluation_counters
+from timetable import Timetable
+
+_worker_data: Any = None
+
+
+def _init_worker(data: Any, objective: FitnessObjective) -> None:
+    """
+    Runs once in every worker process: keeps the problem data for all later tasks.
+
+    The objective is registered again because objectives built at run time
+    (e.g. "<base>+deviation") exist only in the parent's registry, which
+    workers do not inherit with the spawn or forkserver start methods.
+    """
+    global _worker_data
+    _worker_data = data
+    register_objective(objective)
+
+
+def _evaluate_chunk(genomes: List[bytes]) -> List[Tuple[float, Optional[int]]]:
+    """Evaluates a chunk of compact genomes inside a worker process."""
+    timetables = [Timetable.from_genome(_worker_data, genome) for genome in genomes]
+    evaluate_population_fitness(timetables)
+    keep_conflicts = get_objective(_worker_data.fitness_function).tracks_conflicts
+    return [(timetable.fitness, timetable.conflicts_count if keep_conflicts else None) for timetable in timetables]
+
+
+class ParallelFitnessEvaluator:
+    """
+    Evaluates timetable fitness in a persistent pool of worker processes.
+
+    Every worker receives the Data object and its fitness objective once
+    through the pool initializer; afterwards only compact genomes
+    (Timetable.to_genome) travel to the workers and (fitness, conflicts)
+    pairs come back, one chunk per task. mp_context selects the start method
+    of the workers (the platform default when omitted). With workers <= 1
+    everything runs serially in the current process, which gives the same
+    results and is convenient for debugging.
+    """
+
+    def __init__(self, data: Any, workers: Optional[int] = None, chunk_size: int = 64,
+                 mp_context: Optional[BaseContext] = None):
+        if chunk_size <= 0:
+            raise ValueError("Chunk size must be a positive integer.")
+        self.data = data
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.chunk_size = chunk_size
+        self._executor: Optional[ProcessPoolExecutor] = None
+        if self.workers > 1:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=mp_context,
+                                                 initializer=_init_worker,
+                                                 initargs=(data, get_objective(data.fitness_function)))
+
+    @property
+    def is_parallel(self) -> bool:
+        return self._executor is not None
+
+    def evaluate(self, timetables: Sequence[Timetable]) -> List[float]:
+        """Returns the fitness vector of the timetables, evaluating stale ones in the pool."""
+        if self._executor is None:
+            return evaluate_population_fitness(timetables)
+
+        stale = [timetable for timetable in timetables if timetable.needs_full_evaluation]
+        chunks = [stale[start:start + self.chunk_size] for start in range(0, len(stale), self.chunk_size)]
+        payloads = [[timetable.to_genome() for timetable in chunk] for chunk in chunks]
+
+        for chunk, results in zip(chunks, self._executor.map(_evaluate_chunk, payloads)):
+            for timetable, (fitness, conflicts_count) in zip(chunk, results):
+                timetable.set_fitness(fitness, conflicts_count)
+        evaluation_counters.batch += len(stale)
+
+        return [timetable.fitness for timetable in timetables]
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self) -> 'ParallelFitnessEvaluator':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
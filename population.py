@@ -1,17 +1,51 @@
 #population.py
 
-from typing import List, Any
+from typing import List, Any, Iterable, Optional
 from timetable import Timetable
+from random_stream import RandomStream
+from constructive_init import DEFAULT_INIT_RANDOMNESS
+from batch_fitness import evaluate_population_fitness
 
 class Population:
-    def __init__(self, size: int, data: Any):
+    def __init__(self, size: int, data: Any, rng: Optional[RandomStream] = None,
+                 init_randomness: float = DEFAULT_INIT_RANDOMNESS):
+        # init_randomness — частка занять, що розміщуються випадково (1.0 — повністю випадкові розклади).
         if size <= 0:
             raise ValueError("Population size must be a positive integer.")
-        self.timetables: List[Timetable] = [Timetable(data).initialize() for _ in range(size)]
+        self.timetables: List[Optional[Timetable]] = [
+            Timetable(data, rng=rng).initialize(init_randomness) for _ in range(size)
+        ]
+
+    @classmethod
+    def from_timetables(cls, timetables: Iterable[Timetable]) -> 'Population':
+        # Створює популяцію з готових розкладів без генерації випадкових.
+        population = cls.__new__(cls)
+        population.timetables = list(timetables)
+        return population
+
+    @classmethod
+    def empty(cls) -> 'Population':
+        return cls.from_timetables([])
+
+    @classmethod
+    def preallocated(cls, size: int) -> 'Population':
+        # Популяція з size порожніми місцями (None), які заповнює викликач.
+        if size <= 0:
+            raise ValueError("Population size must be a positive integer.")
+        return cls.from_timetables([None] * size)
 
     def __str__(self) -> str:
         return "\n".join(str(timetable) for timetable in self.timetables)
 
-    def sort_by_fitness(self) -> 'Population':
-        self.timetables.sort(key=lambda timetable: timetable.fitness, reverse=True)
+    def fitness_vector(self, evaluator: Any = None) -> List[float]:
+        # Обчислює фітнес усіх розкладів одним пакетом (лише для розкладів зі застарілим фітнесом).
+        # evaluator — необов'язковий оцінювач з методом evaluate(timetables), напр. ParallelFitnessEvaluator.
+        if evaluator is not None:
+            return evaluator.evaluate(self.timetables)
+        return evaluate_population_fitness(self.timetables)
+
+    def sort_by_fitness(self, evaluator: Any = None) -> 'Population':
+        fitness_values = self.fitness_vector(evaluator)
+        order = sorted(range(len(self.timetables)), key=fitness_values.__getitem__, reverse=True)
+        self.timetables[:] = [self.timetables[idx] for idx in order]
         return self
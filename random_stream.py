@@ -0,0 +1,92 @@
+#random_stream.py
+
+import hashlib
+import random
+from typing import Any, List, MutableSequence, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional: bulk draws then fall back to Python lists
+    np = None
+
+
+def _derive_seed(seed: Any, key: Any) -> int:
+    """Derives a 64-bit seed for a child stream from the parent seed and a key."""
+    digest = hashlib.sha256(f"{seed}/{key}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "little")
+
+
+class RandomStream:
+    """
+    Seedable source of randomness for one component (GA, timetable, island, ...).
+
+    Scalar draws come from a private random.Random; bulk draws for a whole
+    generation come from a NumPy Generator seeded from the same seed when
+    NumPy is installed. Independent child streams are derived with spawn(),
+    so islands and workers get reproducible streams that do not overlap.
+    """
+
+    def __init__(self, seed: Optional[int] = None):
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(64)
+        self.seed = seed
+        self._random = random.Random(seed)
+        self._generator = np.random.default_rng(_derive_seed(seed, "bulk")) if np is not None else None
+
+    def random(self) -> float:
+        """Returns a random number in the range [0, 1)."""
+        return self._random.random()
+
+    def index(self, size: int) -> int:
+        """Returns a random index in the range [0, size)."""
+        return int(self._random.random() * size)
+
+    def choice(self, items: Sequence[Any]) -> Any:
+        """Returns a random item of a non-empty sequence."""
+        return items[self.index(len(items))]
+
+    def shuffle(self, items: MutableSequence[Any]) -> None:
+        self._random.shuffle(items)
+
+    def bulk(self, size: int) -> Any:
+        """Returns `size` random numbers in [0, 1) at once (a NumPy array when NumPy is available)."""
+        if self._generator is not None:
+            return self._generator.random(size)
+        return [self._random.random() for _ in range(size)]
+
+    def spawn(self, key: Any) -> 'RandomStream':
+        """Returns an independent child stream; the same seed and key always give the same stream."""
+        return RandomStream(_derive_seed(self.seed, key))
+
+    def getstate(self) -> dict:
+        return {
+            "seed": self.seed,
+            "random": self._random.getstate(),
+            "generator": self._generator.bit_generator.state if self._generator is not None else None,
+        }
+
+    def setstate(self, state: dict) -> None:
+        self.seed = state["seed"]
+        self._random.setstate(state["random"])
+        if self._generator is not None and state["generator"] is not None:
+            self._generator.bit_generator.state = state["generator"]
+
+
+_default_stream = RandomStream()
+
+
+def default_stream() -> RandomStream:
+    """The stream used by components that were not given one explicitly."""
+    return _default_stream
+
+
+def seed_default_stream(seed: Optional[int]) -> RandomStream:
+    """Reseeds the default stream (e.g. from main's --seed option) and returns it."""
+    global _default_stream
+    _default_stream = RandomStream(seed)
+    return _default_stream
+
+
+def spawn_streams(stream: RandomStream, count: int, prefix: str = "") -> List[RandomStream]:
+    """Derives `count` independent child streams, e.g. one per island."""
+    return [stream.spawn(f"{prefix}{idx}") for idx in range(count)]
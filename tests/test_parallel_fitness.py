@@ -0,0 +1,33 @@
+#tests/test_parallel_fitness.py
+
+import multiprocessing
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from data import Data
+from parallel_fitness import ParallelFitnessEvaluator
+from random_stream import RandomStream
+from timetable import Timetable
+from warm_start import penalize_deviation
+
+
+def test_spawned_workers_evaluate_a_deviation_objective():
+    # "conflicts+deviation" is registered at run time, so spawned workers only know it from the initializer
+    data = Data.from_csv(os.path.join(ROOT, "user_data"))
+    rng = RandomStream(1)
+    reference = Timetable(data=data, rng=rng).initialize()
+    penalize_deviation(data, reference, weight=0.5)
+    timetables = [Timetable(data=data, rng=rng).initialize(1.0) for _ in range(8)]
+    genomes = [timetable.to_genome() for timetable in timetables]
+
+    with ParallelFitnessEvaluator(data, workers=2, chunk_size=3,
+                                  mp_context=multiprocessing.get_context("spawn")) as evaluator:
+        parallel = evaluator.evaluate(timetables)
+    serial = ParallelFitnessEvaluator(data, workers=1).evaluate(
+        [Timetable.from_genome(data, genome) for genome in genomes])
+
+    assert data.fitness_function == "conflicts+deviation"
+    assert parallel == serial
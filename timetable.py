@@ -1,173 +1,368 @@
 #timetable.py
 
-from typing import List, Any
-from output_utils import get_random_number
-from models import StudySession, StudentGroup, Course, TimeSlot
-from data import Data
+from array import array
+from typing import List, Any, Optional, Tuple
+from models import StudySession, Course
+from incremental_fitness import ScoreCounters
+from fitness_objectives import get_objective
+from data_index import BALANCE_DAYS, GAP_THRESHOLD_MINUTES
+from random_stream import RandomStream, default_stream
+from constructive_init import construct_timetable
+from instrumentation import evaluation_counters
 
 
 class Timetable:
-    def __init__(self, data: Any = None, fitness_function: str = "combined"):
+    def __init__(self, data: Any, fitness_function: str = "combined", rng: Optional[RandomStream] = None):
         if data is None:
-            data = Data(fitness_function=fitness_function)
+            raise ValueError("Timetable requires loaded data (see Data.from_csv / Data.from_sqlite).")
         self.data = data
         self.fitness_function = fitness_function
-        self._study_sessions: List[StudySession] = []
-        self.study_session_number = 0
+        self.rng = rng if rng is not None else default_stream()  # Потік випадкових чисел для initialize()
+        # Компактний геном: паралельні масиви індексів для кожного заняття.
+        # Змінюється лише через методи set_slot / set_teacher / set_room / add_session / remove_session,
+        # які позначають кешований фітнес як застарілий.
+        # _layout_genes вказує на запис data.session_layout (курс, група),
+        # решта масивів — індекси у data.teachers, data.classrooms та data.time_slots.
+        self._layout_genes = array('H')
+        self._teacher_genes = array('H')
+        self._classroom_genes = array('H')
+        self._time_slot_genes = array('H')
         self._fitness = -1.0
         self.conflicts_count = 0
-        self.is_fitness_changed = True
+        self._is_fitness_changed = True
+        # Лічильники зайнятості для інкрементального (дельта) перерахунку фітнесу.
+        # Створюються під час першої мутації і далі оновлюються за O(1) на кожне змінене заняття.
+        self._score_counters: Optional[ScoreCounters] = None
 
     def __str__(self) -> str:
-        return "\n".join(str(c) for c in self._study_sessions)
+        return "\n".join(str(c) for c in self.decode())
+
+    def clone(self) -> 'Timetable':
+        # Структурне копіювання: дані (курси, групи, викладачі, аудиторії) спільні,
+        # копіюються лише масиви генів, кешований фітнес і лічильники зайнятості.
+        timetable = Timetable.__new__(Timetable)
+        timetable.data = self.data
+        timetable.fitness_function = self.fitness_function
+        timetable.rng = self.rng
+        timetable._layout_genes = array('H', self._layout_genes)
+        timetable._teacher_genes = array('H', self._teacher_genes)
+        timetable._classroom_genes = array('H', self._classroom_genes)
+        timetable._time_slot_genes = array('H', self._time_slot_genes)
+        timetable._fitness = self._fitness
+        timetable.conflicts_count = self.conflicts_count
+        timetable._is_fitness_changed = self._is_fitness_changed
+        timetable._score_counters = None if self._score_counters is None else self._score_counters.copy()
+        return timetable
+
+    def to_genome(self) -> bytes:
+        # Компактне подання для передачі між процесами: чотири масиви генів підряд.
+        return (self._layout_genes.tobytes() + self._teacher_genes.tobytes()
+                + self._classroom_genes.tobytes() + self._time_slot_genes.tobytes())
+
+    @classmethod
+    def from_genome(cls, data: Any, genome: bytes, fitness_function: str = "combined",
+                    rng: Optional[RandomStream] = None) -> 'Timetable':
+        # Відновлює розклад з байтів, отриманих від to_genome().
+        genes = array('H')
+        genes.frombytes(genome)
+        size = len(genes) // 4
+        timetable = cls(data=data, fitness_function=fitness_function, rng=rng)
+        timetable._layout_genes = genes[:size]
+        timetable._teacher_genes = genes[size:2 * size]
+        timetable._classroom_genes = genes[2 * size:3 * size]
+        timetable._time_slot_genes = genes[3 * size:]
+        return timetable
+
+    def __copy__(self) -> 'Timetable':
+        return self.clone()
+
+    def __deepcopy__(self, memo: dict) -> 'Timetable':
+        # Глибока копія не повинна тягнути за собою весь об'єкт Data.
+        return self.clone()
+
+    def __len__(self) -> int:
+        return len(self._layout_genes)
 
     @property
     def fitness(self) -> float:
-        if self.is_fitness_changed:
-            self._fitness = self.calculate_fitness()
-            self.is_fitness_changed = False
+        if self._is_fitness_changed:
+            objective = get_objective(self.data.fitness_function)
+            if self._score_counters is not None and self._score_counters.covers(objective):
+                evaluation_counters.delta += 1
+                fitness, conflicts_count = self._score_counters.score(objective)
+                self.set_fitness(fitness, conflicts_count)
+            else:
+                evaluation_counters.full += 1
+                self._fitness = self.calculate_fitness()
+                self._is_fitness_changed = False
+        else:
+            evaluation_counters.cached += 1
         return self._fitness
 
     @property
-    def study_sessions(self) -> List[StudySession]:
-        self.is_fitness_changed = True
-        return self._study_sessions
-
-    def initialize(self) -> 'Timetable':
-        for group in self.data.groups:
-            for course in group.courses:
-                required_sessions = self.get_required_sessions(course)
-                for _ in range(required_sessions):
-                    self._create_study_session(course, group)
+    def is_fitness_changed(self) -> bool:
+        return self._is_fitness_changed
+
+    @property
+    def needs_full_evaluation(self) -> bool:
+        # Фітнес застарів і не може бути отриманий з лічильників — потрібен повний перерахунок.
+        if not self._is_fitness_changed:
+            return False
+        return (self._score_counters is None
+                or not self._score_counters.covers(get_objective(self.data.fitness_function)))
+
+    def set_fitness(self, fitness: float, conflicts_count: Optional[int] = None) -> None:
+        # Зберігає фітнес, обчислений ззовні (наприклад, пакетним оцінювачем популяції).
+        self._fitness = fitness
+        if conflicts_count is not None:
+            self.conflicts_count = conflicts_count
+        self._is_fitness_changed = False
+
+    @property
+    def study_sessions(self) -> Tuple[StudySession, ...]:
+        # Представлення лише для читання: зміни розкладу робляться через явні методи-мутатори.
+        return tuple(self.decode())
+
+    @property
+    def layout_genes(self) -> memoryview:
+        return memoryview(self._layout_genes).toreadonly()
+
+    @property
+    def teacher_genes(self) -> memoryview:
+        return memoryview(self._teacher_genes).toreadonly()
+
+    @property
+    def classroom_genes(self) -> memoryview:
+        return memoryview(self._classroom_genes).toreadonly()
+
+    @property
+    def time_slot_genes(self) -> memoryview:
+        return memoryview(self._time_slot_genes).toreadonly()
+
+    def decode(self) -> List[StudySession]:
+        # Розгортає компактний геном у список об'єктів StudySession (лише для відображення та експорту).
+        study_sessions = []
+        for idx in range(len(self._layout_genes)):
+            course_idx, group_idx = self.data.session_layout[self._layout_genes[idx]]
+            study_session = StudySession(id=idx,
+                                         course=self.data.courses[course_idx],
+                                         student_group=self.data.groups[group_idx])
+            study_session.teacher = self.data.teachers[self._teacher_genes[idx]]
+            study_session.classroom = self.data.classrooms[self._classroom_genes[idx]]
+            study_session.time_slot = self.data.time_slots[self._time_slot_genes[idx]]
+            study_sessions.append(study_session)
+        return study_sessions
+
+    def initialize(self, randomness: float = 1.0) -> 'Timetable':
+        # randomness = 1 — усі заняття розміщуються випадково; менші значення вмикають
+        # конструктивну евристику (кваліфіковані викладачі, місткі аудиторії, вільні слоти).
+        if randomness < 1.0:
+            return construct_timetable(self, randomness)
+        for layout_idx in self.data.initial_layout:
+            self._create_study_session(layout_idx)
         return self
 
     def get_required_sessions(self, course: Course) -> int:
-        if course.course_type == "lection":
-            return 2
-        elif course.course_type == "lab":
-            return 1
-        else:
-            return 1
+        return self.data.get_required_sessions(course)
+
+    def add_session(self, layout_idx: int, teacher_idx: int, classroom_idx: int, time_slot_idx: int) -> None:
+        # Додає одне заняття до геному розкладу.
+        self._layout_genes.append(layout_idx)
+        self._teacher_genes.append(teacher_idx)
+        self._classroom_genes.append(classroom_idx)
+        self._time_slot_genes.append(time_slot_idx)
+        if self._score_counters is not None:
+            self._score_counters.add(layout_idx, teacher_idx, classroom_idx, time_slot_idx)
+        self._is_fitness_changed = True
+
+    def remove_session(self, idx: int) -> None:
+        # Видаляє заняття з вказаним індексом з геному розкладу.
+        self._ensure_score_counters().remove(*self.get_session_genes(idx))
+        del self._layout_genes[idx]
+        del self._teacher_genes[idx]
+        del self._classroom_genes[idx]
+        del self._time_slot_genes[idx]
+        self._is_fitness_changed = True
+
+    def set_slot(self, idx: int, time_slot_idx: int) -> None:
+        self.reassign_session(idx, time_slot_idx=time_slot_idx)
+
+    def set_teacher(self, idx: int, teacher_idx: int) -> None:
+        self.reassign_session(idx, teacher_idx=teacher_idx)
+
+    def set_room(self, idx: int, classroom_idx: int) -> None:
+        self.reassign_session(idx, classroom_idx=classroom_idx)
+
+    def extend_sessions(self, other: 'Timetable', start: int = 0) -> None:
+        # Дописує в кінець розкладу заняття іншого розкладу, починаючи з індексу start.
+        if start >= len(other):
+            return
+        self._layout_genes.extend(other._layout_genes[start:])
+        self._teacher_genes.extend(other._teacher_genes[start:])
+        self._classroom_genes.extend(other._classroom_genes[start:])
+        self._time_slot_genes.extend(other._time_slot_genes[start:])
+        if self._score_counters is not None:
+            for idx in range(len(self) - (len(other) - start), len(self)):
+                self._score_counters.add(*self.get_session_genes(idx))
+        self._is_fitness_changed = True
+
+    def reverse_sessions(self, indices: List[int]) -> None:
+        # Інвертує порядок занять на вказаних позиціях. Це лише перестановка,
+        # тож фітнес (і лічильники) не змінюються і кеш лишається дійсним.
+        for genes in (self._layout_genes, self._teacher_genes, self._classroom_genes, self._time_slot_genes):
+            reversed_genes = [genes[idx] for idx in reversed(indices)]
+            for idx, gene in zip(indices, reversed_genes):
+                genes[idx] = gene
+
+    def reassign_session(self, idx: int, teacher_idx: Optional[int] = None, classroom_idx: Optional[int] = None,
+                         time_slot_idx: Optional[int] = None) -> None:
+        # Змінює викладача, аудиторію та/або час одного заняття з дельта-оновленням фітнесу.
+        score_counters = self._ensure_score_counters()
+        score_counters.remove(*self.get_session_genes(idx))
+        if teacher_idx is not None:
+            self._teacher_genes[idx] = teacher_idx
+        if classroom_idx is not None:
+            self._classroom_genes[idx] = classroom_idx
+        if time_slot_idx is not None:
+            self._time_slot_genes[idx] = time_slot_idx
+        score_counters.add(*self.get_session_genes(idx))
+        self._is_fitness_changed = True
+
+    def swap_time_slots(self, idx1: int, idx2: int) -> None:
+        # Обмінює часові слоти двох занять (дві дельти замість повного перерахунку).
+        time_slot1, time_slot2 = self._time_slot_genes[idx1], self._time_slot_genes[idx2]
+        if time_slot1 != time_slot2:
+            self.reassign_session(idx1, time_slot_idx=time_slot2)
+            self.reassign_session(idx2, time_slot_idx=time_slot1)
+
+    def get_session_genes(self, idx: int) -> Tuple[int, int, int, int]:
+        # Повертає гени заняття: (запис розкладки, викладач, аудиторія, часовий слот).
+        return (self._layout_genes[idx], self._teacher_genes[idx],
+                self._classroom_genes[idx], self._time_slot_genes[idx])
 
-    def _create_study_session(self, course: Course, group: StudentGroup) -> None:
-        # Створює та додає новий клас (заняття) до розкладу для вказаного курсу та групи студентів.
+    @property
+    def score_counters(self) -> ScoreCounters:
+        # Лічильники зайнятості (групи, викладачі, аудиторії по слотах) — лише для читання.
+        return self._ensure_score_counters()
+
+    def _ensure_score_counters(self) -> ScoreCounters:
+        # Лічильники будуються один раз (O(занять)), далі кожна зміна коштує O(1).
+        # Лічильники ведуть лише ті компоненти, від яких залежить обрана функція фітнесу.
+        if self._score_counters is None:
+            components = get_objective(self.data.fitness_function).components
+            self._score_counters = ScoreCounters.from_timetable(self, components)
+        return self._score_counters
+
+    def _create_study_session(self, layout_idx: int) -> None:
+        # Створює та додає новий клас (заняття) до розкладу для вказаного запису розкладки (курс, група).
         # Визначення списку всіх доступних викладачів для призначення.
         suitable_teachers = self.data.teachers
 
         if not suitable_teachers:
+            course_idx, group_idx = self.data.session_layout[layout_idx]
+            course = self.data.courses[course_idx]
+            group = self.data.groups[group_idx]
             print(
                 f"Немає доступних викладачів для курсу '{course.name}' ({course.number}) у групі '{group.name}'")
             return
 
         # 3. Призначення випадкових значень для часу проведення, викладача та аудиторії.
         # Це робиться без перевірки на конфлікти з іншими заняттями.
-        time_slot = self._get_random_item(self.data.time_slots)
-        teacher = self._get_random_item(suitable_teachers)
-        classroom = self._get_random_item(self.data.classrooms)
-
-        # 4. Створення нового об'єкта класу (заняття) і заповнення його даними.
-        # Встановлення індексу класу, групи студентів, часу, аудиторії та викладача.
-        new_study_session = StudySession(id=self.study_session_number, course=course, student_group=group)
-        self.study_session_number += 1
-        new_study_session.time_slot = time_slot
-        new_study_session.classroom = classroom
-        new_study_session.teacher = teacher
-
-        # 5. Додавання нового заняття до загального розкладу (списку занять).
-        # Цей клас зберігається у списку _classes, який представляє повний розклад.
-        self._study_sessions.append(new_study_session)
+        time_slot_idx = self._get_random_index(self.data.index.num_time_slots)
+        teacher_idx = self._get_random_index(len(suitable_teachers))
+        classroom_idx = self._get_random_index(self.data.index.num_classrooms)
+
+        # 4. Додавання нового заняття до компактного геному розкладу.
+        self.add_session(layout_idx, teacher_idx, classroom_idx, time_slot_idx)
 
     def _calculate_conflicts(self) -> int:
         # Підраховує кількість конфліктів у розкладі, перевіряючи:
         # конфлікти за групами, викладачами, аудиторіями та місткістю аудиторій.
 
         number_of_conflicts = 0  # Ініціалізація лічильника конфліктів.
+        index = self.data.index
+        num_slots = index.num_time_slots
+        layout_groups = index.layout_groups
+        over_capacity = index.over_capacity
 
-        group_timetable = {}  # Словник для відстеження конфліктів за групами.
-        teacher_timetable = {}  # Словник для відстеження конфліктів за викладачами.
-        classroom_timetable = {}  # Словник для відстеження конфліктів за аудиторіями.
+        group_timetable = set()  # Множина для відстеження конфліктів за групами.
+        teacher_timetable = set()  # Множина для відстеження конфліктів за викладачами.
+        classroom_timetable = set()  # Множина для відстеження конфліктів за аудиторіями.
 
         # Проходимо по кожному заняттю і перевіряємо конфлікти.
-        for _study_session in self._study_sessions:
-            group_key = (_study_session.student_group.name, _study_session.time_slot.id)  # Унікальний ключ для групи.
-            teacher_key = (_study_session.teacher.id, _study_session.time_slot.id)  # Унікальний ключ для викладача.
-            classroom_key = (_study_session.classroom.number, _study_session.time_slot.id)  # Унікальний ключ для аудиторії.
+        # Ключі — цілі числа "індекс * кількість слотів + слот" замість кортежів з рядками.
+        for layout_idx, teacher_idx, classroom_idx, time_slot_idx in zip(
+                self._layout_genes, self._teacher_genes, self._classroom_genes, self._time_slot_genes):
+            group_idx = layout_groups[layout_idx]
+            group_key = group_idx * num_slots + time_slot_idx  # Унікальний ключ для групи.
+            teacher_key = teacher_idx * num_slots + time_slot_idx  # Унікальний ключ для викладача.
+            classroom_key = classroom_idx * num_slots + time_slot_idx  # Унікальний ключ для аудиторії.
 
             # Перевірка конфліктів для групи: якщо група має заняття у той самий час.
             if group_key in group_timetable:
                 number_of_conflicts += 1
             else:
-                group_timetable[group_key] = True
+                group_timetable.add(group_key)
 
             # Перевірка конфліктів для викладача: якщо викладач зайнятий у той самий час.
             if teacher_key in teacher_timetable:
                 number_of_conflicts += 1
             else:
-                teacher_timetable[teacher_key] = True
+                teacher_timetable.add(teacher_key)
 
             # Перевірка конфліктів для аудиторії: якщо аудиторія зайнята у той самий час.
             if classroom_key in classroom_timetable:
                 number_of_conflicts += 1
             else:
-                classroom_timetable[classroom_key] = True
+                classroom_timetable.add(classroom_key)
 
             # Перевірка місткості аудиторії: якщо кількість студентів більше місткості аудиторії.
-            if _study_session.classroom and _study_session.student_group.num_students > _study_session.classroom.seating_capacity:
+            if over_capacity[group_idx][classroom_idx]:
                 number_of_conflicts += 1
 
         return number_of_conflicts  # Повертаємо загальну кількість конфліктів.
 
     def _get_random_item(self, items: List[Any]) -> Any:
         # Вибирає випадковий елемент зі списку переданих об'єктів.
-        return items[int(get_random_number() * len(items))]
+        return self.rng.choice(items)
+
+    def _get_random_index(self, size: int) -> int:
+        # Вибирає випадковий індекс у діапазоні [0, size).
+        return self.rng.index(size)
 
     def _calculate_gaps_penalty(self) -> int:
         # Обчислює штрафи за наявність «вікон» у розкладі для викладачів та груп.
 
         gaps_penalty = 0  # Ініціалізація штрафу за вікна
-
-        def time_to_minutes(time_str: str) -> int:
-            # Допоміжна функція для перетворення часу у хвилини.
-            # Перетворює початковий час заняття у хвилини від початку доби для зручності обчислень.
-            start_time = time_str.split(' - ')[0]
-            hours, minutes = map(int, start_time.split(':'))
-            return hours * 60 + minutes
+        index = self.data.index
+        num_days = index.num_days
 
         # 1. Ініціалізація словників для зберігання розкладів викладачів та студентських груп.
+        # Ключ — "ресурс * кількість днів + день", значення — список початків занять у хвилинах.
         teacher_daily_timetable = {}
         group_daily_timetable = {}
 
         # 2. Обробка кожного заняття у розкладі.
-        # Для кожного заняття визначаємо час у хвилинах та день тижня,
-        # і додаємо цю інформацію до відповідних словників для викладачів і груп.
-        for _class in self._study_sessions:
-            time_in_minutes = time_to_minutes(_class.time_slot.time)
-            day = _class.time_slot.day
+        # День і час у хвилинах беруться з попередньо обчисленого індексу слотів.
+        for layout_idx, teacher_idx, time_slot_idx in zip(self._layout_genes, self._teacher_genes,
+                                                          self._time_slot_genes):
+            time_in_minutes = index.slot_minutes[time_slot_idx]
+            day = index.slot_days[time_slot_idx]
 
             # Додавання часу заняття до розкладу викладача
-            teacher = _class.teacher.id
-            teacher_daily_timetable.setdefault(teacher, {}).setdefault(day, []).append(time_in_minutes)
+            teacher_daily_timetable.setdefault(teacher_idx * num_days + day, []).append(time_in_minutes)
 
             # Додавання часу заняття до розкладу групи
-            group = _class.student_group.name
-            group_daily_timetable.setdefault(group, {}).setdefault(day, []).append(time_in_minutes)
+            group_idx = index.layout_groups[layout_idx]
+            group_daily_timetable.setdefault(group_idx * num_days + day, []).append(time_in_minutes)
 
-        # 3. Підрахунок штрафів за «вікна» у розкладі викладачів.
+        # 3. Підрахунок штрафів за «вікна» у розкладі викладачів і груп.
         # Сортуємо заняття по часу і перевіряємо наявність проміжків більше 95 хвилин між заняттями одного дня.
-        for timetable in teacher_daily_timetable.values():
-            for times in timetable.values():
-                times.sort()
-                for i in range(len(times) - 1):
-                    if times[i + 1] - times[i] > 95:
-                        gaps_penalty += 1
-
-        # 4. Підрахунок штрафів за «вікна» у розкладі студентських груп.
-        # Аналогічний процес, що й для викладачів, але для розкладу груп.
-        for timetable in group_daily_timetable.values():
-            for times in timetable.values():
+        for daily_timetable in (teacher_daily_timetable, group_daily_timetable):
+            for times in daily_timetable.values():
                 times.sort()
                 for i in range(len(times) - 1):
-                    if times[i + 1] - times[i] > 95:
+                    if times[i + 1] - times[i] > GAP_THRESHOLD_MINUTES:
                         gaps_penalty += 1
 
         # Повертаємо загальний штраф за наявність «вікон» у розкладі.
@@ -177,14 +372,16 @@ class Timetable:
         # Розраховує штраф за незбалансованість розкладу протягом тижня.
 
         # 1. Ініціалізація підрахунку занять для кожного дня тижня.
-        day_counts = {day: 0 for day in ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]}
+        counts = [0] * len(BALANCE_DAYS)
 
         # 2. Підрахунок кількості занять для кожного дня, заснований на розкладі.
-        for _class in self._study_sessions:
-            day_counts[_class.time_slot.day] += 1
+        slot_balance_days = self.data.index.slot_balance_days
+        for time_slot_idx in self._time_slot_genes:
+            day = slot_balance_days[time_slot_idx]
+            if day >= 0:
+                counts[day] += 1
 
         # 3. Знаходження максимального та мінімального значення кількості занять за тиждень.
-        counts = list(day_counts.values())
         max_count = max(counts)
         min_count = min(counts)
 
@@ -196,178 +393,92 @@ class Timetable:
         balance_penalty = (max_count - min_count) / max_count
         return balance_penalty
 
+    def _calculate_hours_penalty(self) -> int:
+        # Штраф за неправильну кількість годин для кожного курсу в кожній групі.
+        hours_penalty = 0
+
+        # Підраховуємо кількість занять для кожної пари (курс, група) за індексом розкладки
+        index = self.data.index
+        layout_counts = [0] * index.num_layouts
+        for layout_idx in self._layout_genes:
+            layout_counts[layout_idx] += 1
+
+        # Додаємо модуль різниці між фактичною і необхідною кількістю годин до пенальті
+        # (вага — скільки разів курс вказаний для групи)
+        for actual_hours, required_hours, weight in zip(layout_counts, index.required_hours, index.required_weight):
+            hours_penalty += weight * abs(actual_hours - required_hours)
+        return hours_penalty
+
+    def _calculate_deviation_penalty(self) -> int:
+        # Кількість занять попереднього плану (data.reference_plan), яких немає в розкладі без змін.
+        index = self.data.index
+        if not index.reference_total:
+            return 0
+        assignment_counts = {}
+        for genes in zip(self._layout_genes, self._teacher_genes, self._classroom_genes, self._time_slot_genes):
+            key = index.assignment_key(*genes)
+            assignment_counts[key] = assignment_counts.get(key, 0) + 1
+        matched = sum(min(count, assignment_counts.get(key, 0)) for key, count in index.reference_counts.items())
+        return index.reference_total - matched
+
+    # Обчислювачі компонентів фітнесу (див. fitness_objectives.COMPONENTS)
+    _COMPONENT_KERNELS = {
+        "conflicts": "_calculate_conflicts",
+        "gaps": "_calculate_gaps_penalty",
+        "hours": "_calculate_hours_penalty",
+        "teacher_constraints": "calculate_teacher_constraints_penalty",
+        "balance": "_calculate_balance_penalty",
+        "deviation": "_calculate_deviation_penalty",
+    }
+
     def calculate_fitness(self) -> float:
         """
         Розраховує фітнес розкладу, щоб оцінити його оптимальність.
-        Додає пенальті за неправильну кількість годин для кожного курсу в кожній групі.
+        Функція фітнесу береться з реєстру fitness_objectives за іменем data.fitness_function;
+        обчислюються лише ті компоненти (конфлікти, «вікна», години, обмеження викладачів,
+        збалансованість), від яких вона залежить.
         """
+        objective = get_objective(self.data.fitness_function)
+        values = {component: getattr(self, self._COMPONENT_KERNELS[component])()
+                  for component in objective.components}
 
-        # 1. Оновлюємо кількість конфліктів у розкладі та обчислюємо штраф за "вікна" і обмеження для викладачів.
-        number_of_conflicts = self._calculate_conflicts()
-        gaps_penalty = self._calculate_gaps_penalty()
-        teacher_constraints_penalty = self.calculate_teacher_constraints_penalty()
-
-        # Додатковий штраф за неправильну кількість годин
-        hours_penalty = 0
-
-        # Перевіряємо кожну групу і курс, обчислюючи фактичну кількість годин для кожного курсу в розкладі
-        for group in self.data.groups:
-            group_sessions = [
-                session for session in self.study_sessions if session.student_group.id == group.id
-            ]
-            for course in group.courses:
-                # Отримуємо потрібну кількість годин із CSV (визначено в атрибуті course.hours_per_week)
-                required_hours = course.hours_per_week
-                # Розраховуємо фактичну кількість занять для цього курсу
-                actual_sessions = sum(1 for session in group_sessions if session.course.number == course.number)
-                # Розраховуємо фактичну кількість годин у розкладі для цього курсу
-                actual_hours = actual_sessions  # Розрахунок для годин залежно від тривалості заняття
-
-                # Додаємо модуль різниці між фактичною і необхідною кількістю годин до пенальті
-                hours_penalty += abs(actual_hours - required_hours)
-
-        # 2. Вибір метрики для розрахунку фітнесу
-        if self.data.fitness_function == "conflicts":
-            self.conflicts_count = number_of_conflicts
-            return 1 / (1.0 * (number_of_conflicts + hours_penalty + 1))
-
-        elif self.data.fitness_function == "gaps":
-            return 1 / (1.0 * (gaps_penalty + hours_penalty + 1))
-
-        elif self.data.fitness_function == "combined":
-            balance_penalty = self._calculate_balance_penalty()
-            self.conflicts_count = number_of_conflicts + gaps_penalty
-
-            # Розрахунок загального фітнесу з урахуванням різних штрафів
-            fitness = 1 / (1.0 * (self.conflicts_count + hours_penalty + teacher_constraints_penalty + 1))
-            fitness -= gaps_penalty * 0.01
-            fitness -= balance_penalty * 0.1
-
-            return fitness
-
-    def _calculate_conflicts_fitness(self) -> float:
-        # Розраховує "фітнес" на основі кількості конфліктів у розкладі.
-
-        number_of_conflicts = 0  # Ініціалізація лічильника конфліктів.
-
-        # 1. Ініціалізація структур для перевірки конфліктів для груп, викладачів та аудиторій.
-        group_timetable = {}
-        teacher_timetable = {}
-        classroom_timetable = {}
-
-        # 2. Проходимо по кожному заняттю і перевіряємо конфлікти за групою, викладачем та аудиторією.
-        for _class in self._study_sessions:
-            group_key = (_class.student_group.name, _class.time_slot.id)
-            teacher_key = (_class.teacher.id, _class.time_slot.id)
-            classroom_key = (_class.classroom.number, _class.time_slot.id)
-
-            # Перевірка конфліктів для групи: якщо ключ вже існує, додаємо конфлікт.
-            if group_key in group_timetable:
-                number_of_conflicts += 1
-            else:
-                group_timetable[group_key] = True
-
-            # Перевірка конфліктів для викладача.
-            if teacher_key in teacher_timetable:
-                number_of_conflicts += 1
-            else:
-                teacher_timetable[teacher_key] = True
-
-            # Перевірка конфліктів для аудиторії.
-            if classroom_key in classroom_timetable:
-                number_of_conflicts += 1
-            else:
-                classroom_timetable[classroom_key] = True
-
-            # Перевірка на відповідність місткості аудиторії.
-            if _class.classroom and _class.student_group.num_students > _class.classroom.seating_capacity:
-                number_of_conflicts += 1
-
-        # Зберігаємо кількість конфліктів і повертаємо фітнес значення.
-        self.conflicts_count = number_of_conflicts
-        return 1 / (1.0 * (self.conflicts_count + 1))
-
-    def _calculate_gaps_fitness(self) -> float:
-        # Розраховує "фітнес" на основі кількості "вікон" (пробілів між заняттями) у розкладі.
-        # Використовується для мінімізації непотрібних перерв між заняттями.
-
-        gaps_penalty = self._calculate_gaps_penalty()  # Отримуємо штраф за "вікна".
-        return 1 / (1.0 * (gaps_penalty + 1))  # Розраховуємо фітнес, де чим менший штраф, тим вище значення фітнесу.
-
-    def _calculate_combined_fitness(self) -> float:
-        # Розраховує комбіновану функцію "фітнесу", яка враховує кількість конфліктів,
-        # "вікна", збалансованість занять за днями.
-
-        number_of_conflicts = 0  # Ініціалізація лічильника конфліктів.
-        gaps_penalty = self._calculate_gaps_penalty()  # Штраф за "вікна".
-        balance_penalty = self._calculate_balance_penalty()  # Штраф за незбалансованість занять.
-
-        group_timetable = {}  # Словник для перевірки конфліктів за групою.
-        teacher_timetable = {}  # Словник для перевірки конфліктів за викладачем.
-        classroom_timetable = {}  # Словник для перевірки конфліктів за аудиторією.
-
-        # Проходимо по кожному заняттю в розкладі та перевіряємо конфлікти.
-        for _study_session in self._study_sessions:
-            group_key = (_study_session.student_group.name, _study_session.time_slot.id)  # Унікальний ключ для групи і часу.
-            teacher_key = (_study_session.teacher.id, _study_session.time_slot.id)  # Унікальний ключ для викладача і часу.
-            classroom_key = (_study_session.classroom.number, _study_session.time_slot.id)  # Унікальний ключ для аудиторії і часу.
-
-            # Перевірка конфліктів для групи.
-            if group_key in group_timetable:
-                number_of_conflicts += 1
-            else:
-                group_timetable[group_key] = True
-
-            # Перевірка конфліктів для викладача.
-            if teacher_key in teacher_timetable:
-                number_of_conflicts += 1
-            else:
-                teacher_timetable[teacher_key] = True
-
-            # Перевірка конфліктів для аудиторії.
-            if classroom_key in classroom_timetable:
-                number_of_conflicts += 1
-            else:
-                classroom_timetable[classroom_key] = True
-
-            # Перевірка на відповідність місткості аудиторії.
-            if _study_session.classroom and _study_session.student_group.num_students > _study_session.classroom.seating_capacity:
-                number_of_conflicts += 1
-
-        self.conflicts_count = number_of_conflicts  # Зберігаємо кількість конфліктів.
-
-        # Комбінована функція фітнесу: розраховуємо загальний фітнес з урахуванням усіх штрафів.
-        fitness = 1 / (1.0 * (self.conflicts_count + 1))  # Основний фітнес на основі кількості конфліктів.
-        fitness -= gaps_penalty * 0.01  # Враховуємо штраф за "вікна".
-        fitness -= balance_penalty * 0.1  # Враховуємо штраф за незбалансованість.
-
+        fitness, conflicts_count = objective.score(values)
+        if conflicts_count is not None:
+            self.conflicts_count = conflicts_count
         return fitness
 
+    def conflict_breakdown(self) -> dict:
+        # Розкладає штрафи розкладу за типами (для метрик поколінь).
+        counters = self.score_counters
+        return {
+            "group_clashes": sum(count - 1 for count in counters.group_slots if count > 1),
+            "teacher_clashes": sum(count - 1 for count in counters.teacher_slots if count > 1),
+            "classroom_clashes": sum(count - 1 for count in counters.classroom_slots if count > 1),
+            "capacity": counters.capacity_violations,
+            "hours": counters.hours_penalty,
+            "gaps": self._calculate_gaps_penalty(),
+            "teacher_constraints": self.calculate_teacher_constraints_penalty(),
+        }
+
     def calculate_teacher_constraints_penalty(self) -> int:
         penalty = 0
-        teacher_hours = {teacher.id: 0 for teacher in
-                         self.data.teachers}  # Словник для підрахунку годин кожного викладача
+        index = self.data.index
+        teacher_hours = [0] * index.num_teachers  # Лічильник годин кожного викладача
 
-        for session in self.study_sessions:
-            teacher = session.teacher
-            course = session.course
-
-            # Перевірка, чи існують обмеження для викладача в `data.teachers_restrictions`
-            if teacher.id not in self.data.teachers_restrictions:
+        for layout_idx, teacher_idx in zip(self._layout_genes, self._teacher_genes):
+            # Перевірка, чи існують обмеження для викладача
+            if not index.restricted[teacher_idx]:
                 continue  # Пропускаємо викладача, якщо немає обмежень
 
-            teacher_restrictions = self.data.teachers_restrictions[teacher.id]
-
-            # 1. Перевірка, чи курс дозволений для викладача
-            if course.number not in teacher_restrictions["allowed_courses"]:
+            # 1. Перевірка, чи курс дозволений для викладача (бітова маска дозволених курсів)
+            if not index.is_allowed(teacher_idx, index.layout_courses[layout_idx]):
                 penalty += 1  # Додаємо штраф, якщо курс не дозволений
 
             # 2. Додавання фактичних годин для викладача
-            # Додаємо години цього заняття
-            teacher_hours[teacher.id] += 1  # Збільшуємо годину на кожне заняття
+            teacher_hours[teacher_idx] += 1  # Збільшуємо годину на кожне заняття
 
             # 3. Перевірка на перевищення максимального навантаження
-            if teacher_hours[teacher.id] > teacher_restrictions["max_hours_per_week"]:
+            if teacher_hours[teacher_idx] > index.max_hours[teacher_idx]:
                 penalty += 1  # Додаємо штраф за перевищення годинного обмеження
 
         return penalty
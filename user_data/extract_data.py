@@ -72,17 +72,3 @@ def load_time_slots_from_csv(file_path: str) -> List[TimeSlot]:
                 day=row['day']
             ))
     return time_slots
-
-def load_teacher_constraints_from_csv(file_path):
-    teachers_restrictions = {}
-    with open(file_path, mode='r', encoding='utf-8') as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            teacher_id = int(row['id'])
-            allowed_courses = list(map(int, row['courses'].split(',')))
-            max_hours_per_week = int(row['max_hours_per_week'])
-            teachers_restrictions[teacher_id] = {
-                'allowed_courses': allowed_courses,
-                'max_hours_per_week': max_hours_per_week
-            }
-    return teachers_restrictions
\ No newline at end of file
@@ -0,0 +1,243 @@
+#generate_data.py
+
+import argparse
+import bisect
+import csv
+import math
+import os
+import sys
+from typing import Dict, List, Optional
+
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from random_stream import RandomStream
+
+DAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday")
+FIRST_SESSION_START = 8 * 60 + 40  # 08:40
+SESSION_MINUTES = 95
+BREAK_MINUTES = 20
+
+# Room mix: (seating capacity, share of the rooms)
+ROOM_MIX = ((30, 0.5), (60, 0.3), (120, 0.15), (250, 0.05))
+
+
+def _format_time(start: int) -> str:
+    end = start + SESSION_MINUTES
+    return f"{start // 60:02d}:{start % 60:02d} - {end // 60:02d}:{end % 60:02d}"
+
+
+def generate_time_slots(days_per_week: int, slots_per_day: int, weeks: int) -> List[Dict[str, str]]:
+    """Slot grid of weeks x days x slots; days after the first week are named "<day> (week N)"."""
+    if not 1 <= days_per_week <= len(DAYS):
+        raise ValueError(f"Days per week must be between 1 and {len(DAYS)}.")
+    time_slots = []
+    for week in range(1, weeks + 1):
+        for day in DAYS[:days_per_week]:
+            day_name = day if week == 1 else f"{day} (week {week})"
+            for order in range(slots_per_day):
+                start = FIRST_SESSION_START + order * (SESSION_MINUTES + BREAK_MINUTES)
+                time_slots.append({"id": f"S{len(time_slots) + 1}", "time": _format_time(start), "day": day_name})
+    return time_slots
+
+
+def generate_dataset(num_groups: int = 2000, num_teachers: int = 900, num_courses: int = 400,
+                     courses_per_group: int = 8, days_per_week: int = 5, slots_per_day: int = 6, weeks: int = 1,
+                     tightness: float = 0.8, qualifications_per_teacher: int = 3,
+                     seed: int = 0) -> Dict[str, List[Dict[str, str]]]:
+    """
+    Generates the rows of every CSV file for a synthetic problem.
+
+    Groups belong to programmes of about 25 groups that share one course
+    list, so some courses are in heavy demand. Every course has at least one
+    qualified teacher and teachers are qualified for only a few courses.
+    Tightness is the ratio of the demand (weekly hours of all group courses)
+    to the capacity: the number of classrooms and the teachers' weekly limits
+    are chosen so that demand / (classrooms x slots) and demand / (sum of
+    teacher limits) both come close to it. Values near 1 give very tight
+    instances; values above 1 are infeasible by construction. A teacher's
+    limit never exceeds the number of slots, so too few teachers for the
+    demand also show up as a teacher tightness above the requested one.
+    """
+    if min(num_groups, num_teachers, num_courses, courses_per_group, slots_per_day, weeks) <= 0:
+        raise ValueError("Dataset sizes must be positive integers.")
+    if courses_per_group > num_courses:
+        raise ValueError("A group cannot take more courses than there are.")
+    if tightness <= 0:
+        raise ValueError("Tightness must be a positive number.")
+    rng = RandomStream(seed)
+
+    time_slots = generate_time_slots(days_per_week, slots_per_day, weeks)
+    num_slots = len(time_slots)
+
+    courses = []
+    for number in range(1, num_courses + 1):
+        course_type = "lecture" if rng.random() < 0.6 else "lab"
+        courses.append({
+            "number": number,
+            "name": f"Course{number}",
+            "max_number_of_students": 120 if course_type == "lecture" else 30,
+            "course_type": course_type,
+            "hours_per_week": 1 + (rng.random() < 0.3),
+        })
+
+    # Programmes share a course list; the weekly hours of a group must fit into the slot grid
+    num_programmes = max(1, num_groups // 25)
+    programmes = []
+    for _ in range(num_programmes):
+        numbers = list(range(1, num_courses + 1))
+        rng.shuffle(numbers)
+        selected = sorted(numbers[:courses_per_group])
+        while sum(courses[number - 1]["hours_per_week"] for number in selected) > num_slots and len(selected) > 1:
+            selected.pop()
+        programmes.append(selected)
+
+    largest_room = ROOM_MIX[-1][0]
+    groups = []
+    course_demand = [0] * (num_courses + 1)
+    for group_id in range(1, num_groups + 1):
+        programme = programmes[rng.index(num_programmes)]
+        num_students = 10 + rng.index(26) if rng.random() < 0.85 else 60 + rng.index(61)
+        groups.append({
+            "id": group_id,
+            "name": f"G{group_id}",
+            "num_students": min(num_students, largest_room),
+            "courses": ",".join(str(number) for number in programme),
+        })
+        for number in programme:
+            course_demand[number] += courses[number - 1]["hours_per_week"]
+    demand = sum(course_demand)
+
+    # Rooms: enough room-slots for demand / tightness, mixed capacities
+    num_classrooms = max(len(ROOM_MIX), math.ceil(demand / (tightness * num_slots)))
+    classrooms = []
+    for capacity, share in ROOM_MIX:
+        count = max(1, round(num_classrooms * share))
+        for _ in range(count):
+            classrooms.append({"number": str(100 + len(classrooms) + 1), "seating_capacity": capacity})
+
+    # Teachers: every course gets one teacher round-robin, then sparse extra qualifications
+    # drawn in proportion to the demand of the courses
+    qualifications: List[List[int]] = [[] for _ in range(num_teachers)]
+    for number in range(1, num_courses + 1):
+        qualifications[(number - 1) % num_teachers].append(number)
+    cumulative_demand = []
+    total = 0
+    for number in range(1, num_courses + 1):
+        total += course_demand[number] + 1
+        cumulative_demand.append(total)
+    for qualified in qualifications:
+        target = min(qualifications_per_teacher, num_courses)
+        while len(qualified) < target:
+            number = 1 + bisect.bisect_right(cumulative_demand, rng.random() * total)
+            if number not in qualified:
+                qualified.append(number)
+    teachers_per_course = [0] * (num_courses + 1)
+    for qualified in qualifications:
+        for number in qualified:
+            teachers_per_course[number] += 1
+
+    teachers = []
+    for teacher_id, qualified in enumerate(qualifications, 1):
+        # Expected share of the demand of the teacher's courses, scaled by the tightness
+        share = sum(course_demand[number] / teachers_per_course[number] for number in qualified)
+        teachers.append({
+            "id": teacher_id,
+            "name": f"Teacher{teacher_id}",
+            "courses": ",".join(str(number) for number in sorted(qualified)),
+            "max_hours_per_week": min(max(1, math.ceil(share / tightness)), num_slots),
+        })
+
+    return {
+        "groups": groups,
+        "teachers": teachers,
+        "courses": courses,
+        "classrooms": classrooms,
+        "time_slots": time_slots,
+    }
+
+
+CSV_FIELDS = {
+    "groups": ("id", "name", "num_students", "courses"),
+    "teachers": ("id", "name", "courses", "max_hours_per_week"),
+    "courses": ("number", "name", "max_number_of_students", "course_type", "hours_per_week"),
+    "classrooms": ("number", "seating_capacity"),
+    "time_slots": ("id", "time", "day"),
+}
+
+
+def write_dataset(dataset: Dict[str, List[Dict[str, str]]], output_dir: str) -> List[str]:
+    """
+    Writes the dataset as <name>.csv files in the schema of the bundled user_data files.
+
+    courses.csv is also written as courses_copy.csv, the file Data reads, so
+    the directory can stand in for user_data as it is.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for name, fields in CSV_FIELDS.items():
+        file_names = [f"{name}.csv"] + (["courses_copy.csv"] if name == "courses" else [])
+        for file_name in file_names:
+            path = os.path.join(output_dir, file_name)
+            with open(path, "w", newline="", encoding="utf-8") as file:
+                writer = csv.DictWriter(file, fieldnames=fields)
+                writer.writeheader()
+                writer.writerows(dataset[name])
+            paths.append(path)
+    return paths
+
+
+def describe_dataset(dataset: Dict[str, List[Dict[str, str]]]) -> Dict[str, float]:
+    course_hours = {course["number"]: course["hours_per_week"] for course in dataset["courses"]}
+    demand = sum(course_hours[int(number)]
+                 for group in dataset["groups"] for number in group["courses"].split(","))
+    room_slots = len(dataset["classrooms"]) * len(dataset["time_slots"])
+    teacher_hours = sum(teacher["max_hours_per_week"] for teacher in dataset["teachers"])
+    return {
+        "groups": len(dataset["groups"]),
+        "teachers": len(dataset["teachers"]),
+        "courses": len(dataset["courses"]),
+        "classrooms": len(dataset["classrooms"]),
+        "time_slots": len(dataset["time_slots"]),
+        "demand_hours": demand,
+        "room_tightness": demand / room_slots,
+        "teacher_tightness": demand / teacher_hours,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Generate synthetic timetable CSV files")
+    parser.add_argument("--output-dir", default="user_data/generated")
+    parser.add_argument("--groups", type=int, default=2000)
+    parser.add_argument("--teachers", type=int, default=900)
+    parser.add_argument("--courses", type=int, default=400)
+    parser.add_argument("--courses-per-group", type=int, default=8)
+    parser.add_argument("--days-per-week", type=int, default=5)
+    parser.add_argument("--slots-per-day", type=int, default=6)
+    parser.add_argument("--weeks", type=int, default=1)
+    parser.add_argument("--tightness", type=float, default=0.8,
+                        help="ratio of demand to room and teacher capacity (close to 1 = tight)")
+    parser.add_argument("--qualifications-per-teacher", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    options = parser.parse_args(argv)
+
+    dataset = generate_dataset(
+        num_groups=options.groups,
+        num_teachers=options.teachers,
+        num_courses=options.courses,
+        courses_per_group=options.courses_per_group,
+        days_per_week=options.days_per_week,
+        slots_per_day=options.slots_per_day,
+        weeks=options.weeks,
+        tightness=options.tightness,
+        qualifications_per_teacher=options.qualifications_per_teacher,
+        seed=options.seed,
+    )
+    for path in write_dataset(dataset, options.output_dir):
+        print(f"Written {path}")
+    for key, value in describe_dataset(dataset).items():
+        print(f"{key}: {value:.3f}" if isinstance(value, float) else f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+#warm_start.py
+
+from array import array
+from collections import Counter
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from checkpoint import MAGIC, Checkpoint, load_checkpoint
+from constructive_init import pick_placement, set_bits
+from db_and_export.database_utils import load_run_assignments
+from fitness_objectives import deviation_objective
+from genetic_algorithm import GenAlg
+from population import Population
+from random_stream import RandomStream, default_stream
+from timetable import Timetable
+
+
+class PlannedSession(NamedTuple):
+    """One session of an earlier plan, identified by stable keys rather than gene indices."""
+    group: str
+    course_number: int
+    classroom: str
+    teacher_id: int
+    day: str
+    time: str
+
+
+def read_timetable_txt(file_path: str) -> List[PlannedSession]:
+    """Reads the sessions of a timetable written by database_utils.export_timetable_to_txt."""
+    sessions = []
+    with open(file_path, encoding="utf-8") as file:
+        for line in file:
+            fields = line.rstrip("\n").split(" | ")
+            if len(fields) != 7 or not fields[0].isdigit():
+                continue  # Headers, day captions, separators and the fitness summary
+            _, group, course, classroom, teacher, day, time = fields
+            sessions.append(PlannedSession(
+                group=group,
+                course_number=int(course.rsplit("(", 1)[1].rstrip(")")),
+                classroom=classroom.rsplit(" (", 1)[0],
+                teacher_id=int(teacher.rsplit("(", 1)[1].rstrip(")")),
+                day=day,
+                time=time,
+            ))
+    return sessions
+
+
+SQLITE_MAGIC = b"SQLite format 3\x00"
+SEED_MUTATION_ATTEMPTS = 5  # Mutations tried per warm-start variant before a copy of the mapped plan is kept
+
+
+def load_planned_sessions(file_path: str, run_id: Optional[int] = None) -> List[PlannedSession]:
+    """
+    Reads an earlier plan from a checkpoint (its best timetable), from the
+    run history of a SQLite database (run_id, or the latest finished run) or
+    from an exported timetable text file.
+    """
+    with open(file_path, "rb") as file:
+        magic = file.read(len(SQLITE_MAGIC))
+    if magic.startswith(MAGIC):
+        return planned_sessions_from_checkpoint(load_checkpoint(file_path))
+    if magic == SQLITE_MAGIC:
+        return [PlannedSession(*row) for row in load_run_assignments(file_path, run_id)]
+    return read_timetable_txt(file_path)
+
+
+def planned_sessions_from_timetable(timetable: Timetable) -> List[PlannedSession]:
+    return [
+        PlannedSession(session.student_group.name, session.course.number, str(session.classroom.number),
+                       session.teacher.id, session.time_slot.day, session.time_slot.time)
+        for session in timetable.study_sessions
+    ]
+
+
+def planned_sessions_from_checkpoint(checkpoint: Checkpoint, rank: int = 0) -> List[PlannedSession]:
+    """
+    Decodes one saved genome (the best one by default) with the keys stored
+    in the checkpoint, so it can be mapped onto data that has changed since.
+    """
+    if checkpoint.keys is None:
+        raise ValueError("The checkpoint does not store the keys of its data.")
+    keys = checkpoint.keys
+    genes = array('H')
+    genes.frombytes(checkpoint.genomes[rank])
+    size = len(genes) // 4
+    sessions = []
+    for layout_idx, teacher_idx, classroom_idx, time_slot_idx in zip(
+            genes[:size], genes[size:2 * size], genes[2 * size:3 * size], genes[3 * size:]):
+        course_idx, group_idx = keys["session_layout"][layout_idx]
+        day, time = keys["time_slots"][time_slot_idx]
+        sessions.append(PlannedSession(keys["groups"][group_idx], keys["courses"][course_idx],
+                                       keys["classrooms"][classroom_idx], keys["teachers"][teacher_idx], day, time))
+    return sessions
+
+
+def map_plan(data: Any, sessions: Iterable[PlannedSession], rng: Optional[RandomStream] = None,
+             fitness_function: Optional[str] = None) -> Tuple[Timetable, Dict[str, int]]:
+    """
+    Maps an earlier plan onto the current data and repairs what no longer fits.
+
+    Every (course, group) of the session layout gets as many sessions as
+    its weekly hours, each taking the next planned session of that
+    (course, group) if there is one. The teacher, classroom and time slot are
+    kept when they still exist, the teacher is still allowed to teach the
+    course and the classroom still fits the group; sessions kept unchanged
+    are placed first. The missing parts of the other sessions are then
+    chosen like the constructive heuristic does: a qualified teacher, a
+    fitting classroom and a slot free for the group, the teacher and the
+    classroom, preferring the old slot. Planned sessions of courses or groups
+    that no longer exist are dropped.
+
+    Returns the timetable and counts of kept, repaired and dropped sessions.
+    """
+    rng = rng if rng is not None else default_stream()
+    index = data.index
+    course_index = {course.number: idx for idx, course in enumerate(data.courses)}
+    group_index = {group.name: idx for idx, group in enumerate(data.groups)}
+    teacher_index = {teacher.id: idx for idx, teacher in enumerate(data.teachers)}
+    classroom_index = {str(classroom.number): idx for idx, classroom in enumerate(data.classrooms)}
+    slot_index = {(time_slot.day, time_slot.time): idx for idx, time_slot in enumerate(data.time_slots)}
+    layout_index = {key: idx for idx, key in enumerate(data.session_layout)}
+
+    planned: Dict[int, List[Tuple[Optional[int], Optional[int], Optional[int]]]] = {}
+    dropped = 0
+    for session in sessions:
+        layout_idx = layout_index.get((course_index.get(session.course_number), group_index.get(session.group)))
+        if layout_idx is None:
+            dropped += 1
+            continue
+        course_idx = index.layout_courses[layout_idx]
+        group_idx = index.layout_groups[layout_idx]
+        teacher_idx = teacher_index.get(session.teacher_id)
+        if teacher_idx is not None and not index.is_allowed(teacher_idx, course_idx):
+            teacher_idx = None
+        classroom_idx = classroom_index.get(session.classroom)
+        if classroom_idx is not None and index.over_capacity[group_idx][classroom_idx]:
+            classroom_idx = None
+        time_slot_idx = slot_index.get((session.day, session.time))
+        planned.setdefault(layout_idx, []).append((teacher_idx, classroom_idx, time_slot_idx))
+
+    # As many sessions per (course, group) as its weekly hours (the session layout count when none are set),
+    # each taking the next planned placement if there is one
+    initial_counts = Counter(data.initial_layout)
+    placements = []
+    for layout_idx in dict.fromkeys(data.initial_layout):
+        target = index.required_hours[layout_idx] or initial_counts[layout_idx]
+        entries = planned.pop(layout_idx, [])
+        dropped += max(len(entries) - target, 0)
+        for number in range(target):
+            placements.append((layout_idx, entries[number] if number < len(entries) else (None, None, None)))
+    dropped += sum(len(entries) for entries in planned.values())
+
+    num_slots = index.num_time_slots
+    all_slots = (1 << num_slots) - 1
+    group_busy = [0] * index.num_groups
+    teacher_busy = [0] * index.num_teachers
+    classroom_busy = [0] * index.num_classrooms
+    teacher_loads = [0] * index.num_teachers
+    genes: List[Optional[Tuple[int, int, int, int]]] = [None] * len(placements)
+
+    def occupy(position: int, layout_idx: int, teacher_idx: int, classroom_idx: int, time_slot_idx: int) -> None:
+        slot_bit = 1 << time_slot_idx
+        group_busy[index.layout_groups[layout_idx]] |= slot_bit
+        teacher_busy[teacher_idx] |= slot_bit
+        classroom_busy[classroom_idx] |= slot_bit
+        teacher_loads[teacher_idx] += 1
+        genes[position] = (layout_idx, teacher_idx, classroom_idx, time_slot_idx)
+
+    # Pass 1: sessions that are still complete and do not clash with an earlier kept session
+    kept = 0
+    for position, (layout_idx, (teacher_idx, classroom_idx, time_slot_idx)) in enumerate(placements):
+        if teacher_idx is None or classroom_idx is None or time_slot_idx is None:
+            continue
+        slot_bit = 1 << time_slot_idx
+        if (group_busy[index.layout_groups[layout_idx]] | teacher_busy[teacher_idx]
+                | classroom_busy[classroom_idx]) & slot_bit:
+            continue
+        occupy(position, layout_idx, teacher_idx, classroom_idx, time_slot_idx)
+        kept += 1
+
+    # Pass 2: repair the rest, keeping whatever part of the old placement is still valid
+    for position, (layout_idx, (teacher_idx, classroom_idx, time_slot_idx)) in enumerate(placements):
+        if genes[position] is not None:
+            continue
+        course_idx = index.layout_courses[layout_idx]
+        group_idx = index.layout_groups[layout_idx]
+        if teacher_idx is not None:
+            teachers = [teacher_idx]
+        else:
+            qualified = index.qualified_teachers[course_idx] or tuple(range(index.num_teachers))
+            teachers = [
+                candidate for candidate in qualified
+                if not index.restricted[candidate] or teacher_loads[candidate] < index.max_hours[candidate]
+            ] or list(qualified)
+        if classroom_idx is not None:
+            classrooms = [classroom_idx]
+        else:
+            classrooms = list(index.fitting_classrooms[group_idx] or range(index.num_classrooms))
+
+        group_free = all_slots & ~group_busy[group_idx]
+        teacher_idx, classroom_idx, free_slots = pick_placement(
+            rng, teachers, classrooms, group_free, teacher_busy, classroom_busy
+        )
+        if not free_slots:
+            free_slots = group_free & ~teacher_busy[teacher_idx] or group_free or all_slots
+        if time_slot_idx is None or not free_slots >> time_slot_idx & 1:
+            slots = set_bits(free_slots, num_slots)
+            time_slot_idx = rng.choice(slots)
+        occupy(position, layout_idx, teacher_idx, classroom_idx, time_slot_idx)
+
+    timetable = Timetable(data=data, fitness_function=fitness_function or data.fitness_function, rng=rng)
+    for session_genes in genes:
+        timetable.add_session(*session_genes)
+    return timetable, {"kept": kept, "repaired": len(placements) - kept, "dropped": dropped}
+
+
+def seed_population(timetable: Timetable, size: int, genetic_algorithm: GenAlg,
+                    keep_share: float = 0.5) -> Population:
+    """
+    Population for re-planning: the mapped timetable, mutations of it for
+    keep_share of the places and fresh timetables for the rest, so the GA
+    can still escape when the old plan is a poor start.
+
+    Every variant goes through aggressive_mutate_timetable (which changes
+    each session with probability 2 * mutation_rate) until it differs from
+    the mapped timetable or SEED_MUTATION_ATTEMPTS are used up, so the kept
+    share is not filled with copies of the old plan.
+    """
+    if size <= 0:
+        raise ValueError("Population size must be a positive integer.")
+    num_variants = min(max(int(size * keep_share), 1), size)
+    genome = timetable.to_genome()
+    timetables = [timetable]
+    while len(timetables) < num_variants:
+        variant = timetable.clone()
+        for _ in range(SEED_MUTATION_ATTEMPTS):
+            genetic_algorithm.aggressive_mutate_timetable(variant)
+            if variant.to_genome() != genome:
+                break
+        timetables.append(variant)
+    while len(timetables) < size:
+        timetables.append(genetic_algorithm._new_timetable())
+    return Population.from_timetables(timetables)
+
+
+def penalize_deviation(data: Any, timetable: Timetable, weight: float) -> Timetable:
+    """
+    Makes timetable the reference plan of data and switches data to the
+    "<fitness function>+deviation" objective, so every session moved away
+    from it costs `weight`. Returns the timetable rebuilt on the new index.
+    """
+    fitness_function = deviation_objective(data.fitness_function, weight).name
+    data.fitness_function = fitness_function
+    data.set_reference_plan(list(zip(timetable.layout_genes, timetable.teacher_genes,
+                                     timetable.classroom_genes, timetable.time_slot_genes)))
+    return Timetable.from_genome(data, timetable.to_genome(), fitness_function, rng=timetable.rng)